@@ -0,0 +1 @@
+'''Benchmarks of the matcher on synthetic venues. Run with `python -m benchmarks`.'''
@@ -0,0 +1,63 @@
+'''
+Runs the benchmark cases and compares them against the stored baselines.
+
+    python -m benchmarks --sizes tiny small
+
+exits with status 1 if any case regressed. With --update_baseline, the results are stored
+as the new baselines of their cases instead. Baselines depend on the machine, so they are
+not committed: record them on the machine the benchmarks are compared on, as CI does
+on the merge base of a branch before running the branch.
+'''
+import os
+import sys
+import json
+import argparse
+from .suite import SIZES, CASES, run_cases, compare
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks')
+parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['tiny', 'small'])
+parser.add_argument('--solvers', nargs='+', help='''Only run the cases of these solvers''')
+parser.add_argument('--cases', nargs='+', choices=list(CASES), help='''Run these cases, instead of selecting them by size and solver''')
+parser.add_argument('--seed', type=int, default=0, help='''Seed of the synthetic venues and the solvers''')
+parser.add_argument('--baseline', default=BASELINE_FILE, help='''JSON file with the baseline of each case''')
+parser.add_argument('--update_baseline', action='store_true', help='''Store the results as the baselines of their cases''')
+parser.add_argument('--output', help='''JSON file to write the results to''')
+parser.add_argument('--time_tolerance', type=float, default=0.5)
+parser.add_argument('--memory_tolerance', type=float, default=0.25)
+args = parser.parse_args()
+
+names = args.cases or [
+    name for name, case in CASES.items()
+    if case['size'] in args.sizes and (not args.solvers or case['solver'] in args.solvers)]
+
+baselines = {}
+if os.path.exists(args.baseline):
+    with open(args.baseline) as f:
+        baselines = json.load(f)
+
+results = run_cases(names, seed=args.seed)
+
+for name, result in results.items():
+    print('{:<40} {:<12} {:>9.3f}s {:>9.1f}MB'.format(
+        name, result['status'], result['seconds'], (result['peak_rss'] or 0) / 2**20))
+    for phase, seconds in result['phases'].items():
+        print('    {:<50} {:>9.3f}s'.format(phase, seconds))
+
+if args.output:
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+if args.update_baseline:
+    baselines.update(results)
+    with open(args.baseline, 'w') as f:
+        json.dump(baselines, f, indent=2)
+    print('Updated the baselines of {} cases in {}'.format(len(results), args.baseline))
+else:
+    regressions = compare(
+        results, baselines, time_tolerance=args.time_tolerance, memory_tolerance=args.memory_tolerance)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    if regressions:
+        sys.exit(1)
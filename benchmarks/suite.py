@@ -0,0 +1,130 @@
+'''
+Benchmark cases for the matcher, and their comparison against stored baselines.
+
+Each case runs the Matcher on a synthetic venue (see venues.py) with one solver, and reports
+the duration of every phase recorded by Matcher.run (fetch, encode, build, solve, decode, ...,
+including the stages of the solver) and the peak resident set size of the run.
+Cases run in a fresh process each, so that the peak RSS of a case does not include the
+memory used by the cases before it.
+'''
+import os
+import logging
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from matcher.core import Matcher, KeywordDatasource
+from matcher.instrumentation import PhaseRecorder
+from .venues import generate_venue
+
+# (number of papers, number of reviewers)
+SIZES = OrderedDict([
+    ('tiny', (100, 300)),
+    ('small', (1000, 3000)),
+    ('medium', (5000, 15000)),
+    ('large', (20000, 60000))
+])
+
+# the dense solvers (FairFlow, Randomized) hold several papers x reviewers matrices,
+# so they only run on the sizes where those fit in memory
+CASES = OrderedDict(
+    ('{}-{}{}'.format(size, solver, '-sparse' if sparse else ''), {'size': size, 'solver': solver, 'sparse': sparse})
+    for size, solver, sparse in [
+        ('tiny', 'MinMax', False),
+        ('tiny', 'MinMax', True),
+        ('tiny', 'MinMaxSingleGraph', True),
+        ('tiny', 'FairFlow', False),
+        ('tiny', 'Randomized', False),
+        ('tiny', 'RandomizedMinCostFlow', False),
+        ('small', 'MinMax', False),
+        ('small', 'MinMax', True),
+        ('small', 'MinMaxSingleGraph', True),
+        ('small', 'FairFlow', False),
+        ('small', 'RandomizedMinCostFlow', False),
+        ('medium', 'MinMax', True),
+        ('medium', 'MinMaxSingleGraph', True),
+        ('large', 'MinMax', True),
+        ('large', 'MinMaxSingleGraph', True)
+    ]
+)
+
+def run_case(name, seed=0):
+    '''
+    Run the benchmark case `name` in this process, and return its result:
+    the final status, the total duration in seconds, the peak RSS in bytes and the
+    duration of each phase (summed over repeated phases, e.g. FairFlow makespan probes).
+    '''
+    case = CASES[name]
+    num_papers, num_reviewers = SIZES[case['size']]
+
+    recorder = PhaseRecorder()
+    with recorder.phase('generate'):
+        venue = generate_venue(num_papers, num_reviewers, seed=seed)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        matcher = Matcher(
+            datasource=KeywordDatasource(
+                sparse=case['sparse'],
+                seed=seed,
+                assignments_output=os.path.join(output_dir, 'assignments.json'),
+                alternates_output=os.path.join(output_dir, 'alternates.json'),
+                logger=logging.getLogger('benchmarks'),
+                **venue
+            ),
+            solver_class=case['solver'],
+            logger=logging.getLogger('benchmarks')
+        )
+        matcher.run()
+
+    profile = matcher.recorder.to_dict()
+    phases = OrderedDict()
+    for record in recorder.phases + profile['phases']:
+        phases[record['name']] = phases.get(record['name'], 0) + record['seconds']
+
+    return {
+        'status': matcher.get_status(),
+        'seconds': profile['seconds'],
+        'peak_rss': profile['peak_rss'],
+        'phases': phases
+    }
+
+def run_cases(names, seed=0):
+    '''Run the benchmark cases `names`, each in a new process, and return their results by name'''
+    results = OrderedDict()
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[name] = executor.submit(run_case, name, seed).result()
+    return results
+
+def compare(results, baselines, time_tolerance=0.5, memory_tolerance=0.25, min_seconds=0.1):
+    '''
+    Return a list of regressions of `results` with respect to `baselines`, both as returned
+    by run_cases. A phase, or the whole run, regresses when it takes more than
+    (1 + time_tolerance) times its baseline duration, and at least `min_seconds` longer;
+    a run regresses when its peak RSS exceeds (1 + memory_tolerance) times its baseline.
+    Cases and phases without a baseline are skipped.
+    '''
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+
+        if result['status'] != baseline['status']:
+            regressions.append('{}: status {}, baseline {}'.format(name, result['status'], baseline['status']))
+
+        durations = [('run', result['seconds'], baseline['seconds'])] + [
+            (phase, seconds, baseline['phases'][phase])
+            for phase, seconds in result['phases'].items() if phase in baseline['phases']]
+        for phase, seconds, baseline_seconds in durations:
+            if seconds > (1 + time_tolerance) * baseline_seconds and seconds - baseline_seconds >= min_seconds:
+                regressions.append('{}: {} took {:.3f}s, baseline {:.3f}s'.format(
+                    name, phase, seconds, baseline_seconds))
+
+        if result['peak_rss'] and baseline['peak_rss'] and \
+                result['peak_rss'] > (1 + memory_tolerance) * baseline['peak_rss']:
+            regressions.append('{}: peak RSS {:.1f}MB, baseline {:.1f}MB'.format(
+                name, result['peak_rss'] / 2**20, baseline['peak_rss'] / 2**20))
+
+    return regressions
@@ -0,0 +1,107 @@
+'''
+Generates synthetic venues for benchmarking the matcher.
+
+A venue is generated from a seed, so the same arguments always give the same venue.
+Papers and reviewers are spread over topics, about 100 reviewers per topic. Each paper
+has affinity edges with `affinities_per_paper` reviewers, mostly from its own topic
+and with higher scores there, bids on a fraction of those edges, and a few conflicts
+with reviewers of its topic. A fraction of the reviewers have custom, lower maximum loads.
+
+The venue is returned as the keyword arguments of matcher.core.KeywordDatasource,
+with the edges in columnar form (dicts of numpy arrays), as the Encoder reads them.
+'''
+import numpy as np
+
+def _pool_indices(rng, pool_starts, pool_sizes, count):
+    '''Draw `count` indices from the pool [start, start + size) of each row'''
+    return pool_starts[:, None] + (rng.random((len(pool_starts), count)) * pool_sizes[:, None]).astype(int)
+
+def _unique_pairs(papers, reviewers, num_reviewers):
+    '''Drop repeated (paper, reviewer) pairs, returning the pairs sorted by paper'''
+    pairs = np.unique(papers.astype(np.int64) * num_reviewers + reviewers)
+    return pairs // num_reviewers, pairs % num_reviewers
+
+def _edges(paper_ids, reviewer_ids, papers, reviewers, weights):
+    return {'head': paper_ids[papers], 'tail': reviewer_ids[reviewers], 'weight': weights}
+
+def generate_venue(
+            num_papers,
+            num_reviewers,
+            seed=0,
+            demand=3,
+            min_papers=0,
+            max_papers=None,
+            affinities_per_paper=50,
+            in_topic_fraction=0.8,
+            bid_fraction=0.2,
+            conflicts_per_paper=2,
+            custom_load_fraction=0.1,
+            probability_limit=0.5,
+            num_alternates=3
+        ):
+    '''
+    Return a synthetic venue of `num_papers` papers and `num_reviewers` reviewers,
+    as the keyword arguments of KeywordDatasource.
+
+    Every paper needs `demand` reviews. Unless given, `max_papers` is set so that the
+    reviewers can supply about 1.5 times the total demand, before custom loads.
+    '''
+    rng = np.random.default_rng(seed)
+
+    paper_ids = np.array(['Venue/Paper{}'.format(i) for i in range(num_papers)], dtype=object)
+    reviewer_ids = np.array(['~Reviewer{}'.format(i) for i in range(num_reviewers)], dtype=object)
+
+    # reviewers of the same topic are contiguous, so that a topic is a range of reviewer indices
+    num_topics = max(1, num_reviewers // 100)
+    topic_bounds = np.linspace(0, num_reviewers, num_topics + 1).astype(int)
+    topic_starts = topic_bounds[:-1]
+    topic_sizes = np.diff(topic_bounds)
+    paper_topics = rng.integers(num_topics, size=num_papers)
+    pool_starts = topic_starts[paper_topics]
+    pool_sizes = topic_sizes[paper_topics]
+
+    # affinities: most edges are with reviewers of the paper's topic, and score higher
+    affinities_per_paper = min(affinities_per_paper, num_reviewers)
+    num_in_topic = int(round(affinities_per_paper * in_topic_fraction))
+    in_topic = _pool_indices(rng, pool_starts, pool_sizes, num_in_topic)
+    off_topic = rng.integers(num_reviewers, size=(num_papers, affinities_per_paper - num_in_topic))
+    papers, reviewers = _unique_pairs(
+        np.repeat(np.arange(num_papers), affinities_per_paper),
+        np.concatenate([in_topic, off_topic], axis=1).ravel(),
+        num_reviewers)
+    same_topic = (reviewers >= pool_starts[papers]) & (reviewers < pool_starts[papers] + pool_sizes[papers])
+    affinities = np.where(same_topic, rng.beta(4, 2, size=len(papers)), rng.beta(1.5, 6, size=len(papers)))
+
+    # bids on some of the affinity edges, more eager for higher affinities
+    bidding = rng.random(len(papers)) < bid_fraction
+    bids = np.clip(np.round(4 * affinities[bidding] + rng.normal(0, 1, size=np.sum(bidding))), 0, 4) / 4
+
+    # conflicts with reviewers of the paper's topic
+    conflict_papers, conflict_reviewers = _unique_pairs(
+        np.repeat(np.arange(num_papers), conflicts_per_paper),
+        _pool_indices(rng, pool_starts, pool_sizes, conflicts_per_paper).ravel(),
+        num_reviewers)
+
+    if max_papers is None:
+        max_papers = int(np.ceil(1.5 * demand * num_papers / num_reviewers)) + 1
+    maximums = np.full(num_reviewers, max_papers)
+    custom_loads = rng.random(num_reviewers) < custom_load_fraction
+    maximums[custom_loads] = rng.integers(max_papers, size=np.sum(custom_loads))
+    minimums = np.minimum(min_papers, maximums)
+
+    return {
+        'reviewers': reviewer_ids.tolist(),
+        'papers': paper_ids.tolist(),
+        'constraints': _edges(
+            paper_ids, reviewer_ids, conflict_papers, conflict_reviewers, np.full(len(conflict_papers), -1)),
+        'scores_by_type': {
+            'affinity': {'edges': _edges(paper_ids, reviewer_ids, papers, reviewers, affinities)},
+            'bid': {'edges': _edges(paper_ids, reviewer_ids, papers[bidding], reviewers[bidding], bids)}
+        },
+        'weight_by_type': {'affinity': 1, 'bid': 1},
+        'minimums': minimums.tolist(),
+        'maximums': maximums.tolist(),
+        'demands': [demand] * num_papers,
+        'probability_limits': probability_limit,
+        'num_alternates': num_alternates
+    }
@@ -59,7 +59,17 @@ parser.add_argument('--num_reviewers', default=3, type=int)
 parser.add_argument('--num_alternates', default=3, type=int)
 parser.add_argument('--allow_zero_score_assignments', action='store_true',
                     help='''Use flag to allow 0 affinity (unknown scores default to 0) pairs in solver solution''')
+parser.add_argument('--sparse', action='store_true',
+                    help='''Use flag to encode scores and constraints as sparse matrices (recommended for large venues)''')
 parser.add_argument('--user_group', type=str)
+parser.add_argument('--seed', type=int,
+                    help='''Seed for all random choices made by the solver, to make runs reproducible''')
+parser.add_argument('--num_processes', type=int, default=1,
+                    help='''Number of processes FairFlow uses to search for the makespan''')
+parser.add_argument('--candidate_limit', type=int,
+                    help='''Number of highest-affinity papers FairFlow offers each reviewer when improving the makespan''')
+parser.add_argument('--profile_output', type=str,
+                    help='''JSON file to write the duration and peak memory of each phase of the match to''')
 
 parser.add_argument(
     '--user_group_file',
@@ -78,7 +88,7 @@ parser.add_argument(
 # TODO: can argparse throw an error if the solver isn't in the list?
 parser.add_argument(
     '--solver',
-    help='Choose from: {}'.format(['MinMax', 'FairFlow', 'Randomized']),
+    help='Choose from: {}'.format(['MinMax', 'MinMaxSingleGraph', 'FairFlow', 'Randomized', 'RandomizedMinCostFlow']),
     default='MinMax'
 )
 
@@ -89,10 +99,14 @@ logger.info('Setting solver class')
 solver_class = None
 if args.solver == 'MinMax':
     solver_class = 'MinMax'
+if args.solver == 'MinMaxSingleGraph':
+    solver_class = 'MinMaxSingleGraph'
 if args.solver == 'FairFlow':
     solver_class = 'FairFlow'
 if args.solver == 'Randomized':
     solver_class = 'Randomized'
+if args.solver == 'RandomizedMinCostFlow':
+    solver_class = 'RandomizedMinCostFlow'
 
 if not solver_class:
     raise ValueError('Invalid solver class {}'.format(args.solver))
@@ -221,8 +235,12 @@ match_data = {
     'probability_limits': probability_limits,
     'num_alternates': num_alternates,
     'allow_zero_score_assignments': args.allow_zero_score_assignments,
+    'sparse': args.sparse,
     'assignments_output': 'assignments.json',
     'alternates_output': 'alternates.json',
+    'seed': args.seed,
+    'num_processes': args.num_processes,
+    'candidate_limit': args.candidate_limit,
     'logger': logger
 }
 
@@ -233,5 +251,8 @@ matcher = Matcher(
 )
 
 matcher.run()
+if args.profile_output:
+    with open(args.profile_output, 'w') as f:
+        f.write(matcher.recorder.to_json(indent=2))
 t1 = time.time()
 logger.info('Overall execution time: {0} seconds'.format(t1-t0))
@@ -4,13 +4,22 @@ import threading
 import time
 import json
 from enum import Enum
-from .solvers import SolverException, MinMaxSolver, FairFlow, RandomizedSolver
+from functools import partial
+from .solvers import SolverException, MinMaxSolver, SingleGraphMinMaxSolver, FairFlow, RandomizedSolver
 from .encoder import Encoder
+from .instrumentation import PhaseRecorder
 
 SOLVER_MAP = {
     'MinMax' : MinMaxSolver,
+    'MinMaxSingleGraph' : SingleGraphMinMaxSolver,
     'FairFlow' : FairFlow,
-    'Randomized' : RandomizedSolver
+    'Randomized' : RandomizedSolver,
+    'RandomizedMinCostFlow' : partial(RandomizedSolver, fractional_method='MinCostFlow')
+}
+
+# options of the datasource that are passed on to the solvers that take them
+SOLVER_OPTIONS = {
+    FairFlow : ['num_processes', 'candidate_limit']
 }
 
 class MatcherStatus(Enum):
@@ -41,8 +50,12 @@ class KeywordDatasource:
                 num_alternates=0,
                 probability_limits=[],
                 allow_zero_score_assignments=False,
+                sparse=False,
                 assignments_output='assignments.json',
                 alternates_output='alternates.json',
+                seed=None,
+                num_processes=1,
+                candidate_limit=None,
                 logger=logging.getLogger(__name__)
             ):
 
@@ -57,9 +70,13 @@ class KeywordDatasource:
         self.probability_limits = probability_limits
         self.num_alternates = num_alternates
         self.allow_zero_score_assignments = allow_zero_score_assignments
+        self.sparse = sparse
         self.normalization_types = []
         self.assignments_output = assignments_output
         self.alternates_output = alternates_output
+        self.seed = seed
+        self.num_processes = num_processes
+        self.candidate_limit = candidate_limit
         self.logger = logger
 
     def set_assignments(self, assignments):
@@ -94,6 +111,7 @@ class Matcher:
         self.solution = None
         self.assignments = None
         self.alternates = None
+        self.recorder = None
         self.status = 'Initialized'
 
         self.solver_class = self.__set_solver_class(solver_class)
@@ -120,64 +138,116 @@ class Matcher:
         '''
         Compute a match of reviewers to papers and post it to the as assignment notes.
         The config note's status field will be set to reflect completion or errors.
+
+        The duration and peak memory of each phase of the run, including the stages of the solver,
+        are recorded by self.recorder and reported as the 'profile' in additional_status_info,
+        serialized as JSON.
         '''
+        self.recorder = PhaseRecorder()
         try:
             self.set_status(MatcherStatus.RUNNING)
 
+            self.logger.debug('Fetching match data')
+
+            with self.recorder.phase('fetch'):
+                reviewers = self.datasource.reviewers
+                papers = self.datasource.papers
+                constraints = self.datasource.constraints
+                scores_by_type = self.datasource.scores_by_type
+                weight_by_type = self.datasource.weight_by_type
+                normalization_types = self.datasource.normalization_types
+                probability_limits = self.datasource.probability_limits
+                minimums = self.datasource.minimums
+                maximums = self.datasource.maximums
+                demands = self.datasource.demands
+
             self.logger.debug('Start encoding')
 
-            encoder = Encoder(
-                reviewers=self.datasource.reviewers,
-                papers=self.datasource.papers,
-                constraints=self.datasource.constraints,
-                scores_by_type=self.datasource.scores_by_type,
-                weight_by_type=self.datasource.weight_by_type,
-                normalization_types=self.datasource.normalization_types,
-                probability_limits=self.datasource.probability_limits,
-                logger=self.logger
-            )
+            with self.recorder.phase('encode'):
+                encoder = Encoder(
+                    reviewers=reviewers,
+                    papers=papers,
+                    constraints=constraints,
+                    scores_by_type=scores_by_type,
+                    weight_by_type=weight_by_type,
+                    normalization_types=normalization_types,
+                    probability_limits=probability_limits,
+                    sparse=self.datasource.sparse,
+                    logger=self.logger
+                )
 
             self.logger.debug('Preparing solver')
 
             # solver
-            solver = self.solver_class(
-                self.datasource.minimums,
-                self.datasource.maximums,
-                self.datasource.demands,
-                encoder,
-                allow_zero_score_assignments=self.datasource.allow_zero_score_assignments,
-                logger=self.logger
-            )
+            solver_options = {
+                option: getattr(self.datasource, option) for option in SOLVER_OPTIONS.get(self.solver_class, [])}
+            with self.recorder.phase('build'):
+                solver = self.solver_class(
+                    minimums,
+                    maximums,
+                    demands,
+                    encoder,
+                    allow_zero_score_assignments=self.datasource.allow_zero_score_assignments,
+                    logger=self.logger,
+                    seed=self.datasource.seed,
+                    recorder=self.recorder,
+                    **solver_options
+                )
 
             solution = None
             start_time = time.time()
 
             self.logger.debug('Solving solver')
-            solution = solver.solve()
+            with self.recorder.phase('solve'):
+                solution = solver.solve()
 
             self.logger.debug('Complete solver run took {} seconds'.format(time.time() - start_time))
 
             if solver.solved:
                 self.solution = solution
-                self.set_assignments(encoder.decode_assignments(solution))
-                if hasattr(solver, 'get_alternates'):
-                    self.set_alternates(
-                        encoder.decode_selected_alternates(
-                            solver.get_alternates(self.datasource.num_alternates)))
-                else:
-                    self.set_alternates(
-                        encoder.decode_alternates(solution, self.datasource.num_alternates))
+                with self.recorder.phase('decode'):
+                    assignments = encoder.decode_assignments(solution)
+                with self.recorder.phase('post_assignments'):
+                    self.set_assignments(assignments)
+                with self.recorder.phase('alternates'):
+                    if hasattr(solver, 'get_alternates'):
+                        alternates = encoder.decode_selected_alternates(
+                            solver.get_alternates(self.datasource.num_alternates))
+                    else:
+                        alternates = encoder.decode_alternates(solution, self.datasource.num_alternates)
+                with self.recorder.phase('post_alternates'):
+                    self.set_alternates(alternates)
                 additional_status_info={}
                 if hasattr(solver, 'get_fraction_of_opt'):
-                    additional_status_info['randomized_fraction_of_opt'] = solver.get_fraction_of_opt()
-                self.set_status(MatcherStatus.COMPLETE, message='', additional_status_info=additional_status_info)
+                    with self.recorder.phase('fraction_of_opt'):
+                        additional_status_info['randomized_fraction_of_opt'] = solver.get_fraction_of_opt()
+                self.set_status_with_profile(
+                    MatcherStatus.COMPLETE, message='', additional_status_info=additional_status_info)
             elif self.get_status() != 'No Solution':
                 self.logger.debug('No Solution. Solver could not find a solution. Adjust your parameters')
-                self.set_status(MatcherStatus.NO_SOLUTION, message='Solver could not find a solution. Adjust your parameters')
+                self.set_status_with_profile(
+                    MatcherStatus.NO_SOLUTION,
+                    message='Solver could not find a solution. Adjust your parameters')
 
         except SolverException as error_handle:
             self.logger.debug('No Solution={}'.format(error_handle))
-            self.set_status(MatcherStatus.NO_SOLUTION, message=str(error_handle))
+            self.set_status_with_profile(MatcherStatus.NO_SOLUTION, message=str(error_handle))
         except Exception as error_handle:
             self.logger.debug('Error={}'.format(error_handle))
-            self.set_status(MatcherStatus.ERROR, message=str(error_handle))
+            self.set_status_with_profile(MatcherStatus.ERROR, message=str(error_handle))
+
+    def set_status_with_profile(self, status, message=None, additional_status_info={}):
+        '''
+        Set the status, reporting the profile of the run as a JSON string.
+        If the status cannot be set with the profile, it is set without it,
+        so that the status does not stay at Running.
+        '''
+        try:
+            self.set_status(
+                status,
+                message=message,
+                additional_status_info=dict(additional_status_info, profile=self.recorder.to_json()))
+        # pylint:disable=broad-except
+        except Exception as error_handle:
+            self.logger.error('Error setting the status with the profile: {}'.format(error_handle))
+            self.set_status(status, message=message, additional_status_info=additional_status_info)
@@ -7,6 +7,7 @@ Responsible for:
 from collections import defaultdict, namedtuple
 import numpy as np
 import logging
+from . import sparse
 
 def _score_to_cost(score, scaling_factor=100):
     '''
@@ -20,6 +21,36 @@ class EncoderError(Exception):
     '''Exception wrapper class for errors related to Encoder'''
     pass
 
+def _edge_columns(edges):
+    '''
+    Return the (paper ID, reviewer ID, value) columns of a collection of edges.
+
+    `edges` is either a list of triples, or a columnar object whose 'head', 'tail'
+    and 'weight' columns can be looked up by name (e.g. a dict of numpy arrays,
+    a pyarrow.Table or a pandas.DataFrame).
+    '''
+    if isinstance(edges, (list, tuple)):
+        return (
+            [edge[0] for edge in edges],
+            [edge[1] for edge in edges],
+            [edge[2] for edge in edges]
+        )
+    return edges['head'], edges['tail'], edges['weight']
+
+def _index_column(ids, index_by_id, kind):
+    '''
+    Map a whole column of IDs to an array of indices, using the mapping `index_by_id`.
+    Each ID is still looked up with a call to index_by_id.__getitem__, but numpy.fromiter
+    fills the array straight from the lookups, without intermediate lists or per-edge tuples.
+    '''
+    if not isinstance(ids, list):
+        ids = np.asarray(ids).tolist()
+
+    try:
+        return np.fromiter(map(index_by_id.__getitem__, ids), dtype=int, count=len(ids))
+    except KeyError as error_handle:
+        raise EncoderError('Unknown {} ID: {}'.format(kind, error_handle))
+
 class Encoder:
     '''
     Responsible for keeping track of paper and reviewer indexes.
@@ -37,10 +68,11 @@ class Encoder:
 
     - `scores_by_type`:
         a dict, keyed on string IDs representing score 'types',
-        where each value is a list of triples, formatted as follows:
+        where each value is a dict with an optional 'default' score and
+        an 'edges' list of triples, formatted as follows:
         (<str paper_ID>, <str reviewer_ID>, <float score>)
 
-   - `weight_by_type`:
+    - `weight_by_type`:
         a dict, keyed on string IDs that match those in `scores_by_type`,
         where each value is a float, indicating the relative weight of the corresponding
         score type.
@@ -52,6 +84,18 @@ class Encoder:
         a list of triples, formatted as follows:
         (<str paper_ID>, <str reviewer_ID>, <float limit>)
         OR a float, indicating the probability limit for all reviewer-paper pairs
+
+    Constraints, score edges and probability limits may also be given in columnar form:
+    any object with 'head' (paper ID), 'tail' (reviewer ID) and 'weight' columns,
+    such as a dict of numpy arrays or a pyarrow.Table. Whole columns are converted
+    to indices at once.
+
+    - `sparse`:
+        False (default) or True. If True, the score, constraint, probability limit,
+        aggregate score and cost matrices are stored as scipy.sparse CSR matrices
+        that only hold the pairs with real edges. Every other pair takes on a default value,
+        stored in `score_defaults`, `aggregate_score_default`, `cost_default` and
+        `prob_limit_default` (constraints always default to 0).
     '''
     def __init__(
             self,
@@ -62,52 +106,75 @@ class Encoder:
             weight_by_type,
             normalization_types=[],
             probability_limits=[],
+            sparse=False,
             logger=logging.getLogger(__name__)
         ):
         self.logger = logger
 
         self.reviewers = reviewers
         self.papers = papers
+        self.sparse = sparse
 
         self.index_by_user = {r: i for i, r in enumerate(self.reviewers)}
         self.index_by_forum = {n: i for i, n in enumerate(self.papers)}
 
         self.logger.debug('Init encoding')
         self.logger.info('Use normalization={}'.format(normalization_types))
+        self.logger.info('Use sparse encoding={}'.format(sparse))
 
         self.matrix_shape = (
             len(self.papers),
             len(self.reviewers)
         )
 
-        self.score_matrices = {
-            score_type: self._encode_scores(scores) for score_type, scores in scores_by_type.items()
+        self.score_defaults = {
+            score_type: scores.get('default', 0) for score_type, scores in scores_by_type.items()
         }
 
+        if self.sparse:
+            self.score_matrices = {
+                score_type: self._encode_sparse_scores(scores) for score_type, scores in scores_by_type.items()
+            }
+            self.constraint_matrix = self._encode_sparse_constraints(constraints)
+            self.prob_limit_matrix = self._encode_sparse_probability_limits(probability_limits)
+            self._encode_sparse_aggregate(weight_by_type, normalization_types)
+        else:
+            self.score_matrices = {
+                score_type: self._encode_scores(scores) for score_type, scores in scores_by_type.items()
+            }
+            self.constraint_matrix = self._encode_constraints(constraints)
+            self.prob_limit_matrix = self._encode_probability_limits(probability_limits)
+            self.aggregate_score_matrix = self._aggregate(
+                weight_by_type, normalization_types, self.score_matrices, self.matrix_shape)
+
+        self.cost_matrix = _score_to_cost(self.aggregate_score_matrix)
+
+    def _aggregate(self, weight_by_type, normalization_types, scores_by_type, shape):
+        '''
+        Combine the scores of each type into a weighted aggregate score of the given shape.
+        Works on dense matrices as well as on flat arrays of per-pair scores.
+        '''
         with_normalization_matrices = {}
         without_normalization_matrices = {}
 
-        for score_type, scores in self.score_matrices.items():
+        for score_type, scores in scores_by_type.items():
             if score_type in normalization_types:
                 with_normalization_matrices[score_type] = scores
             else:
                 without_normalization_matrices[score_type] = scores
 
-        self.constraint_matrix = self._encode_constraints(constraints)
-        self.prob_limit_matrix = self._encode_probability_limits(probability_limits)
-
         # don't use numpy.sum() here. it will collapse the matrices into a single value.
-        self.aggregate_score_matrix = np.full(self.matrix_shape, 0, dtype=float)
+        aggregate_score_matrix = np.full(shape, 0, dtype=float)
 
         if without_normalization_matrices:
-            self.aggregate_score_matrix = sum([
+            aggregate_score_matrix = sum([
                 scores * weight_by_type[score_type] for score_type, scores in without_normalization_matrices.items()
             ])
 
         if with_normalization_matrices:
-            self.aggregate_score_matrix += self._normalize(weight_by_type, with_normalization_matrices)
+            aggregate_score_matrix += self._normalize(weight_by_type, with_normalization_matrices)
 
-        self.cost_matrix = _score_to_cost(self.aggregate_score_matrix)
+        return aggregate_score_matrix
 
     def _normalize(self, weight_by_type, with_normalization_matrices):
 
@@ -121,27 +188,31 @@ class Encoder:
             scores * weight_by_type[score_type] for score_type, scores in with_normalization_matrices.items()
         ]))
 
+    def _edge_indices(self, edges, dtype):
+        '''
+        return arrays of paper indices, reviewer indices, and values (of type `dtype`)
+        for a list of triples or a columnar collection of edges.
+        '''
+        forums, users, values = _edge_columns(edges)
+        rows = _index_column(forums, self.index_by_forum, 'paper')
+        cols = _index_column(users, self.index_by_user, 'reviewer')
+        return rows, cols, np.asarray(values, dtype=dtype)
+
     def _encode_scores(self, scores):
         '''return a matrix containing unweighted scores.'''
         default = scores.get('default', 0)
-        edges = scores.get('edges', [])
+        rows, cols, values = self._edge_indices(scores.get('edges', []), dtype=float)
         score_matrix = np.full(self.matrix_shape, default, dtype=float)
-
-        for forum, user, score in edges:
-            coordinates = (self.index_by_forum[forum], self.index_by_user[user])
-            score_matrix[coordinates] = score
-
+        score_matrix[rows, cols] = values
         return score_matrix
 
     def _encode_constraints(self, constraints):
         '''
         return a matrix containing constraint values. label should have no bearing on the outcome.
         '''
+        rows, cols, values = self._edge_indices(constraints, dtype=int)
         constraint_matrix = np.full(self.matrix_shape, 0, dtype=int)
-        for forum, user, constraint in constraints:
-            coordinates = (self.index_by_forum[forum], self.index_by_user[user])
-            constraint_matrix[coordinates] = constraint
-
+        constraint_matrix[rows, cols] = values
         return constraint_matrix
 
     def _encode_probability_limits(self, probability_limits):
@@ -150,63 +221,209 @@ class Encoder:
         '''
         if isinstance(probability_limits, float):
             prob_limit_matrix = np.full(self.matrix_shape, probability_limits, dtype=float)
-        else: # list of tuples
+        else: # triples or columns
+            rows, cols, values = self._edge_indices(probability_limits, dtype=float)
             prob_limit_matrix = np.full(self.matrix_shape, 1, dtype=float) # default to no limit
-            for forum, user, limit in probability_limits:
-                coordinates = (self.index_by_forum[forum], self.index_by_user[user])
-                prob_limit_matrix[coordinates] = limit
+            prob_limit_matrix[rows, cols] = values
         return prob_limit_matrix
 
+    def _encode_sparse_scores(self, scores):
+        '''return a sparse matrix containing unweighted scores for the pairs with edges.'''
+        rows, cols, values = self._edge_indices(scores.get('edges', []), dtype=float)
+        return sparse.from_entries(rows, cols, values, self.matrix_shape, dtype=float)
+
+    def _encode_sparse_constraints(self, constraints):
+        '''return a sparse matrix containing constraint values for the pairs with constraint edges.'''
+        rows, cols, values = self._edge_indices(constraints, dtype=int)
+        return sparse.from_entries(rows, cols, values, self.matrix_shape, dtype=int)
+
+    def _encode_sparse_probability_limits(self, probability_limits):
+        '''return a sparse matrix containing the probability limits that differ from the default.'''
+        if isinstance(probability_limits, float):
+            self.prob_limit_default = probability_limits
+            probability_limits = []
+        else:
+            self.prob_limit_default = 1.0 # default to no limit
+
+        rows, cols, values = self._edge_indices(probability_limits, dtype=float)
+        return sparse.from_entries(rows, cols, values, self.matrix_shape, dtype=float)
+
+    def _encode_sparse_aggregate(self, weight_by_type, normalization_types):
+        '''
+        Compute aggregate scores only for the pairs with at least one score edge.
+        All other pairs share one default aggregate score, computed from the score defaults.
+        '''
+        num_reviewers = self.matrix_shape[1]
+        pair_indices = [np.array([], dtype=int)]
+        for score_matrix in self.score_matrices.values():
+            rows, cols, _ = sparse.entries(score_matrix)
+            pair_indices.append(rows * num_reviewers + cols)
+
+        pair_indices = np.unique(np.concatenate(pair_indices))
+        rows = pair_indices // max(num_reviewers, 1)
+        cols = pair_indices % max(num_reviewers, 1)
+
+        scores_on_pairs = {
+            score_type: sparse.lookup(score_matrix, rows, cols, default=self.score_defaults[score_type])
+            for score_type, score_matrix in self.score_matrices.items()
+        }
+        default_scores = {
+            score_type: np.asarray(float(default)) for score_type, default in self.score_defaults.items()
+        }
+
+        aggregate_scores = self._aggregate(weight_by_type, normalization_types, scores_on_pairs, rows.shape)
+        self.aggregate_score_default = float(
+            self._aggregate(weight_by_type, normalization_types, default_scores, ()))
+        self.cost_default = _score_to_cost(self.aggregate_score_default)
+
+        self.aggregate_score_matrix = sparse.from_entries(
+            rows, cols, aggregate_scores, self.matrix_shape, dtype=float)
+
+    def _aggregate_scores(self, paper_indices, reviewer_indices):
+        '''return a list with the aggregate scores of the given paper-reviewer pairs.'''
+        if self.sparse:
+            scores = sparse.lookup(
+                self.aggregate_score_matrix, paper_indices, reviewer_indices,
+                default=self.aggregate_score_default)
+        else:
+            scores = self.aggregate_score_matrix[paper_indices, reviewer_indices]
+        return scores.tolist()
+
+    def _group_entries(self, paper_indices, reviewer_indices):
+        '''
+        Turn aligned arrays of paper and reviewer indices (grouped by paper) into a dictionary,
+        keyed on forum IDs, with lists containing dicts representing users.
+        '''
+        entries_by_forum = defaultdict(list)
+        scores = self._aggregate_scores(paper_indices, reviewer_indices)
+
+        for paper_index, reviewer_index, score in zip(paper_indices.tolist(), reviewer_indices.tolist(), scores):
+            entries_by_forum[self.papers[paper_index]].append({
+                'aggregate_score': score,
+                'user': self.reviewers[reviewer_index]
+            })
+
+        return entries_by_forum
 
     def decode_assignments(self, flow_matrix):
         '''
         Return a dictionary, keyed on forum IDs, with lists containing dicts
         representing assigned users.
         '''
-        assignments_by_forum = defaultdict(list)
-
-        for paper_index, paper_flows in enumerate(flow_matrix):
-            paper_id = self.papers[paper_index]
-            for reviewer_index, flow in enumerate(paper_flows):
-                reviewer = self.reviewers[reviewer_index]
+        if sparse.issparse(flow_matrix):
+            paper_indices, reviewer_indices, flows = sparse.entries(flow_matrix)
+            assigned = flows != 0
+            paper_indices, reviewer_indices = paper_indices[assigned], reviewer_indices[assigned]
+        else:
+            paper_indices, reviewer_indices = np.nonzero(flow_matrix)
 
-                if flow:
-                    coordinates = (paper_index, reviewer_index)
-                    paper_user_entry = {
-                        'aggregate_score': self.aggregate_score_matrix[coordinates],
-                        'user': reviewer
-                    }
-                    assignments_by_forum[paper_id].append(paper_user_entry)
+        return dict(self._group_entries(paper_indices, reviewer_indices))
 
-        return dict(assignments_by_forum)
-
-    def decode_alternates(self, flow_matrix, num_alternates):
+    def decode_alternates(self, flow_matrix, num_alternates, chunk_size=10000000):
         '''
         Return a dictionary, keyed on forum IDs, with lists containing dicts
         representing alternate suggested users.
 
+        Alternates are the `num_alternates` highest scoring unassigned reviewers of each paper,
+        with ties broken by reviewer index. Papers are processed in chunks of about
+        `chunk_size` paper-reviewer pairs to bound the size of temporary arrays.
+        '''
+        if self.sparse:
+            return self._decode_sparse_alternates(flow_matrix, num_alternates)
+
+        num_papers, num_reviewers = self.matrix_shape
+        num_alternates = min(num_alternates, num_reviewers)
+        rows_per_chunk = max(1, chunk_size // max(num_reviewers, 1))
+
+        alternates_by_forum = {paper_id: [] for paper_id in self.papers}
+        if num_alternates <= 0:
+            return alternates_by_forum
+
+        for start in range(0, num_papers, rows_per_chunk):
+            stop = min(start + rows_per_chunk, num_papers)
+            paper_flows = flow_matrix[start:stop]
+            if sparse.issparse(paper_flows):
+                paper_flows = paper_flows.toarray()
+
+            paper_indices, reviewer_indices = self._top_unassigned(
+                self.aggregate_score_matrix[start:stop], paper_flows != 0, num_alternates)
+            alternates_by_forum.update(self._group_entries(paper_indices + start, reviewer_indices))
+
+        return alternates_by_forum
+
+    def _top_unassigned(self, scores, assigned, num_alternates):
         '''
-        alternates_by_forum = {}
+        Return aligned arrays of row and column indices of the `num_alternates` highest scoring
+        unassigned pairs in each row, ordered by row, then by decreasing score, then by column.
+        '''
+        # alternates must not be assigned
+        masked = np.where(assigned, -np.inf, scores)
 
-        for paper_index, paper_flows in enumerate(flow_matrix):
-            paper_id = self.papers[paper_index]
-            unassigned = []
-            for reviewer_index, flow in enumerate(paper_flows):
-                reviewer = self.reviewers[reviewer_index]
+        # the k-th highest unassigned score of each row is the cutoff for being selected.
+        kth_scores = -np.partition(-masked, num_alternates - 1, axis=1)[:, num_alternates - 1]
+        above = masked > kth_scores[:, None]
 
-                # alternates must not be assigned
-                if not flow:
-                    coordinates = (paper_index, reviewer_index)
-                    paper_user_entry = {
-                        'aggregate_score': self.aggregate_score_matrix[coordinates],
-                        'user': reviewer
-                    }
-                    unassigned.append(paper_user_entry)
+        # among pairs tied with the cutoff, keep the lowest reviewer indices (like a stable sort)
+        tied = (masked == kth_scores[:, None]) & ~assigned
+        num_tied_needed = num_alternates - np.count_nonzero(above, axis=1)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= num_tied_needed[:, None]))
 
-            unassigned.sort(key=lambda entry: entry['aggregate_score'], reverse=True)
+        rows, cols = np.nonzero(selected)
+        order = np.lexsort((cols, -scores[rows, cols], rows))
+        return rows[order], cols[order]
 
-            alternates_by_forum[paper_id] = unassigned[:num_alternates]
+    def _decode_sparse_alternates(self, flow_matrix, num_alternates):
+        '''
+        Same as `decode_alternates`, for a sparse aggregate score matrix.
 
+        Only the pairs with score edges are ranked individually. Reviewers without an edge
+        all share the default aggregate score, so only the first `num_alternates` of them
+        (by index) can ever be selected.
+        '''
+        alternates_by_forum = {paper_id: [] for paper_id in self.papers}
+        if num_alternates <= 0:
+            return alternates_by_forum
+
+        scores = self.aggregate_score_matrix
+        if sparse.issparse(flow_matrix):
+            flow_matrix = flow_matrix.tocsr(copy=True)
+            flow_matrix.eliminate_zeros()
+        else:
+            flow_matrix = sparse.from_entries(
+                *np.nonzero(flow_matrix), np.ones(np.count_nonzero(flow_matrix)), self.matrix_shape)
+
+        # candidates with score edges; alternates must not be assigned
+        rows, cols, candidate_scores = sparse.entries(scores)
+        unassigned = sparse.lookup(flow_matrix, rows, cols) == 0
+        rows, cols, candidate_scores = rows[unassigned], cols[unassigned], candidate_scores[unassigned]
+
+        # candidates without score edges: the first unassigned reviewers of each paper
+        default_rows, default_cols = [], []
+        for paper_index in range(self.matrix_shape[0]):
+            excluded = set(scores.indices[scores.indptr[paper_index]:scores.indptr[paper_index + 1]].tolist())
+            excluded.update(flow_matrix.indices[flow_matrix.indptr[paper_index]:flow_matrix.indptr[paper_index + 1]].tolist())
+
+            num_defaults = 0
+            for reviewer_index in range(self.matrix_shape[1]):
+                if num_defaults >= num_alternates:
+                    break
+                if reviewer_index not in excluded:
+                    default_rows.append(paper_index)
+                    default_cols.append(reviewer_index)
+                    num_defaults += 1
+
+        rows = np.concatenate([rows, np.array(default_rows, dtype=int)])
+        cols = np.concatenate([cols, np.array(default_cols, dtype=int)])
+        candidate_scores = np.concatenate([
+            candidate_scores, np.full(len(default_rows), self.aggregate_score_default)])
+
+        # highest score first; ties are broken by reviewer index, as in the dense case
+        order = np.lexsort((cols, -candidate_scores, rows))
+        rows, cols = rows[order], cols[order]
+        row_starts = np.searchsorted(rows, rows, side='left')
+        keep = np.arange(len(rows)) - row_starts < num_alternates
+
+        alternates_by_forum.update(self._group_entries(rows[keep], cols[keep]))
         return alternates_by_forum
 
     def decode_selected_alternates(self, alternates_by_index):
@@ -216,16 +433,16 @@ class Encoder:
         into a dictionary of alternates keyed on IDs. Used by RandomizedSolver
         to carefully choose alternates.
         '''
-        alternates_by_forum = {}
-        for paper_index, reviewer_indices in alternates_by_index.items():
-            paper_id = self.papers[paper_index]
-            reviewer_list = []
-            for reviewer_index in reviewer_indices:
-                reviewer_id = self.reviewers[reviewer_index]
-                entry = {
-                    'aggregate_score': self.aggregate_score_matrix[(paper_index, reviewer_index)],
-                    'user': reviewer_id
-                }
-                reviewer_list.append(entry)
-            alternates_by_forum[paper_id] = reviewer_list
+        alternates_by_forum = {self.papers[paper_index]: [] for paper_index in alternates_by_index}
+
+        paper_indices = np.array([
+            paper_index
+            for paper_index, reviewer_indices in alternates_by_index.items()
+            for _ in reviewer_indices], dtype=int)
+        reviewer_indices = np.array([
+            reviewer_index
+            for reviewer_indices in alternates_by_index.values()
+            for reviewer_index in reviewer_indices], dtype=int)
+
+        alternates_by_forum.update(self._group_entries(paper_indices, reviewer_indices))
         return alternates_by_forum
@@ -0,0 +1,70 @@
+'''
+Records the duration and memory use of the phases of a match.
+
+A PhaseRecorder is created by Matcher.run and handed to the solver, so that the solver can
+record its own stages inside the "solve" phase:
+
+    recorder = PhaseRecorder()
+    with recorder.phase('solve'):
+        with recorder.phase('min_flow'):
+            ...
+
+records the phases "solve" and "solve/min_flow". Each phase records its wall-clock duration in
+seconds and the peak resident set size of the process, in bytes, when it ended. The peak is
+the highest the process has reached so far, so it only grows from one phase to the next.
+'''
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+def peak_rss():
+    '''Return the peak resident set size of the process in bytes, or None if it is not available'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class PhaseRecorder:
+    '''Records the duration and peak resident set size of named, possibly nested, phases.'''
+    def __init__(self):
+        self.phases = []
+        self._names = []
+        self._start_time = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, **info):
+        '''
+        Record the phase `name` for the duration of the with-block. Keyword arguments,
+        e.g. the makespan probed by a FairFlow iteration, are recorded with the phase.
+        Phases are listed in the order in which they start.
+        '''
+        self._names.append(name)
+        record = dict(name='/'.join(self._names), **info)
+        self.phases.append(record)
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start_time
+            record['peak_rss'] = peak_rss()
+            self._names.pop()
+
+    def to_dict(self):
+        '''Return the recorded phases, the time since the recorder was created and the current peak RSS'''
+        return {
+            'seconds': time.perf_counter() - self._start_time,
+            'peak_rss': peak_rss(),
+            'phases': [dict(record) for record in self.phases]
+        }
+
+    def to_json(self, **kwargs):
+        '''Return to_dict() serialized as JSON. Keyword arguments are passed to json.dumps.'''
+        return json.dumps(self.to_dict(), **kwargs)
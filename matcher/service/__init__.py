@@ -1,4 +1,5 @@
 import os
+import atexit
 import flask
 import logging, logging.handlers
 
@@ -53,6 +54,17 @@ def create_app(config=None):
 
     configure_logger(app)
 
+    from .scheduler import JobScheduler
+    app.extensions['match_scheduler'] = JobScheduler(
+        max_workers=app.config['MATCHER_MAX_WORKERS'],
+        max_queued_jobs=app.config['MATCHER_MAX_QUEUED_JOBS'],
+        max_total_size=app.config['MATCHER_MAX_TOTAL_SIZE'],
+        start_method=app.config['MATCHER_START_METHOD'],
+        logger=app.logger
+    )
+    # the match processes are not daemonic, so they would otherwise keep the server from exiting
+    atexit.register(app.extensions['match_scheduler'].shutdown)
+
     # The placement of this import statement is important!
     # It must come after the app is initialized, and imported in the same scope.
     from . import routes
@@ -1,14 +1,65 @@
 import re
+import copy
+import time
+import threading
 import openreview
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import requests
 from tqdm import tqdm
 from matcher.encoder import EncoderError
 from matcher.core import MatcherError, MatcherStatus
 
+class EdgeColumns:
+    '''
+    Edges stored as 'head' (paper ID), 'tail' (reviewer ID) and 'weight' columns,
+    which the Encoder reads a whole column at a time.
+    Iterating yields (head, tail, weight) triples.
+    '''
+    def __init__(self, head, tail, weight):
+        self.head = head
+        self.tail = tail
+        self.weight = weight
+
+    def __getitem__(self, column):
+        if column not in ('head', 'tail', 'weight'):
+            raise KeyError(column)
+        return getattr(self, column)
+
+    def __len__(self):
+        return len(self.head)
+
+    def __iter__(self):
+        return zip(self.head, self.tail, self.weight)
+
+class EdgeJson(dict):
+    '''
+    Serialized edge, as produced by openreview.Edge.to_json, that can be posted
+    in place of an openreview.Edge object.
+    '''
+    def to_json(self):
+        return self
+
 class ConfigNoteInterface:
-    def __init__(self, client, config_note_id, logger=logging.getLogger(__name__)):
+    def __init__(
+                self,
+                client,
+                config_note_id,
+                logger=logging.getLogger(__name__),
+                max_fetch_workers=8,
+                max_post_workers=4,
+                post_batch_size=10000,
+                post_retries=3,
+                post_retry_delay=1
+            ):
         self.client = client
         self.logger = logger
+        self.max_fetch_workers = max_fetch_workers
+        self.max_post_workers = max_post_workers
+        self.post_batch_size = post_batch_size
+        self.post_retries = post_retries
+        self.post_retry_delay = post_retry_delay
         self.logger.debug('GET note id={}'.format(config_note_id))
         self.config_note = self.client.get_note(config_note_id)
         self.venue_id = self.config_note.signatures[0]
@@ -21,7 +72,13 @@ class ConfigNoteInterface:
         self.num_alternates = int(self.config_note.content['alternates'])
         self.paper_numbers = {}
         self.allow_zero_score_assignments = (self.config_note.content.get('allow_zero_score_assignments', 'No') == 'Yes')
+        self.sparse = (self.config_note.content.get('sparse_encoding', 'No') == 'Yes')
         self.probability_limits = float(self.config_note.content.get('randomized_probability_limits', 1.0))
+        seed = self.config_note.content.get('seed')
+        self.seed = int(seed) if seed not in (None, '') else None
+        self.num_processes = int(self.config_note.content.get('fairflow_num_processes', 1))
+        candidate_limit = self.config_note.content.get('fairflow_candidate_limit')
+        self.candidate_limit = int(candidate_limit) if candidate_limit not in (None, '') else None
 
         # Lazy variables
         self._reviewers = None
@@ -31,6 +88,10 @@ class ConfigNoteInterface:
         self._maximums = None
         self._demands = None
         self._constraints = None
+        self._custom_supply_edges = None
+        self._custom_demand_edges = None
+        self._edges_by_invitation = None
+        self._edge_builders = {}
 
         self.validate_score_spec()
 
@@ -52,43 +113,107 @@ class ConfigNoteInterface:
     @property
     def reviewers(self):
         if self._reviewers is None:
-            self.logger.debug('GET group id={}'.format(self.match_group))
-            match_group = self.client.get_group(self.match_group)
-            self._reviewers = match_group.members
+            self._fetch_all()
         return self._reviewers
 
     @property
     def papers(self):
         if self._papers is None:
-            content_dict = {}
-            paper_invitation = self.config_note.content['paper_invitation']
-            self.logger.debug('Getting notes for invitation: {}'.format(paper_invitation))
-            if '&' in paper_invitation:
-                elements = paper_invitation.split('&')
-                paper_invitation = elements[0]
-                for element in elements[1:]:
-                    if element:
-                        if element.startswith('content.') and '=' in element:
-                            key, value = element.split('.')[1].split('=')
-                            content_dict[key] = value
-                        else:
-                            self.logger.debug('Invalid filter provided in invitation: {}. Supported filter format "content.field_x=value1".'.format(element))
-            if '/-/' in paper_invitation:
-                paper_notes = list(openreview.tools.iterget_notes(
-                    self.client,
-                    invitation=paper_invitation,
-                    content=content_dict))
-                self._papers = [n.id for n in paper_notes]
-                self.paper_numbers = { n.id : n.number for n in paper_notes }
-                self.logger.debug('Count of notes found: {}'.format(len(self._papers)))
-            else:
-                self.logger.debug('GET group id={}'.format(paper_invitation))
-                group = self.client.get_group(paper_invitation)
-                self._papers = group.members
-                self.paper_numbers = { n: 1 for n in group.members }
-
+            self._fetch_all()
         return self._papers
 
+    def _fetch_all(self):
+        '''
+        Fetch the reviewers, the papers, the custom supply and demand edges and the edges
+        of the conflicts and score invitations concurrently, over a pool of at most
+        `max_fetch_workers` threads sharing self.client, so that loading takes about as long
+        as the slowest request. The results are kept in the lazy variables.
+        The edges are only requested once the reviewers and papers are known, so that each
+        worker keeps only the edges of the match as it reads its response, and converts
+        them to EdgeColumns before returning.
+        '''
+        if self._edges_by_invitation is not None:
+            return
+
+        edge_values = {
+            invitation_id: self._score_value(spec.get('translate_map'))
+            for invitation_id, spec in self.config_note.content.get('scores_specification', {}).items()}
+        conflicts_invitation = self.config_note.content.get('conflicts_invitation')
+        # an invitation used for both conflicts and scores is fetched again by _get_all_edges
+        if conflicts_invitation and conflicts_invitation not in edge_values:
+            edge_values[conflicts_invitation] = self._constraint_value
+
+        with ThreadPoolExecutor(max_workers=self.max_fetch_workers) as executor:
+            reviewers = papers = None
+            if self._reviewers is None:
+                reviewers = executor.submit(self._fetch_reviewers)
+            if self._papers is None:
+                papers = executor.submit(self._fetch_papers)
+            custom_supply_edges = executor.submit(self._get_custom_supply_edges)
+            custom_demand_edges = executor.submit(self._get_custom_demand_edges)
+
+            if reviewers:
+                self._reviewers = reviewers.result()
+            if papers:
+                self._papers, self.paper_numbers = papers.result()
+            match_papers = set(self._papers)
+            match_reviewers = set(self._reviewers)
+            edges = {
+                invitation_id: executor.submit(
+                    self._get_edge_columns, invitation_id, edge_value, match_papers, match_reviewers)
+                for invitation_id, edge_value in edge_values.items()}
+
+            self._custom_supply_edges = custom_supply_edges.result()
+            self._custom_demand_edges = custom_demand_edges.result()
+            self._edges_by_invitation = {
+                invitation_id: columns.result() for invitation_id, columns in edges.items()}
+
+    def estimate_size(self):
+        '''
+        Return the number of paper-reviewer pairs of the match, as an estimate of the size of the problem.
+        Only the reviewers and the papers are fetched; the edges are left for _fetch_all.
+        This takes one request for the match group and one per page of paper notes, and the
+        results are kept, so the match does not fetch the reviewers and papers again.
+        '''
+        if self._reviewers is None:
+            self._reviewers = self._fetch_reviewers()
+        if self._papers is None:
+            self._papers, self.paper_numbers = self._fetch_papers()
+        return len(self._reviewers) * len(self._papers)
+
+    def _fetch_reviewers(self):
+        self.logger.debug('GET group id={}'.format(self.match_group))
+        match_group = self.client.get_group(self.match_group)
+        return match_group.members
+
+    def _fetch_papers(self):
+        '''Return the paper ids and a dict of paper numbers by id'''
+        content_dict = {}
+        paper_invitation = self.config_note.content['paper_invitation']
+        self.logger.debug('Getting notes for invitation: {}'.format(paper_invitation))
+        if '&' in paper_invitation:
+            elements = paper_invitation.split('&')
+            paper_invitation = elements[0]
+            for element in elements[1:]:
+                if element:
+                    if element.startswith('content.') and '=' in element:
+                        key, value = element.split('.')[1].split('=')
+                        content_dict[key] = value
+                    else:
+                        self.logger.debug('Invalid filter provided in invitation: {}. Supported filter format "content.field_x=value1".'.format(element))
+        if '/-/' in paper_invitation:
+            paper_notes = list(openreview.tools.iterget_notes(
+                self.client,
+                invitation=paper_invitation,
+                content=content_dict))
+            papers = [n.id for n in paper_notes]
+            self.logger.debug('Count of notes found: {}'.format(len(papers)))
+            return papers, { n.id : n.number for n in paper_notes }
+
+        self.logger.debug('GET group id={}'.format(paper_invitation))
+        group = self.client.get_group(paper_invitation)
+        return group.members, { n: 1 for n in group.members }
+
     @property
     def minimums(self):
         if self._minimums is None:
@@ -138,7 +263,8 @@ class ConfigNoteInterface:
         if self._demands is None:
             user_demand_value = self.config_note.content.get('user_demand') if 'user_demand' in self.config_note.content else self.config_note.content['max_users']
             self._demands = [int(user_demand_value) for paper in self.papers]
-            custom_demand_edges = self._get_custom_demand_edges()
+            self._fetch_all()
+            custom_demand_edges = self._custom_demand_edges
             count_processed_edges = 0
             if custom_demand_edges:
                 map_papers_to_idx = { p: idx for idx, p in enumerate(self.papers) }
@@ -154,8 +280,8 @@ class ConfigNoteInterface:
     @property
     def constraints(self):
         if self._constraints is None:
-            self._constraints = [(edge['head'], edge['tail'], edge['weight']) for edge in self._get_all_edges(
-                self.config_note.content['conflicts_invitation'])]
+            self._constraints = self._get_all_edges(
+                self.config_note.content['conflicts_invitation'], self._constraint_value)
         return self._constraints
 
     @property
@@ -163,28 +289,11 @@ class ConfigNoteInterface:
         scores_specification = self.config_note.content.get('scores_specification', {})
 
         if not self._scores_by_type and scores_specification:
-            edges_by_invitation = {}
-            defaults_by_invitation = {}
-            for invitation_id, spec in scores_specification.items():
-                edges_by_invitation[invitation_id] = self._get_all_edges(invitation_id)
-                defaults_by_invitation[invitation_id] = spec.get('default', 0)
-
-            translate_maps = {
-                inv_id: score_spec['translate_map'] \
-                for inv_id, score_spec in scores_specification.items() \
-                if 'translate_map' in score_spec
-            }
-
-            for inv_id, edges in edges_by_invitation.items():
-                invitation_edges = [
-                    (
-                        edge['head'],
-                        edge['tail'],
-                        self._edge_to_score(edge, translate_map=translate_maps.get(inv_id))
-                    ) for edge in edges]
+            for inv_id, spec in scores_specification.items():
+                edges = self._get_all_edges(inv_id, self._score_value(spec.get('translate_map')))
                 self._scores_by_type[inv_id] = {
-                    'default': defaults_by_invitation[inv_id],
-                    'edges': invitation_edges
+                    'default': spec.get('default', 0),
+                    'edges': EdgeColumns(edges.head, edges.tail, np.array(edges.weight, dtype=float))
                 }
         return self._scores_by_type
 
@@ -200,32 +309,38 @@ class ConfigNoteInterface:
         return weight_by_type
 
     def set_status(self, status, message='', additional_status_info={}):
-        '''Set the status of the config note'''
-        self.config_note.content['status'] = status.value
-        self.config_note.content['error_message'] = message
+        '''
+        Set the status of the config note. The local config note is only updated once it has been
+        posted, so that a status that could not be posted does not stick to the next one.
+        '''
+        config_note = copy.copy(self.config_note)
+        config_note.content = dict(self.config_note.content, status=status.value, error_message=message)
         for key,value in additional_status_info.items():
-            print('Save property', key, value)
-            self.config_note.content[key] = value
+            self.logger.debug('Save property {}'.format(key))
+            config_note.content[key] = value
 
-        self.config_note = self.client.post_note(self.config_note)
+        self.config_note = self.client.post_note(config_note)
         self.logger.debug('status set to: {}'.format(self.config_note.content['status']))
 
+    def delete_edges(self):
+        '''Delete the assignment and aggregate score edges posted under the label of the match'''
+        for invitation in (self.assignment_invitation, self.aggregate_score_invitation):
+            self.logger.debug('DELETE edges invitation id={} label={}'.format(invitation.id, self.label))
+            self.client.delete_edges(invitation=invitation.id, label=self.label, wait_to_finish=True)
+
     def set_assignments(self, assignments_by_forum):
         '''Helper function for posting assignments returned by the Encoder'''
 
         self.logger.debug('saving {} edges'.format(self.assignment_invitation.id))
 
-        assignment_edges = []
-        score_edges = []
-
-        for forum, assignments in assignments_by_forum.items():
-            paper_number = self.paper_numbers[forum]
-            for paper_user_entry in assignments:
-                score = paper_user_entry['aggregate_score']
-                user = paper_user_entry['user']
+        def build_edges():
+            for forum, assignments in assignments_by_forum.items():
+                paper_number = self.paper_numbers[forum]
+                for paper_user_entry in assignments:
+                    score = paper_user_entry['aggregate_score']
+                    user = paper_user_entry['user']
 
-                assignment_edges.append(
-                    self._build_edge(
+                    yield self._build_edge(
                         self.assignment_invitation,
                         forum,
                         user,
@@ -233,10 +348,8 @@ class ConfigNoteInterface:
                         self.label,
                         paper_number
                     )
-                )
 
-                score_edges.append(
-                    self._build_edge(
+                    yield self._build_edge(
                         self.aggregate_score_invitation,
                         forum,
                         user,
@@ -244,26 +357,23 @@ class ConfigNoteInterface:
                         self.label,
                         paper_number
                     )
-                )
 
-        openreview.tools.post_bulk_edges(self.client, assignment_edges)
-        openreview.tools.post_bulk_edges(self.client, score_edges)
-        self.logger.debug('posted {} assignment edges'.format(len(assignment_edges)))
-        self.logger.debug('posted {} aggregate score edges'.format(len(score_edges)))
+        num_posted = self._post_edges(build_edges())
+        self.logger.debug('posted {} assignment edges'.format(num_posted.get(self.assignment_invitation.id, 0)))
+        self.logger.debug('posted {} aggregate score edges'.format(num_posted.get(self.aggregate_score_invitation.id, 0)))
 
     def set_alternates(self, alternates_by_forum):
         '''Helper function for posting alternates returned by the Encoder'''
 
-        score_edges = []
-        for forum, assignments in alternates_by_forum.items():
-            paper_number = self.paper_numbers[forum]
+        def build_edges():
+            for forum, assignments in alternates_by_forum.items():
+                paper_number = self.paper_numbers[forum]
 
-            for paper_user_entry in assignments:
-                score = paper_user_entry['aggregate_score']
-                user = paper_user_entry['user']
+                for paper_user_entry in assignments:
+                    score = paper_user_entry['aggregate_score']
+                    user = paper_user_entry['user']
 
-                score_edges.append(
-                    self._build_edge(
+                    yield self._build_edge(
                         self.aggregate_score_invitation,
                         forum,
                         user,
@@ -271,17 +381,107 @@ class ConfigNoteInterface:
                         self.label,
                         paper_number
                     )
-                )
 
-        openreview.tools.post_bulk_edges(self.client, score_edges)
-        self.logger.debug('posted {} aggregate score edges for alternates'.format(len(score_edges)))
+        num_posted = self._post_edges(build_edges())
+        self.logger.debug('posted {} aggregate score edges for alternates'.format(
+            num_posted.get(self.aggregate_score_invitation.id, 0)))
+
+    def _post_edges(self, edges):
+        '''
+        Post `edges`, an iterable of edges built by _build_edge, in chunks of `post_batch_size`
+        edges of one invitation. Up to `max_post_workers` chunks are posted at the same time
+        while the next chunks are being built.
+        Returns the number of edges posted by invitation ID.
+        '''
+        # shared by the retries of the chunks, see _get_unposted_edges
+        self._post_lock = threading.Lock()
+        self._post_failures = 0
+        self._posted_edges = {}
+
+        num_posted = {}
+        with ThreadPoolExecutor(max_workers=self.max_post_workers) as executor:
+            pending = set()
+            for chunk in self._chunk_edges(edges):
+                if len(pending) >= self.max_post_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self._post_chunk, chunk))
+                invitation_id = chunk[0]['invitation']
+                num_posted[invitation_id] = num_posted.get(invitation_id, 0) + len(chunk)
+
+            for future in pending:
+                future.result()
+
+        return num_posted
+
+    def _chunk_edges(self, edges):
+        '''Yield lists of up to `post_batch_size` edges, all of the same invitation'''
+        chunks = {}
+        for edge in edges:
+            chunk = chunks.setdefault(edge['invitation'], [])
+            chunk.append(edge)
+            if len(chunk) >= self.post_batch_size:
+                yield chunks.pop(edge['invitation'])
+
+        yield from chunks.values()
+
+    def _post_chunk(self, chunk):
+        '''
+        Post a chunk of edges, retrying failed requests.
+        Before retrying, the edges that were saved by the failed request are left out,
+        so that every edge is posted exactly once.
+        '''
+        for attempt in range(self.post_retries + 1):
+            try:
+                if attempt:
+                    chunk = self._get_unposted_edges(chunk, failure)
+                if chunk:
+                    self.client.post_edges(chunk)
+                return
+            except (openreview.OpenReviewException, requests.exceptions.RequestException) as error_handle:
+                if attempt == self.post_retries:
+                    raise
+                with self._post_lock:
+                    self._post_failures += 1
+                    failure = self._post_failures
+                self.logger.debug('Error posting {} edges, retrying: {}'.format(len(chunk), error_handle))
+                time.sleep(self.post_retry_delay * 2 ** attempt)
+
+    def _get_unposted_edges(self, chunk, failure):
+        '''
+        Return the edges of `chunk` that have not been saved under the label of the match,
+        after the `failure`-th failed request of _post_edges.
+
+        The saved edges of an invitation are fetched with one request, and shared by the retries
+        of all chunks until another request fails, since that request may have saved edges too.
+        A saved edge only counts as posted if it also has the weight of the edge in `chunk`.
+        '''
+        invitation_id = chunk[0]['invitation']
+        with self._post_lock:
+            fetched_after, posted = self._posted_edges.get(invitation_id, (0, None))
+            if posted is None or fetched_after < failure:
+                fetched_after = self._post_failures
+                self.logger.debug('GET grouped edges invitation id={} label={}'.format(invitation_id, self.label))
+                posted_edges = self.client.get_grouped_edges(
+                    invitation=invitation_id,
+                    label=self.label,
+                    groupby='head',
+                    select='tail,weight'
+                )
+                posted = {
+                    (group['id']['head'], edge['tail'], edge['weight'])
+                    for group in posted_edges for edge in group['values']}
+                self._posted_edges[invitation_id] = (fetched_after, posted)
+        return [edge for edge in chunk if (edge['head'], edge['tail'], edge['weight']) not in posted]
 
     def _get_quota_arrays(self):
         '''get `minimum` and `maximum` reviewer load arrays, accounting for custom loads'''
         minimums = [int(self.config_note.content['min_papers']) for r in self.reviewers]
         maximums = [int(self.config_note.content['max_papers']) for r in self.reviewers]
 
-        custom_supply_edges = self._get_custom_supply_edges()
+        self._fetch_all()
+        custom_supply_edges = self._custom_supply_edges
         if custom_supply_edges:
             map_reviewers_to_idx = { r: idx for idx, r in enumerate(self.reviewers) }
 
@@ -298,12 +498,44 @@ class ConfigNoteInterface:
 
         return minimums, maximums
 
-    def _get_all_edges(self, edge_invitation_id):
-        '''Helper function for retrieving and parsing all edges in bulk'''
+    def _get_all_edges(self, edge_invitation_id, edge_value):
+        '''
+        Helper function for retrieving all edges of an invitation between the papers and reviewers
+        of the match, as EdgeColumns whose values are given by `edge_value(edge)`.
+        The edges fetched by _fetch_all are released once they have been read.
+        '''
+        self._fetch_all()
+        edges = self._edges_by_invitation.pop(edge_invitation_id, None)
+        if edges is None:
+            edges = self._get_edge_columns(edge_invitation_id, edge_value, set(self.papers), set(self.reviewers))
+        return edges
 
-        all_edges = []
-        all_papers = { p: p for p in self.papers }
-        all_reviewers = { r: r for r in self.reviewers }
+    def _get_edge_columns(self, edge_invitation_id, edge_value, papers, reviewers):
+        '''
+        Return the edges of an invitation between `papers` and `reviewers` as EdgeColumns whose values
+        are given by `edge_value(edge)`; the other edges are skipped without being evaluated.
+        The grouped edges returned by the API are released once they have been converted.
+        '''
+        heads, tails, values = [], [], []
+        for group in self._get_grouped_edges(edge_invitation_id):
+            forum_id = group['id']['head']
+            if forum_id in papers:
+                for edge in group['values']:
+                    if edge['tail'] in reviewers:
+                        heads.append(forum_id)
+                        tails.append(edge['tail'])
+                        values.append(edge_value(edge))
+        return EdgeColumns(heads, tails, values)
+
+    def _constraint_value(self, edge):
+        return edge.get('weight')
+
+    def _score_value(self, translate_map):
+        '''Return a function giving the score of an edge, translating its label with `translate_map`'''
+        return lambda edge: self._edge_to_score(edge, translate_map=translate_map)
+
+    def _get_grouped_edges(self, edge_invitation_id):
+        '''Helper function for retrieving all edges of an invitation in bulk, grouped by paper'''
         self.logger.debug('GET invitation id={}'.format(edge_invitation_id))
 
         edges_grouped_by_paper = self.client.get_grouped_edges(
@@ -313,36 +545,52 @@ class ConfigNoteInterface:
         )
 
         self.logger.debug('GET grouped edges invitation id={}'.format(edge_invitation_id))
-        filtered_edges_groups = list(filter(lambda edge_group: edge_group['id']['head'] in all_papers, edges_grouped_by_paper))
-
-        for group in filtered_edges_groups:
-            forum_id = group['id']['head']
-            filtered_edges = list(filter(lambda group_value: group_value['tail'] in all_reviewers, group['values']))
-            for edge in filtered_edges:
-                all_edges.append({
-                    'invitation': edge_invitation_id,
-                    'head': forum_id,
-                    'tail': edge['tail'],
-                    'weight': edge.get('weight'),
-                    'label': edge.get('label')
-                })
-        return all_edges
+        return edges_grouped_by_paper
 
     def _build_edge(self, invitation, forum_id, reviewer, score, label, number):
         '''
-        Helper function for constructing an openreview.Edge object.
+        Helper function for constructing a serialized openreview.Edge, ready to be posted.
         Readers, nonreaders, writers, and signatures are automatically filled based on the invitaiton.
         '''
-        return openreview.Edge(
-            head = forum_id,
-            tail = reviewer,
-            weight = score,
-            label = label,
-            invitation = invitation.id,
-            readers = self._get_values(invitation, number, 'readers', forum_id, reviewer),
-            nonreaders = self._get_values(invitation, number, 'nonreaders'),
-            writers = self._get_values(invitation, number, 'writers'),
-            signatures = [self.venue_id])
+        build_edge = self._edge_builders.get(invitation.id)
+        if build_edge is None:
+            build_edge = self._edge_builders[invitation.id] = self._edge_builder(invitation)
+        return build_edge(forum_id, reviewer, score, label, number)
+
+    def _edge_builder(self, invitation):
+        '''
+        Return a function that constructs the edges of `invitation` like _build_edge.
+        The readers, nonreaders and writers of the invitation are parsed once into templates,
+        which are filled in once per paper number; only the head and tail are filled in per edge.
+        '''
+        head, tail = '\0head\0', '\0tail\0'
+        templates = (
+            self._get_values(invitation, '{head.number}', 'readers', head, tail),
+            self._get_values(invitation, '{head.number}', 'nonreaders'),
+            self._get_values(invitation, '{head.number}', 'writers'))
+        values_by_number = {}
+
+        def build_edge(forum_id, reviewer, score, label, number):
+            values = values_by_number.get(number)
+            if values is None:
+                values = values_by_number[number] = [
+                    [v.replace('{head.number}', str(number)) for v in template] for template in templates]
+            readers, nonreaders, writers = values
+            return EdgeJson(
+                id=None,
+                cdate=None,
+                ddate=None,
+                invitation=invitation.id,
+                readers=[forum_id if v == head else reviewer if v == tail else v for v in readers],
+                nonreaders=list(nonreaders),
+                writers=list(writers),
+                signatures=[self.venue_id],
+                head=forum_id,
+                tail=reviewer,
+                weight=score,
+                label=label)
+
+        return build_edge
 
     def _get_values(self, invitation, number, property, head=None, tail=None):
         '''Return values compatible with the field `property` in invitation.reply.content'''
@@ -379,11 +627,11 @@ class ConfigNoteInterface:
         return a numeric score, given an Edge.
         '''
 
-        score = edge['weight']
+        score = edge.get('weight')
 
         if translate_map:
             try:
-                score = translate_map[edge['label']]
+                score = translate_map[edge.get('label')]
             except KeyError:
                 raise EncoderError(
                     'Cannot translate label {} to score. Valid labels are: {}'.format(
@@ -395,7 +643,7 @@ class ConfigNoteInterface:
             except ValueError:
                 raise EncoderError(
                     'Edge has weight that is neither float nor int: {}, type {}'.format(
-                        edge['weight'], type(edge['weight'])))
+                        edge.get('weight'), type(edge.get('weight'))))
 
         return score
 
@@ -6,11 +6,14 @@ TODO: could error handling be cleaner?
 import flask
 from flask_cors import CORS
 import threading
+from functools import partial
 import openreview
 
 from matcher import Matcher
+from matcher.core import MatcherStatus
 from .openreview_interface import ConfigNoteInterface
 from .openreview_interface import Deployment
+from .scheduler import JobSchedulerError, SchedulerFullError
 
 BLUEPRINT = flask.Blueprint('match', __name__)
 CORS(BLUEPRINT, supports_credentials=True)
@@ -25,6 +28,13 @@ def test():
     flask.current_app.logger.info('In test')
     return 'OpenReview Matcher (random assignments)'
 
+def set_process_error(interface, exitcode):
+    '''Set the error status of a match whose process did not exit cleanly'''
+    # the match process has updated the config note since `interface` fetched it
+    interface.config_note = interface.client.get_note(interface.config_note.id)
+    interface.set_status(
+        MatcherStatus.ERROR, 'Matcher process exited unexpectedly with exit code {}'.format(exitcode))
+
 @BLUEPRINT.route('/match', methods=['POST'])
 def match():
     '''Main entry point into the app. Initiates a match run'''
@@ -69,16 +79,20 @@ def match():
 
         flask.current_app.logger.debug('Solver class {} selected for configuration id {}'.format(solver_class, config_note_id))
 
-        thread = threading.Thread(
-            target=Matcher(
+        scheduler = flask.current_app.extensions['match_scheduler']
+        result['position'] = scheduler.submit(
+            config_note_id,
+            Matcher(
                 datasource=interface,
                 solver_class=solver_class,
                 logger=flask.current_app.logger
-            ).run
+            ).run,
+            size=interface.estimate_size(),
+            on_error=partial(set_process_error, interface)
         )
-        thread.start()
 
-        flask.current_app.logger.debug('Match for configuration has started: {}'.format(config_note_id))
+        flask.current_app.logger.debug('Match for configuration has been scheduled: {}, position {}'.format(
+            config_note_id, result['position']))
 
     except openreview.OpenReviewException as error_handle:
         flask.current_app.logger.error(str(error_handle))
@@ -94,7 +108,12 @@ def match():
         result['error'] = error_type
         return flask.jsonify(result), status
 
-    except MatcherStatusException as error_handle:
+    except SchedulerFullError as error_handle:
+        flask.current_app.logger.error(str(error_handle))
+        result['error'] = str(error_handle)
+        return flask.jsonify(result), 503
+
+    except (MatcherStatusException, JobSchedulerError) as error_handle:
         flask.current_app.logger.error(str(error_handle))
         result['error'] = str(error_handle)
         return flask.jsonify(result), 400
@@ -109,6 +128,119 @@ def match():
         flask.current_app.logger.debug('POST returns ' + str(result))
         return flask.jsonify(result), 200
 
+@BLUEPRINT.route('/match/position')
+def match_position():
+    '''
+    Returns the position of a match: 0 if it is running, or its position in the queue.
+    The position is null if the match is not scheduled.
+    '''
+
+    result = {}
+
+    token = flask.request.headers.get('Authorization')
+    if not token:
+        flask.current_app.logger.error('No Authorization token in headers')
+        result['error'] = 'No Authorization token in headers'
+        return flask.jsonify(result), 400
+    try:
+        config_note_id = flask.request.args['configNoteId']
+
+        openreview_client = openreview.Client(
+            token=token,
+            baseurl=flask.current_app.config['OPENREVIEW_BASEURL']
+        )
+        # only users who can read the configuration can see its position
+        openreview_client.get_note(config_note_id)
+
+        result['position'] = flask.current_app.extensions['match_scheduler'].get_position(config_note_id)
+
+    except openreview.OpenReviewException as error_handle:
+        flask.current_app.logger.error(str(error_handle))
+
+        error_type = str(error_handle)
+        status = 500
+
+        if 'not found' in error_type.lower():
+            status = 404
+        elif 'forbidden' in error_type.lower():
+            status = 403
+
+        result['error'] = error_type
+        return flask.jsonify(result), status
+
+    # pylint:disable=broad-except
+    except Exception as error_handle:
+        result['error'] = 'Internal server error: {}'.format(error_handle)
+        return flask.jsonify(result), 500
+
+    else:
+        return flask.jsonify(result), 200
+
+@BLUEPRINT.route('/match/cancel', methods=['POST'])
+def cancel_match():
+    '''Cancels a queued or running match, and sets its status to Error'''
+
+    flask.current_app.logger.debug('Cancel request received')
+
+    result = {}
+
+    token = flask.request.headers.get('Authorization')
+    if not token:
+        flask.current_app.logger.error('No Authorization token in headers')
+        result['error'] = 'No Authorization token in headers'
+        return flask.jsonify(result), 400
+    try:
+        config_note_id = flask.request.json['configNoteId']
+
+        openreview_client = openreview.Client(
+            token=token,
+            baseurl=flask.current_app.config['OPENREVIEW_BASEURL']
+        )
+
+        interface = ConfigNoteInterface(
+            client=openreview_client,
+            config_note_id=config_note_id,
+            logger=flask.current_app.logger
+        )
+        openreview_client.impersonate(interface.venue_id)
+
+        if not flask.current_app.extensions['match_scheduler'].cancel(config_note_id):
+            raise MatcherStatusException('Match configured by {} is not queued or running'.format(config_note_id))
+
+        # the match may have been terminated while posting its edges
+        interface.delete_edges()
+        interface.set_status(MatcherStatus.ERROR, 'Match was cancelled')
+
+        flask.current_app.logger.debug('Match for configuration has been cancelled: {}'.format(config_note_id))
+
+    except openreview.OpenReviewException as error_handle:
+        flask.current_app.logger.error(str(error_handle))
+
+        error_type = str(error_handle)
+        status = 500
+
+        if 'not found' in error_type.lower():
+            status = 404
+        elif 'forbidden' in error_type.lower():
+            status = 403
+
+        result['error'] = error_type
+        return flask.jsonify(result), status
+
+    except MatcherStatusException as error_handle:
+        flask.current_app.logger.error(str(error_handle))
+        result['error'] = str(error_handle)
+        return flask.jsonify(result), 400
+
+    # pylint:disable=broad-except
+    except Exception as error_handle:
+        result['error'] = 'Internal server error: {}'.format(error_handle)
+        return flask.jsonify(result), 500
+
+    else:
+        flask.current_app.logger.debug('POST returns ' + str(result))
+        return flask.jsonify(result), 200
+
 
 @BLUEPRINT.route('/deploy', methods=['POST'])
 def deploy():
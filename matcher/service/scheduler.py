@@ -0,0 +1,224 @@
+'''
+Schedules match jobs on a bounded pool of worker processes.
+'''
+import logging
+import logging.handlers
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+class JobSchedulerError(Exception):
+    '''Exception wrapper class for jobs that cannot be scheduled'''
+    pass
+
+class SchedulerFullError(JobSchedulerError):
+    '''Raised when the scheduler cannot admit a job until other jobs are done'''
+    pass
+
+class _LogForwarder(logging.Handler):
+    '''Passes the records of the job processes to the logger of the same name in this process'''
+    def emit(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+def _run_job(target, log_queue, log_level):
+    '''
+    Entry point of the job processes: send the log records of the job to the scheduler
+    through `log_queue`, since spawned processes do not inherit the logging configuration,
+    and call `target`.
+    '''
+    for logger in [logging.getLogger()] + list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(log_level)
+    target()
+
+class JobScheduler:
+    '''
+    Runs jobs, each in its own process, with at most `max_workers` processes at a time.
+    Jobs that do not fit are queued in order of submission.
+
+    A job is admitted as long as fewer than `max_queued_jobs` jobs are waiting and,
+    if `max_total_size` is given, the estimated sizes of the queued and running jobs add up
+    to at most `max_total_size`. A job larger than `max_total_size` is still admitted when
+    no other job is scheduled.
+
+    Finished processes are reaped, and queued jobs started, by a dispatcher thread that checks
+    the processes every `poll_interval` seconds.
+
+    The processes are not daemonic, so that jobs can start processes of their own
+    (e.g. FairFlow with num_processes > 1); call shutdown() to terminate them.
+    They are started with `start_method` rather than forked by default, because the
+    scheduler is used from a multithreaded server.
+    The log records of the jobs are sent back to this process, and handled by the loggers
+    of the same names, at the level of `logger`.
+    '''
+    def __init__(
+                self,
+                max_workers=2,
+                max_queued_jobs=20,
+                max_total_size=None,
+                start_method='spawn',
+                poll_interval=0.5,
+                logger=logging.getLogger(__name__)
+            ):
+
+        self.max_workers = max_workers
+        self.max_queued_jobs = max_queued_jobs
+        self.max_total_size = max_total_size
+        self.poll_interval = poll_interval
+        self.logger = logger
+        self._context = multiprocessing.get_context(start_method)
+        self._condition = threading.Condition()
+        self._queued = OrderedDict()
+        self._running = {}
+        self._dispatcher = None
+        self._shutdown = False
+        self._log_queue = self._context.Queue()
+        self._log_listener = logging.handlers.QueueListener(self._log_queue, _LogForwarder())
+        self._log_listener.start()
+
+    def submit(self, job_id, target, size=0, on_error=None):
+        '''
+        Schedule `target` to be called in a worker process, and return the position of the job:
+        0 if it started running right away, or its 1-based position in the queue.
+        `on_error(exitcode)` is called if the process exits with a non-zero exit code without
+        having been cancelled.
+        '''
+        with self._condition:
+            if self._shutdown:
+                raise JobSchedulerError('Scheduler has been shut down')
+            if job_id in self._queued or job_id in self._running:
+                raise JobSchedulerError('Job {} is already scheduled'.format(job_id))
+            if len(self._queued) >= self.max_queued_jobs:
+                raise SchedulerFullError('Too many jobs are waiting, try again later')
+
+            total_size = sum(job['size'] for job in self._queued.values()) + \
+                sum(job['size'] for job in self._running.values())
+            if self.max_total_size is not None and total_size and total_size + size > self.max_total_size:
+                raise SchedulerFullError(
+                    'Not enough capacity for a job of size {}, try again later'.format(size))
+
+            self._queued[job_id] = {'target': target, 'size': size, 'on_error': on_error}
+            self.logger.debug('Job {} of size {} queued'.format(job_id, size))
+
+            failed_jobs = self._dispatch()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run_dispatcher, name='job-dispatcher', daemon=True)
+                self._dispatcher.start()
+
+            position = self._get_position(job_id)
+
+        self._handle_errors(failed_jobs)
+        return position
+
+    def get_position(self, job_id):
+        '''Return 0 if the job is running, its 1-based position in the queue, or None if it is not scheduled'''
+        with self._condition:
+            failed_jobs = self._dispatch()
+            position = self._get_position(job_id)
+
+        self._handle_errors(failed_jobs)
+        return position
+
+    def cancel(self, job_id):
+        '''
+        Remove the job from the queue, or terminate its process if it is running.
+        Return True if the job was cancelled, or False if it was not scheduled or has already exited.
+        A job that has exited is reaped like any other, so its error callback is still called.
+        '''
+        with self._condition:
+            if self._queued.pop(job_id, None) is not None:
+                self.logger.debug('Job {} cancelled while queued'.format(job_id))
+                return True
+
+            job = self._running.get(job_id)
+            cancelled = job is not None and job['process'].is_alive()
+            if cancelled:
+                del self._running[job_id]
+                job['process'].terminate()
+                job['process'].join()
+                self.logger.debug('Job {} cancelled while running'.format(job_id))
+            failed_jobs = self._dispatch()
+
+        self._handle_errors(failed_jobs)
+        return cancelled
+
+    def shutdown(self):
+        '''Drop the queued jobs, terminate the running jobs and stop the dispatcher'''
+        with self._condition:
+            self._shutdown = True
+            self._queued.clear()
+            running = list(self._running.values())
+            self._condition.notify_all()
+
+        for job in running:
+            job['process'].terminate()
+            job['process'].join()
+
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+
+        with self._condition:
+            log_listener, self._log_listener = self._log_listener, None
+        if log_listener is not None:
+            log_listener.stop()
+
+    def _get_position(self, job_id):
+        if job_id in self._running:
+            return 0
+        for position, queued_id in enumerate(self._queued, start=1):
+            if queued_id == job_id:
+                return position
+        return None
+
+    def _dispatch(self):
+        '''
+        Reap the finished processes and start queued jobs on the free workers. Called with the lock held.
+        Returns the (job ID, job) of the jobs that exited with an error, to be passed to _handle_errors
+        once the lock is released.
+        '''
+        failed_jobs = []
+        for job_id, job in list(self._running.items()):
+            process = job['process']
+            if not process.is_alive():
+                process.join()
+                del self._running[job_id]
+                self.logger.debug('Job {} finished with exit code {}'.format(job_id, process.exitcode))
+                if process.exitcode and job['on_error']:
+                    failed_jobs.append((job_id, job))
+
+        while self._queued and len(self._running) < self.max_workers and not self._shutdown:
+            job_id, job = self._queued.popitem(last=False)
+            job['process'] = self._context.Process(
+                target=_run_job,
+                args=(job['target'], self._log_queue, self.logger.getEffectiveLevel()),
+                name='job-{}'.format(job_id))
+            job['process'].start()
+            self._running[job_id] = job
+            self.logger.debug('Job {} started'.format(job_id))
+
+        return failed_jobs
+
+    def _handle_errors(self, failed_jobs):
+        '''Call the error callbacks of `failed_jobs`, as returned by _dispatch. Called without the lock.'''
+        for job_id, job in failed_jobs:
+            try:
+                job['on_error'](job['process'].exitcode)
+            # pylint:disable=broad-except
+            except Exception as error_handle:
+                self.logger.error('Error handling the exit of job {}: {}'.format(job_id, error_handle))
+
+    def _run_dispatcher(self):
+        failed_jobs = []
+        while True:
+            self._handle_errors(failed_jobs)
+            with self._condition:
+                if self._shutdown:
+                    return
+                self._condition.wait(self.poll_interval)
+                failed_jobs = self._dispatch()
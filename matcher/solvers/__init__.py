@@ -1,7 +1,7 @@
 '''A module for paper-reviewer assignment solvers'''
 
 from .core import *
-from .minmax_solver import MinMaxSolver
+from .minmax_solver import MinMaxSolver, SingleGraphMinMaxSolver
 from .simple_solver import SimpleSolver
 from .randomized_solver import RandomizedSolver
 from .fairflow import FairFlow
@@ -3,4 +3,4 @@ A C extension that implements a sampling algorithm based on the Birkhoff-von Neu
 theorem, used in randomized_solver.
 '''
 
-from _bvn_extension.lib import run_bvn
+from _bvn_extension.lib import run_bvn, run_bvn_sparse, run_bvn_batch
@@ -15,37 +15,55 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
-#include <time.h>
 #include <math.h>
 #include <assert.h>
 
 #define debug 0
 
-int one;
+// state is kept per thread so that samples can be drawn on several threads at once
+#if defined(_MSC_VER)
+#define THREAD_LOCAL __declspec(thread)
+#else
+#define THREAD_LOCAL __thread
+#endif
+
+THREAD_LOCAL int one;
 
 /* STATE VARIABLES */
 
 // flow tracking
-int *f, *c, *ci; // f: current flow on an edge, c: total load of a vertex (positive for reviewers, negative for papers), ci: total load of a paper-instution pair
-int fw, bw; // (fw, bw): maximum amount of flow that can be added in the forward / backward direction on current path / cycle
-int m; // m: number of remaining (fractional) edges
+THREAD_LOCAL int *f, *c, *ci; // f: current flow on an edge, c: total load of a vertex (positive for reviewers, negative for papers), ci: total load of a paper-instution pair
+THREAD_LOCAL int fw, bw; // (fw, bw): maximum amount of flow that can be added in the forward / backward direction on current path / cycle
+THREAD_LOCAL int m; // m: number of remaining (fractional) edges
 
 // (simulated) linked lists of adjacent edges
-int *h, *u, *v, *l, *se; // h: heads, (u, v): starting and ending points of an edge, l: pointer to next edge, se: whether edge has been visited
-int tot; // tot: total number of edges ever added
-int *s, *ri; // s: whether vertex has been visited, ri: instituion a reviewer belongs to
+THREAD_LOCAL int *h, *u, *v, *l, *se; // h: heads, (u, v): starting and ending points of an edge, l: pointer to next edge, se: whether edge has been visited
+THREAD_LOCAL int tot; // tot: total number of edges ever added
+THREAD_LOCAL int *s, *ri; // s: whether vertex has been visited, ri: instituion a reviewer belongs to
 
 // (simulated) linked lists of adjacent institutions
-int *hi, *vi, *li, *si; // hi: heads, vi: name / number of insitution, li: pointer to next institution, si: whether an institution has been visited at this paper
-int ti; // ti: total number of paper-institution pairs ever added
+THREAD_LOCAL int *hi, *vi, *li, *si; // hi: heads, vi: name / number of insitution, li: pointer to next institution, si: whether an institution has been visited at this paper
+THREAD_LOCAL int ti; // ti: total number of paper-institution pairs ever added
 
 // stack for tracking path / cycle to clear
-int *st; // st: stack of pointers
-int top, btm; // top: top, btm: where path / cycle starts
+THREAD_LOCAL int *st; // st: stack of pointers
+THREAD_LOCAL int top, btm; // top: top, btm: where path / cycle starts
+
+// sizes of the vertex and edge buffers
+THREAD_LOCAL int vsize, esize;
+
+// random number generator: a counter hashed together with a key
+// (see seed_rng), so that each (seed, stream) pair gives an independent,
+// reproducible sequence
+THREAD_LOCAL unsigned long long rng_key, rng_ctr;
 
 
 /* FUNCTION PROTOTYPES */
 
+void start_graph(int* subsets, int npaps, int nrevs, int one_, int nedges);
+void read_sample(int* flows, int nedges);
+void add_flow(int x, int y, int z);
+void sample(int n);
 int go(int x, int y, int p);
 
 void ae(int x, int y, int z);
@@ -63,7 +81,11 @@ int min(int a, int b);
 int fl(int x);
 int ce(int x);
 int in(int x);
-void initialize_state(int vsize, int esize);
+void seed_rng(unsigned long long seed, unsigned long long stream);
+double rng_uniform(void);
+unsigned long long mix(unsigned long long x);
+void initialize_state(void);
+void reset_state(void);
 int* alloc_int(int size);
 void free_buffers(void);
 
@@ -83,40 +105,166 @@ void free_buffers(void);
  * - npaps: Number of papers.
  * - nrevs: Number of reviewers.
  * - one_: Scale of flows.
+ * - seed: Seed of the random number generator. Equal seeds give equal samples.
  */
-int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_)
+int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_, unsigned long long seed)
 {
-    srand(clock()); // set random seed to current clock time
-    rand(); // throw away first random number
-
-    int n = npaps + nrevs;
-	one = one_;
+    seed_rng(seed, 0);
 
 	// allocate space for n vertices, and 2*p*r maximum edges
-	initialize_state(n + 1, (2 * npaps * nrevs) + 1);
-
-    for(int i = 1; i <= nrevs; i++) ri[i] = subsets[i-1];
+	start_graph(subsets, npaps, nrevs, one_, npaps * nrevs);
 
     for(int i = 0; i < npaps*nrevs; i++)
     {
 		int x = idx_to_rev(i, npaps, nrevs);
 		int y = idx_to_pap(i, npaps, nrevs);
-		int z = flows[i];//round(flows[i] * one);
+		add_flow(x, y, flows[i]);
+    }
+
+    sample(npaps + nrevs);
+
+	// set all flows to 0 for output
+    for(int i = 0; i < npaps * nrevs; i++)
+    {
+		flows[i] = 0;
+	}
 
-        c[x] += z; // update load counters at vertices
-        c[y] -= z;
-        if(z != 0) // if flow is nonzero, add edge
+    for(int i = 2; i <= tot; i++)
+	{
+        if(u[i] < v[i] && f[i] == one) // output all edges whose final flow is one -- these constitute the integral matching
+		{
+			int idx = pap_rev_to_idx(v[i], u[i], npaps, nrevs);
+			flows[idx] = 1;
+		}
+	}
+
+	free_buffers();
+    return 0;
+}
+
+/*
+ * Same as run_bvn, but reads the fractional assignment as a list of
+ * (paper, reviewer, flow) edges, so that memory and setup time scale with
+ * the support of the fractional assignment rather than with npaps * nrevs.
+ * Arguments:
+ * - paps: An array of size nedges containing the (0-indexed) paper of each edge.
+ * - revs: An array of size nedges containing the (0-indexed) reviewer of each edge.
+ * - flows: An array of size nedges containing the flow on each edge, scaled up
+ *   by one_ to be integers. The function modifies this buffer so that each
+ *   entry is 1 if the edge is in the output sampled assignment and 0 otherwise.
+ * - nedges: Number of edges. Each (paper, reviewer) pair may appear at most once.
+ * - subsets: An array of size nrevs containing a strictly positive subset ID
+ *   for each reviewer, as in run_bvn.
+ * - npaps: Number of papers.
+ * - nrevs: Number of reviewers.
+ * - one_: Scale of flows.
+ * - seed: Seed of the random number generator, as in run_bvn.
+ */
+int run_bvn_sparse(int* paps, int* revs, int* flows, int nedges, int* subsets, int npaps, int nrevs, int one_,
+                   unsigned long long seed)
+{
+    seed_rng(seed, 0);
+
+	// allocate space for n vertices, and 2*nedges maximum edges
+	start_graph(subsets, npaps, nrevs, one_, nedges);
+
+    for(int k = 0; k < nedges; k++)
+    {
+		add_flow(revs[k] + 1, paps[k] + nrevs + 1, flows[k]);
+    }
+
+    sample(npaps + nrevs);
+    read_sample(flows, nedges);
+
+	free_buffers();
+    return 0;
+}
+
+/*
+ * Draws several samples from the same edge list as run_bvn_sparse, reusing the
+ * graph buffers between samples. Sample first + k is drawn with the random
+ * stream (seed, first + k), so the samples do not depend on how a batch is
+ * split into calls, and calls on different threads may run concurrently.
+ * Arguments:
+ * - paps, revs, flows, nedges, subsets, npaps, nrevs, one_: As in run_bvn_sparse.
+ *   flows is not modified.
+ * - seed: Seed of the random streams.
+ * - first: Index of the first sample drawn by this call.
+ * - nsamples: Number of samples to draw.
+ * - samples: An array of size nsamples * nedges. Row k is set to 1 for the edges
+ *   in sample first + k and 0 otherwise.
+ */
+int run_bvn_batch(int* paps, int* revs, int* flows, int nedges, int* subsets, int npaps, int nrevs, int one_,
+                  unsigned long long seed, int first, int nsamples, int* samples)
+{
+	start_graph(subsets, npaps, nrevs, one_, nedges);
+
+    for(int t = 0; t < nsamples; t++)
+    {
+        if(t) reset_state();
+        seed_rng(seed, first + t);
+
+        int* out = samples + ((long long) t * nedges);
+        for(int k = 0; k < nedges; k++)
         {
-            ae(x, y, z);
-            ae(y, x, one - z);
+            out[k] = flows[k];
+            add_flow(revs[k] + 1, paps[k] + nrevs + 1, flows[k]);
+        }
+
+        sample(npaps + nrevs);
+        read_sample(out, nedges);
+    }
+
+	free_buffers();
+    return 0;
+}
+
+// set up the flow graph state for n = npaps + nrevs vertices and at most nedges nonzero edges
+void start_graph(int* subsets, int npaps, int nrevs, int one_, int nedges)
+{
+	one = one_;
+	vsize = npaps + nrevs + 1;
+	esize = (2 * nedges) + 2;
 
-            ai(y, ri[x], z); // and update flow counter for paper-institution pair
+	initialize_state();
 
-            cnr(tot); // remove edge if flow is already integral
+    for(int i = 1; i <= nrevs; i++) ri[i] = subsets[i-1];
+}
+
+// overwrite the nonzero flows of an edge list with whether the edge is in the sample
+void read_sample(int* flows, int nedges)
+{
+    // edges are added in input order and only for nonzero flows, with the
+    // reviewer -> paper edge of the j-th one at pointer 2 * (j + 1)
+    for(int k = 0, i = 2; k < nedges; k++)
+    {
+        if(flows[k] != 0)
+        {
+            flows[k] = (f[i] == one);
+            i += 2;
         }
+    }
+}
 
+// add flow z on the edge between reviewer x and paper y
+void add_flow(int x, int y, int z)
+{
+    c[x] += z; // update load counters at vertices
+    c[y] -= z;
+    if(z != 0) // if flow is nonzero, add edge
+    {
+        ae(x, y, z);
+        ae(y, x, one - z);
+
+        ai(y, ri[x], z); // and update flow counter for paper-institution pair
+
+        cnr(tot); // remove edge if flow is already integral
     }
+}
 
+// push flow around paths / cycles until every edge is integral
+void sample(int n)
+{
     while(m) // while there are still fractional edges left
     {
         if(debug) printf("%d\n", m);
@@ -135,24 +283,6 @@ int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_)
             if(go(i, 0, 0)) break;
         }
     }
-
-	// set all flows to 0 for output
-    for(int i = 0; i < npaps * nrevs; i++)
-    {
-		flows[i] = 0;
-	}
-
-    for(int i = 2; i <= tot; i++)
-	{
-        if(u[i] < v[i] && f[i] == one) // output all edges whose final flow is one -- these constitute the integral matching
-		{
-			int idx = pap_rev_to_idx(v[i], u[i], npaps, nrevs);
-			flows[idx] = 1;
-		}
-	}
-
-	free_buffers();
-    return 0;
 }
 
 // main algorithm logic, searches for a path/cycle and pushes flow when found
@@ -311,7 +441,7 @@ int go(int x, int y, int p) // x: current vertex, y: previous edge, p: whether f
         }
         if(debug) printf("clearing a path/cycle: %d %d\n", fw, bw);
         int r, d;
-        if(((double)rand()) / RAND_MAX < ((double)bw) / (fw + bw)) // update forward wp bw / (fw + bw), etc
+        if(rng_uniform() < ((double)bw) / (fw + bw)) // update forward wp bw / (fw + bw), etc
         {
             d = 1;
             r = fw;
@@ -471,7 +601,25 @@ int in(int x) // whether a number is ``integral''
     return x == fl(x) || x == ce(x);
 }
 
-void initialize_state(int vsize, int esize)
+void seed_rng(unsigned long long seed, unsigned long long stream)
+{
+    rng_key = mix(seed ^ mix(stream + 0x9E3779B97F4A7C15ULL));
+    rng_ctr = 0;
+}
+
+double rng_uniform(void) // uniform in [0, 1)
+{
+    return (mix(rng_key + (++rng_ctr) * 0x9E3779B97F4A7C15ULL) >> 11) * (1.0 / 9007199254740992.0);
+}
+
+unsigned long long mix(unsigned long long x) // splitmix64 finalizer
+{
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+void initialize_state(void)
 {
 	h = alloc_int(vsize);
 	u = alloc_int(esize);
@@ -497,6 +645,31 @@ void initialize_state(int vsize, int esize)
 	tot = 1;
 }
 
+void reset_state(void) // clear everything but the reviewer subsets for another sample
+{
+	memset(h, 0, vsize * sizeof(int));
+	memset(u, 0, esize * sizeof(int));
+	memset(v, 0, esize * sizeof(int));
+	memset(l, 0, esize * sizeof(int));
+	memset(se, 0, esize * sizeof(int));
+	memset(s, 0, vsize * sizeof(int));
+	memset(hi, 0, vsize * sizeof(int));
+	memset(vi, 0, esize * sizeof(int));
+	memset(li, 0, esize * sizeof(int));
+	memset(si, 0, esize * sizeof(int));
+	memset(st, 0, esize * sizeof(int));
+	memset(f, 0, esize * sizeof(int));
+	memset(c, 0, vsize * sizeof(int));
+	memset(ci, 0, esize * sizeof(int));
+	fw = 0;
+	bw = 0;
+	m = 0;
+	ti = 0;
+	top = 0;
+	btm = 0;
+	tot = 1;
+}
+
 int* alloc_int(int size)
 {
 	return (int*) calloc(size, sizeof(int));
@@ -6,7 +6,13 @@ from cffi import FFI
 
 ffibuilder = FFI()
 
-header = "int run_bvn(int* flows, int* subsets, int nrevs, int npaps, int one_);"
+header = """
+int run_bvn(int* flows, int* subsets, int npaps, int nrevs, int one_, unsigned long long seed);
+int run_bvn_sparse(int* paps, int* revs, int* flows, int nedges, int* subsets, int npaps, int nrevs, int one_,
+                   unsigned long long seed);
+int run_bvn_batch(int* paps, int* revs, int* flows, int nedges, int* subsets, int npaps, int nrevs, int one_,
+                  unsigned long long seed, int first, int nsamples, int* samples);
+"""
 ffibuilder.cdef(header)
 ffibuilder.set_source("_bvn_extension", # extension name
     header,
@@ -1,11 +1,42 @@
 from collections import defaultdict
-from ortools.graph import pywrapgraph
 import numpy as np
+import multiprocessing
 import uuid
 import time
 from .core import SolverException
+from .min_cost_flow import SimpleMinCostFlow
+from .. import sparse
+from ..instrumentation import PhaseRecorder
 import logging
 
+# number of binary search iterations used to find the makespan
+MAKESPAN_SEARCH_ITERATIONS = 10
+
+# attributes that are shared with the makespan search processes instead of being copied
+_SHARED_ATTRIBUTES = ['affinity_matrix', 'constraint_matrix', 'starter_solution']
+
+# the FairFlow instance of a makespan search process
+_search_worker = None
+
+def _share_array(array):
+    """Copy an array into shared memory, returning the shared buffer and the shape."""
+    array = np.asarray(array, dtype=np.float64)
+    buffer = multiprocessing.RawArray('d', max(array.size, 1))
+    np.frombuffer(buffer, dtype=np.float64)[:array.size] = array.ravel()
+    return buffer, array.shape
+
+def _init_search_worker(state, shared_arrays):
+    """Rebuild the FairFlow instance in a makespan search process."""
+    global _search_worker
+    _search_worker = FairFlow.__new__(FairFlow)
+    _search_worker.__dict__.update(state)
+    for name, (buffer, shape) in shared_arrays.items():
+        size = int(np.prod(shape))
+        setattr(_search_worker, name, np.frombuffer(buffer, dtype=np.float64)[:size].reshape(shape))
+
+def _probe_in_search_worker(makespan):
+    return _search_worker._probe_makespan(makespan)
+
 
 class FairFlow(object):
     """Approximate makespan matching via flow network (with lower bounds).
@@ -30,7 +61,8 @@ class FairFlow(object):
     the matching.
     """
     def __init__(self, minimums, maximums, demands, encoder, allow_zero_score_assignments=False, solution=None,
-                 logger=logging.getLogger(__name__)):
+                 logger=logging.getLogger(__name__), num_processes=1, candidate_limit=None, seed=None,
+                 recorder=None):
         """
         Initialize a makespan flow matcher
 
@@ -41,14 +73,26 @@ class FairFlow(object):
         :param allow_zero_score_assignments: bool to allow pairs with zero affinity in the solution.
             unknown matching scores default to 0. set to True to allow zero (unknown) affinity in solution.
         :param solution: a matrix of assignments (same shape as encoder.affinity_matrix)
+        :param num_processes: number of processes used to search for the makespan. With more than one,
+            that many makespan values are tried at once in each round (a k-ary instead of a binary search).
+        :param candidate_limit: if set, each reviewer is only offered this many of the papers with the highest
+            affinity when reassigning reviewers to improve the makespan, to bound the size of the network.
+        :param seed: seed for the random affinities used when all affinities are zero.
+        :param recorder: a PhaseRecorder recording the makespan search and the final improvement.
 
         :return: initialized makespan matcher.
         """
         self.logger = logger
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
         self.allow_zero_score_assignments = allow_zero_score_assignments
         self.logger.debug('Init FairFlow')
         self.constraint_matrix = encoder.constraint_matrix
-        affinity_matrix = encoder.aggregate_score_matrix.transpose()
+        affinity_matrix = encoder.aggregate_score_matrix
+        if sparse.issparse(affinity_matrix):
+            # FairFlow works on dense matrices
+            self.constraint_matrix = sparse.densify(self.constraint_matrix)
+            affinity_matrix = sparse.densify(affinity_matrix, encoder.aggregate_score_default)
+        affinity_matrix = affinity_matrix.transpose()
 
         self.maximums = maximums
         self.minimums = minimums
@@ -56,7 +100,7 @@ class FairFlow(object):
         # make sure that all weights are positive:
         self.affinity_matrix = affinity_matrix.copy()
         if not self.affinity_matrix.any():
-            self.affinity_matrix = np.random.rand(*affinity_matrix.shape)
+            self.affinity_matrix = np.random.default_rng(seed).random(affinity_matrix.shape)
 
         self.orig_affinities = self.affinity_matrix.copy()
 
@@ -82,7 +126,7 @@ class FairFlow(object):
         self.big_c = 10000
         self.bigger_c = self.big_c ** 2
 
-        self.min_cost_flow = pywrapgraph.SimpleMinCostFlow()
+        self.min_cost_flow = SimpleMinCostFlow()
         self.start_inds = []
         self.end_inds = []
         self.caps = []
@@ -90,6 +134,8 @@ class FairFlow(object):
         self.source = self.num_reviewers + self.num_papers
         self.sink = self.num_reviewers + self.num_papers + 1
         self.solved = False
+        self.num_processes = num_processes
+        self.candidate_limit = candidate_limit
         self.logger.debug('End Init FairFlow')
 
     def _validate_input_range(self):
@@ -113,7 +159,7 @@ class FairFlow(object):
 
     def _refresh_internal_vars(self):
         """Set start, end, caps, costs to be empty."""
-        self.min_cost_flow = pywrapgraph.SimpleMinCostFlow()
+        self.min_cost_flow = SimpleMinCostFlow()
         self.start_inds = []
         self.end_inds = []
         self.caps = []
@@ -206,7 +252,8 @@ class FairFlow(object):
         have their reviewers unassigned **only if** their score, s, satisfies
         s - r(g2)_max + r(g1)_min > T - max, so that they remain in G2. Then,
         allow all reviewers who were unassigned to be assigned to the available
-        papers in G3.
+        papers in G3. The arcs are selected with boolean masks over the solution,
+        constraint and affinity matrices (see _improvement_candidates).
 
         Args:
             g1 - numpy array of paper ids in group 1 (best).
@@ -216,121 +263,117 @@ class FairFlow(object):
         Returns:
             None -- modifies the internal min_cost_flow network.
         """
-        # Must convert to python ints first.
-        g1 = [int(x) for x in g1]
-        g2 = [int(x) for x in g2]
-        g3 = [int(x) for x in g3]
+        g1 = np.asarray(g1, dtype=int)
+        g2 = np.asarray(g2, dtype=int)
+        g3 = np.asarray(g3, dtype=int)
 
         pap_scores = np.sum(self.solution * self.affinity_matrix, axis=0)
+        dummy_offset = self.num_reviewers + self.num_papers + 2
 
-        # First construct edges between the source and each pap in g1.
         self._refresh_internal_vars()
-        for i in range(np.size(g1)):
-            self.start_inds.append(self.source)
-            self.end_inds.append(self.num_reviewers + g1[i])
-            self.caps.append(1)
-            self.costs.append(0)
+
+        # First construct edges between the source and each pap in g1.
+        source_tails = np.full(g1.size, self.source)
+        source_heads = self.num_reviewers + g1
 
         # Next construct the sink node and edges to each paper in g3.
-        papers_needing_no_assignments = 0
-        for i in range(np.size(g3)):
-            if not self.demands[g3[i]]:
-                continue
-            self.start_inds.append(self.num_reviewers + g3[i])
-            self.end_inds.append(self.sink)
-            edge_capacity = 1
-            self.caps.append(edge_capacity)
-            self.costs.append(0)
-            papers_needing_no_assignments += (1 - edge_capacity)
+        g3_in_demand = g3[np.asarray(self.demands)[g3] != 0]
+        sink_tails = self.num_reviewers + g3_in_demand
+        sink_heads = np.full(g3_in_demand.size, self.sink)
 
         # For each paper in g2, create a dummy node the restricts the flow to
         # that paper to 1.
-        for pap2 in g2:
-            self.start_inds.append(self.num_reviewers + self.num_papers + 2 + pap2)
-            self.end_inds.append(self.num_reviewers + pap2)
-            self.caps.append(1)
-            self.costs.append(0)
+        dummy_tails = dummy_offset + g2
+        dummy_heads = self.num_reviewers + g2
 
         # For each assignment in the g1 group, reverse the flow.
-        revs, paps1 = np.nonzero(self.solution[:, g1])
-        assignment_to_give = set()
-        added = set()
-        pg2_to_minaff = defaultdict(lambda: np.inf) # min incoming affinity.
-        for i in range(np.size(revs)):
-            rev = int(revs[i])
-            pap = g1[paps1[i]]
-            assert(self.solution[rev, pap] == 1.0)
-            self.start_inds.append(self.num_reviewers + pap)
-            self.end_inds.append(rev)
-            self.caps.append(1)
-            self.costs.append(0)
-            assignment_to_give.add(rev)
-
-            # and now connect this reviewer to each dummy paper associate with
-            # a paper in g2 if that rev not already been assigned to that paper.
-            if rev not in added:
-                for pap2 in g2:
-                    if self.solution[rev, pap2] == 0.0 and self.constraint_matrix[pap2, rev] == 0.0:
-                        rp_aff = self.affinity_matrix[rev, pap2]
-                        if self.allow_zero_score_assignments or rp_aff != 0.0:
-                            self.start_inds.append(rev)
-                            self.end_inds.append(self.num_reviewers + self.num_papers + 2 + pap2)
-                            pg2_to_minaff[pap2] = min(pg2_to_minaff[pap2], rp_aff)
-
-                            self.caps.append(1)
-                            self.costs.append(0)
-                added.add(rev)
+        revs1, paps1 = np.nonzero(self.solution[:, g1])
+
+        # and now connect each of these reviewers to each dummy paper associated with
+        # a paper in g2 if that rev has not already been assigned to that paper.
+        g1_revs, first_assignment = np.unique(revs1, return_index=True)
+        g2_rows, g2_cols = np.nonzero(self._improvement_candidates(g1_revs, g2))
+        g2_affinities = self.affinity_matrix[g1_revs[g2_rows], g2[g2_cols]]
+        pg2_to_minaff = np.full(g2.size, np.inf) # min incoming affinity.
+        np.minimum.at(pg2_to_minaff, g2_cols, g2_affinities)
+
+        # the arcs of a reviewer to g2 follow the reversal of its first g1 assignment
+        order = np.lexsort((
+            np.concatenate([np.zeros(revs1.size, dtype=int), g2_cols]),
+            np.concatenate([np.zeros(revs1.size, dtype=int), np.ones(g2_rows.size, dtype=int)]),
+            np.concatenate([np.arange(revs1.size), first_assignment[g2_rows]])))
+        g1_tails = np.concatenate([self.num_reviewers + g1[paps1], g1_revs[g2_rows]])[order]
+        g1_heads = np.concatenate([revs1, dummy_offset + g2[g2_cols]])[order]
+
         # For each paper in g2, reverse the flow to assigned revs only if the
         # reversal, plus the min edge coming in from G1 wouldn't violate ms.
-        revs, paps2 = np.nonzero(self.solution[:, g2])
-        for i in range(np.size(revs)):
-            rev = int(revs[i])
-            pap = g2[paps2[i]]
-            pap_score = pap_scores[pap]
-            assert(self.solution[rev, pap] == 1.0)
-            min_in = pg2_to_minaff[pap]
-            rp_aff = self.affinity_matrix[rev, pap]
-            # lower bound on new paper score.
-            lower_bound = (pap_score + min_in - rp_aff)
-            ms_satisfied = (self.makespan - self.max_affinities) <= lower_bound
-            if min_in < np.inf and ms_satisfied:
-                self.start_inds.append(self.num_reviewers + pap)
-                self.end_inds.append(rev)
-                self.caps.append(1)
-                self.costs.append(0)
-                assignment_to_give.add(rev)
+        revs2, paps2 = np.nonzero(self.solution[:, g2])
+        min_in = pg2_to_minaff[paps2]
+        # lower bound on new paper score.
+        lower_bound = pap_scores[g2[paps2]] + min_in - self.affinity_matrix[revs2, g2[paps2]]
+        ms_satisfied = (self.makespan - self.max_affinities) <= lower_bound
+        reversible = (min_in < np.inf) & ms_satisfied
+        g2_tails = self.num_reviewers + g2[paps2[reversible]]
+        g2_heads = revs2[reversible]
 
         # For each reviewer, connect them to a paper in g3 if not assigned.
-        for rev in assignment_to_give:
-            for pap3 in g3:
-                if self.solution[rev, pap3] == 0.0 and self.constraint_matrix[pap3, rev] == 0.0:
-                    rp_aff = self.affinity_matrix[rev, pap3]
-                    if self.allow_zero_score_assignments or rp_aff != 0.0:
-                        self.start_inds.append(rev)
-                        self.end_inds.append(self.num_reviewers + pap3)
-                        self.caps.append(1)
-                        lb = self.makespan - self.max_affinities
-                        pap_score = pap_scores[pap3]
-                        # give a bigger reward if assignment would improve group.
-                        if rp_aff + pap_score >= lb:
-                            self.costs.append(int(-1.0 - self.bigger_c * rp_aff))
-                        else:
-                            self.costs.append(int(-1.0 - self.big_c * rp_aff))
-
-        flow = int(min(np.size(g3) - papers_needing_no_assignments, np.size(g1)))
+        assignment_to_give = np.union1d(revs1, g2_heads)
+        g3_rows, g3_cols = np.nonzero(self._improvement_candidates(assignment_to_give, g3))
+        g3_affinities = self.affinity_matrix[assignment_to_give[g3_rows], g3[g3_cols]]
+        lb = self.makespan - self.max_affinities
+        # give a bigger reward if assignment would improve group.
+        improves_group = g3_affinities + pap_scores[g3[g3_cols]] >= lb
+        g3_costs = np.where(
+            improves_group,
+            (-1.0 - self.bigger_c * g3_affinities).astype(np.int64),
+            (-1.0 - self.big_c * g3_affinities).astype(np.int64))
+
+        self.start_inds = np.concatenate([
+            source_tails, sink_tails, dummy_tails, g1_tails, g2_tails, assignment_to_give[g3_rows]]).astype(np.int64)
+        self.end_inds = np.concatenate([
+            source_heads, sink_heads, dummy_heads, g1_heads, g2_heads, self.num_reviewers + g3[g3_cols]]).astype(np.int64)
+        self.caps = np.ones(self.start_inds.size, dtype=np.int64)
+        self.costs = np.concatenate([np.zeros(self.start_inds.size - g3_costs.size, dtype=np.int64), g3_costs])
+
+        flow = int(min(np.size(g3), np.size(g1)))
         self.supplies = np.zeros(self.num_reviewers + self.num_papers + 2)
         self.supplies[self.source] = flow
         self.supplies[self.sink] = -flow
 
-        for i in range(len(self.start_inds)):
-            self.min_cost_flow.AddArcWithCapacityAndUnitCost(
-                self.start_inds[i],
-                self.end_inds[i],
-                self.caps[i],
-                self.costs[i])
+        self.min_cost_flow.AddArcsWithCapacityAndUnitCost(self.start_inds, self.end_inds, self.caps, self.costs)
         for i in range(len(self.supplies)):
             self.min_cost_flow.SetNodeSupply(i, int(self.supplies[i]))
 
+    def _improvement_candidates(self, revs, paps):
+        """Find the papers each reviewer may be newly assigned to in the improvement network.
+
+        A reviewer may be assigned to a paper that it is not assigned to and has
+        no constraint with, and (unless zero scores are allowed) a nonzero
+        affinity with. If candidate_limit is set, only that many of these papers
+        with the highest affinity are kept for each reviewer.
+
+        Args:
+            revs - numpy array of reviewer indices.
+            paps - numpy array of paper indices.
+
+        Returns:
+            A boolean matrix of shape (len(revs), len(paps)).
+        """
+        affinities = self.affinity_matrix[np.ix_(revs, paps)]
+        candidates = (self.solution[np.ix_(revs, paps)] == 0.0) & \
+            (self.constraint_matrix[np.ix_(paps, revs)].T == 0.0)
+        if not self.allow_zero_score_assignments:
+            candidates &= affinities != 0.0
+
+        if self.candidate_limit is not None and self.candidate_limit < paps.size:
+            ranked = np.where(candidates, affinities, -np.inf)
+            best = np.argpartition(-ranked, self.candidate_limit - 1, axis=1)[:, :self.candidate_limit]
+            keep = np.zeros_like(candidates)
+            np.put_along_axis(keep, best, True, axis=1)
+            candidates &= keep
+
+        return candidates
+
     def solve_ms_improvement(self):
         """Reassign reviewers to improve the makespan.
 
@@ -467,7 +510,7 @@ class FairFlow(object):
         source = n_rev + n_pap
         sink = n_rev + n_pap + 1
 
-        mcf = pywrapgraph.SimpleMinCostFlow()
+        mcf = SimpleMinCostFlow()
 
         # edges from source to reviewers.
         for i in range(n_rev):
@@ -532,43 +575,20 @@ class FairFlow(object):
         Return:
             Highest feasible makespan value found.
         """
+        if self.num_processes > 1:
+            return self._find_ms_parallel()
+
         mn = 0.0
         mx = np.max(self.affinity_matrix) * np.max(self.demands)
         ms = (mx - mn) / 2.0
-        self.makespan = ms
         best = None
         best_worst_pap_score = 0.0
 
-        for i in range(10):
+        for i in range(MAKESPAN_SEARCH_ITERATIONS):
             self.logger.debug('#info FairFlow:ITERATION %s ms %s' % (i, ms))
-            try:
-                s1, s3 = self.try_improve_ms()
-                self.logger.debug('Round 0: s1 {} s3 {}'.format(s1, s3))
-                can_improve_round_counter = 1
-                can_improve = s3 > 0
-                prev_s1, prev_s3 = -1, -1
-                while can_improve and prev_s3 != s3:
-                    prev_s1, prev_s3 = s1, s3
-                    start = time.time()
-                    s1, s3 = self.try_improve_ms()
-                    self.logger.debug('Round {}: s1 {} s3 {}'.format(can_improve_round_counter, s1, s3))
-                    can_improve_round_counter += 1
-                    can_improve = s3 > 0
-                    self.logger.debug('#info FairFlow:try_improve takes: %s s' % (time.time() - start))
-
-                worst_pap_score = np.min(np.sum(self.solution * self.affinity_matrix, axis=0))
-                self.logger.debug('#info FairFlow:best worst paper score %s worst score %s' % (best_worst_pap_score, worst_pap_score))
-
-                success_c1 = s3 == 0
-                success_c2 = np.all(self.affinity_matrix[self.solution.astype(np.bool)] != 0)
-                success = success_c1 & (self.allow_zero_score_assignments | success_c2)
-                self.logger.debug('#info FairFlow:success = %s [success_c1: %s, success_c2: %s]'
-                                  % (success, success_c1, success_c2))
-            except SolverException as error_handle:
-                self.logger.debug('No Solution={}'.format(error_handle))
-                worst_pap_score = -np.inf
-                success = False
-                self.logger.debug('#info FairFlow:success = %s' % success)
+            with self.recorder.phase('probe_makespan', makespan=float(ms)):
+                success, worst_pap_score = self._probe_makespan(ms)
+            self.logger.debug('#info FairFlow:best worst paper score %s worst score %s' % (best_worst_pap_score, worst_pap_score))
 
             if success and worst_pap_score >= best_worst_pap_score:
                 best = ms
@@ -579,8 +599,63 @@ class FairFlow(object):
                 assert (not success or worst_pap_score < best_worst_pap_score)
                 mx = ms
                 ms -= (ms - mn) / 2.0
-            self.makespan = ms
-            self.solution = self.starter_solution.copy()
+        self.makespan = ms
+        self.solution = self.starter_solution.copy()
+        self.logger.debug('#info FairFlow:Best found %s' % best)
+        self.logger.debug('#info FairFlow:Best Worst Paper Score found %s' %best_worst_pap_score)
+        if best is None:
+            return 0.0
+        else:
+            return best
+
+    def _find_ms_parallel(self):
+        """Find the highest possible makespan with a k-ary search on a process pool.
+
+        Each round tries num_processes makespan values, evenly spaced in the
+        current interval, at once. The results are then read in increasing order
+        of makespan, the same way the binary search reads a single result, and
+        the interval shrinks to the one between the last success and the first
+        failure. The number of rounds gives at least the precision of the binary
+        search. The affinity, constraint and starter solution matrices are shared
+        with the processes instead of being copied to each of them.
+
+        Return:
+            Highest feasible makespan value found.
+        """
+        mn = 0.0
+        mx = np.max(self.affinity_matrix) * np.max(self.demands)
+        best = None
+        best_worst_pap_score = 0.0
+
+        width = self.num_processes
+        rounds = int(np.ceil(MAKESPAN_SEARCH_ITERATIONS / np.log2(width + 1)))
+
+        shared_arrays = {name: _share_array(getattr(self, name)) for name in _SHARED_ATTRIBUTES}
+        state = {
+            name: value for name, value in self.__dict__.items()
+            if name not in _SHARED_ATTRIBUTES + ['min_cost_flow', 'solution', 'orig_affinities', 'recorder']
+        }
+
+        with multiprocessing.Pool(width, initializer=_init_search_worker, initargs=(state, shared_arrays)) as pool:
+            for i in range(rounds):
+                candidates = mn + (mx - mn) * np.arange(1, width + 1) / (width + 1)
+                self.logger.debug('#info FairFlow:ROUND %s ms %s' % (i, candidates))
+                with self.recorder.phase('probe_makespans', makespans=candidates.tolist()):
+                    results = pool.map(_probe_in_search_worker, candidates)
+
+                for ms, (success, worst_pap_score) in zip(candidates, results):
+                    self.logger.debug('#info FairFlow:ms %s best worst paper score %s worst score %s' % (ms, best_worst_pap_score, worst_pap_score))
+                    if success and worst_pap_score >= best_worst_pap_score:
+                        best = ms
+                        best_worst_pap_score = worst_pap_score
+                        mn = ms
+                    else:
+                        assert (not success or worst_pap_score < best_worst_pap_score)
+                        mx = ms
+                        break
+
+        self.makespan = mn + (mx - mn) / 2.0
+        self.solution = self.starter_solution.copy()
         self.logger.debug('#info FairFlow:Best found %s' % best)
         self.logger.debug('#info FairFlow:Best Worst Paper Score found %s' %best_worst_pap_score)
         if best is None:
@@ -588,6 +663,48 @@ class FairFlow(object):
         else:
             return best
 
+    def _probe_makespan(self, ms):
+        """Try to reach the makespan `ms`, starting from the starter solution.
+
+        Args:
+            ms - (float) the makespan value to try.
+
+        Return:
+            A tuple of whether the makespan was reached with a valid matching
+            and the resulting worst paper score.
+        """
+        self.makespan = ms
+        self.solution = self.starter_solution.copy()
+        try:
+            s1, s3 = self.try_improve_ms()
+            self.logger.debug('Round 0: s1 {} s3 {}'.format(s1, s3))
+            can_improve_round_counter = 1
+            can_improve = s3 > 0
+            prev_s1, prev_s3 = -1, -1
+            while can_improve and prev_s3 != s3:
+                prev_s1, prev_s3 = s1, s3
+                start = time.time()
+                s1, s3 = self.try_improve_ms()
+                self.logger.debug('Round {}: s1 {} s3 {}'.format(can_improve_round_counter, s1, s3))
+                can_improve_round_counter += 1
+                can_improve = s3 > 0
+                self.logger.debug('#info FairFlow:try_improve takes: %s s' % (time.time() - start))
+
+            worst_pap_score = np.min(np.sum(self.solution * self.affinity_matrix, axis=0))
+
+            success_c1 = s3 == 0
+            success_c2 = np.all(self.affinity_matrix[self.solution.astype(np.bool)] != 0)
+            success = success_c1 & (self.allow_zero_score_assignments | success_c2)
+            self.logger.debug('#info FairFlow:success = %s [success_c1: %s, success_c2: %s]'
+                              % (success, success_c1, success_c2))
+        except SolverException as error_handle:
+            self.logger.debug('No Solution={}'.format(error_handle))
+            worst_pap_score = -np.inf
+            success = False
+            self.logger.debug('#info FairFlow:success = %s' % success)
+
+        return success, worst_pap_score
+
     def solve(self):
         """Find a makespan and solve flow.
 
@@ -602,14 +719,16 @@ class FairFlow(object):
         """
 
         self._validate_input_range()
-        ms = self.find_ms()
+        with self.recorder.phase('find_makespan'):
+            ms = self.find_ms()
         self.makespan = ms
-        s1, s3 = self.try_improve_ms()
-        can_improve = s3 > 0
-        prev_s1, prev_s3 = -1, -1
-        while can_improve and (prev_s1 != s1 or prev_s3 != s3):
-            prev_s1, prev_s3 = s1, s3
+        with self.recorder.phase('improve_makespan', makespan=float(ms)):
             s1, s3 = self.try_improve_ms()
             can_improve = s3 > 0
+            prev_s1, prev_s3 = -1, -1
+            while can_improve and (prev_s1 != s1 or prev_s3 != s3):
+                prev_s1, prev_s3 = s1, s3
+                s1, s3 = self.try_improve_ms()
+                can_improve = s3 > 0
 
         return self.sol_as_mat().transpose()
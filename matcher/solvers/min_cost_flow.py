@@ -0,0 +1,75 @@
+'''
+The min-cost flow solver of OR-Tools, with the same interface across OR-Tools versions.
+
+OR-Tools 9.4 replaced ortools.graph.pywrapgraph by ortools.graph.python.min_cost_flow,
+whose methods are snake_case, and which can load arcs from numpy arrays and read their flows
+into one in a single call. SimpleMinCostFlow keeps the CamelCase methods of pywrapgraph that
+the solvers use, and adds AddArcsWithCapacityAndUnitCost and Flows, which take arrays of arcs.
+With pywrapgraph (and Flows with OR-Tools 9.4), these make one call per arc.
+
+Arcs can only be changed in place with OR-Tools 9.12 or later, which provides SetArcCapacity;
+CAN_SET_ARC_CAPACITY tells whether it is available.
+'''
+
+import numpy as np
+
+try:
+    from ortools.graph.python import min_cost_flow
+except ImportError:
+    min_cost_flow = None
+    from ortools.graph import pywrapgraph
+
+def _flows_one_by_one(flow, arcs):
+    arcs = np.asarray(arcs)
+    return np.fromiter(map(flow, arcs.tolist()), dtype=np.int64, count=arcs.size)
+
+if min_cost_flow is not None:
+    _SimpleMinCostFlow = min_cost_flow.SimpleMinCostFlow
+
+    class SimpleMinCostFlow(_SimpleMinCostFlow):
+        '''ortools.graph.python.min_cost_flow.SimpleMinCostFlow, with the methods of pywrapgraph'''
+        OPTIMAL = _SimpleMinCostFlow.OPTIMAL
+        AddArcWithCapacityAndUnitCost = _SimpleMinCostFlow.add_arc_with_capacity_and_unit_cost
+        SetNodeSupply = _SimpleMinCostFlow.set_node_supply
+        Solve = _SimpleMinCostFlow.solve
+        OptimalCost = _SimpleMinCostFlow.optimal_cost
+        NumArcs = _SimpleMinCostFlow.num_arcs
+        Tail = _SimpleMinCostFlow.tail
+        Head = _SimpleMinCostFlow.head
+        Flow = _SimpleMinCostFlow.flow
+        Capacity = _SimpleMinCostFlow.capacity
+        UnitCost = _SimpleMinCostFlow.unit_cost
+
+        if hasattr(_SimpleMinCostFlow, 'set_arc_capacity'):
+            SetArcCapacity = _SimpleMinCostFlow.set_arc_capacity
+
+        def AddArcsWithCapacityAndUnitCost(self, tails, heads, capacities, unit_costs):
+            '''Add the arcs given by arrays of tails, heads, capacities and unit costs, in order'''
+            self.add_arcs_with_capacity_and_unit_cost(
+                np.asarray(tails, dtype=np.int32),
+                np.asarray(heads, dtype=np.int32),
+                np.asarray(capacities, dtype=np.int64),
+                np.asarray(unit_costs, dtype=np.int64))
+
+        def Flows(self, arcs):
+            '''Return the flows of an array of arcs'''
+            if not hasattr(self, 'flows'):
+                return _flows_one_by_one(self.flow, arcs)
+            return np.asarray(self.flows(np.asarray(arcs, dtype=np.int32)), dtype=np.int64)
+
+else:
+    class SimpleMinCostFlow(pywrapgraph.SimpleMinCostFlow):
+        '''pywrapgraph.SimpleMinCostFlow, with the methods that take arrays of arcs'''
+
+        def AddArcsWithCapacityAndUnitCost(self, tails, heads, capacities, unit_costs):
+            '''Add the arcs given by arrays of tails, heads, capacities and unit costs, in order'''
+            # pywrapgraph can't handle numpy int types, so pass Python ints
+            add_arc = self.AddArcWithCapacityAndUnitCost
+            for arc in zip(*[np.asarray(column).tolist() for column in (tails, heads, capacities, unit_costs)]):
+                add_arc(*arc)
+
+        def Flows(self, arcs):
+            '''Return the flows of an array of arcs'''
+            return _flows_one_by_one(self.Flow, arcs)
+
+CAN_SET_ARC_CAPACITY = hasattr(SimpleMinCostFlow, 'SetArcCapacity')
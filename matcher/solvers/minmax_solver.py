@@ -12,11 +12,20 @@ except that the "num_reviews" argument is replaced by "minimums" and "maximums".
         integer representing the minimum/maximum number of reviews a reviewer
         should be assigned.
 
+The sparse matrices of Encoder(sparse=True) are passed to SimpleSolver as they are,
+unless every pair could become an arc anyway (zero-score assignments are allowed,
+or pairs without edges have a nonzero cost), in which case they are densified.
+
+SingleGraphMinMaxSolver takes the same arguments, but solves a single graph
+in which the minimum and maximum reviewer loads are both encoded.
+
 '''
 import numpy as np
 import logging
 from .simple_solver import SimpleSolver
 from .core import SolverException
+from .. import sparse
+from ..instrumentation import PhaseRecorder
 import time
 
 class MinMaxSolver:
@@ -28,34 +37,58 @@ class MinMaxSolver:
             demands,
             encoder,
             allow_zero_score_assignments=False,
-            logger=logging.getLogger(__name__)
+            logger=logging.getLogger(__name__),
+            seed=None,
+            recorder=None
         ):
 
         self.minimums = minimums
         self.maximums = maximums
         self.demands = demands
         self.cost_matrix = encoder.cost_matrix
+        self.constraint_matrix = encoder.constraint_matrix
         self.allow_zero_score_assignments = allow_zero_score_assignments
 
-        if not self.cost_matrix.any():
-            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
+        if sparse.issparse(self.cost_matrix) and (
+                self.allow_zero_score_assignments or encoder.cost_default != 0 or self.cost_matrix.count_nonzero() == 0):
+            # every pair may become an arc, so the sparse encoding has nothing to offer
+            self.cost_matrix = sparse.densify(self.cost_matrix, encoder.cost_default)
+            self.constraint_matrix = sparse.densify(self.constraint_matrix)
 
-        self.constraint_matrix = encoder.constraint_matrix
+        if not sparse.issparse(self.cost_matrix) and not self.cost_matrix.any():
+            self.cost_matrix = np.random.default_rng(seed).random(encoder.cost_matrix.shape)
 
+        self._drop_bad_affinity_minimums()
+
+        self.solved = False
+        self.flow_matrix = None
+        self.optimal_cost = None
+        self.cost = None
+        self.logger = logger
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
+        self.minimum_solver = None
+        self.maximum_solver = None
+
+    def _drop_bad_affinity_minimums(self):
         if not self.allow_zero_score_assignments:
             # Find reviewers with no known cost edges (non-zero) after constraints are applied and remove their load_lb
-            bad_affinity_reviewers = np.where(np.all((self.cost_matrix * (self.constraint_matrix == 0)) == 0,
-                                                     axis=0))[0]
+            bad_affinity_reviewers = self._bad_affinity_reviewers()
             logging.debug("Setting minimum load for {} reviewers to 0 because "
                           "they do not have known affinity with any paper".format(len(bad_affinity_reviewers)))
             for rev_id in bad_affinity_reviewers:
                 self.minimums[rev_id] = 0
 
-        self.solved = False
-        self.flow_matrix = None
-        self.optimal_cost = None
-        self.cost = None
-        self.logger = logger
+    def _bad_affinity_reviewers(self):
+        '''Return the indices of reviewers without any known, unconstrained cost.'''
+        if not sparse.issparse(self.cost_matrix):
+            return np.where(np.all((self.cost_matrix * (self.constraint_matrix == 0)) == 0,
+                                   axis=0))[0]
+
+        paper_indices, reviewer_indices, costs = sparse.entries(self.cost_matrix)
+        known = costs != 0
+        constraints = sparse.lookup(self.constraint_matrix, paper_indices[known], reviewer_indices[known])
+        good_affinity_reviewers = reviewer_indices[known][constraints == 0]
+        return np.setdiff1d(np.arange(self.cost_matrix.shape[1]), good_affinity_reviewers)
 
     def _validate_input_range(self):
         '''Validate if demand is in the range of min supply and max supply'''
@@ -72,49 +105,170 @@ class MinMaxSolver:
 
         self.logger.debug('Finished checking graph inputs')
 
+    def _adjusted_inputs(self):
+        '''Return the constraints, maximums and demands left over after the minimum solution.'''
+        minimum_flow = self.minimum_solver.flow_matrix
+        adjusted_constraints = self.constraint_matrix - minimum_flow
+        adjusted_maximums = self.maximums - sparse.axis_sum(minimum_flow, axis=0)
+        adjusted_demands = self.demands - sparse.axis_sum(minimum_flow, axis=1)
+        return adjusted_constraints, adjusted_maximums, adjusted_demands
+
+    def _run(self, name, solver):
+        start_time = time.time()
+        self.logger.debug('{} Solver started at={}'.format(name, start_time))
+        with self.recorder.phase('{}_flow'.format(name.lower())):
+            result = solver.solve()
+        stop_time = time.time()
+        self.logger.debug('{} Solver finished at {} and took {} seconds'.format(name, stop_time, stop_time - start_time))
+        return result
+
+    def _combine(self, minimum_result, maximum_result):
+        self.solved = self.minimum_solver.solved and self.maximum_solver.solved
+
+        self.optimal_cost = self.minimum_solver.min_cost_flow.OptimalCost() + \
+            self.maximum_solver.min_cost_flow.OptimalCost()
+
+        self.flow_matrix = minimum_result + maximum_result
+        self._set_cost()
+        return self.flow_matrix
+
+    def _set_cost(self):
+        if sparse.issparse(self.flow_matrix):
+            self.cost = self.flow_matrix.multiply(self.cost_matrix).sum()
+        else:
+            self.cost = np.sum(self.flow_matrix * self.cost_matrix)
+
     def solve(self):
         '''Computes combined solution of two SimpleSolvers'''
         self._validate_input_range()
 
-        start_time = time.time()
-        self.logger.debug('Min Solver started at={}'.format(start_time))
-        minimum_solver = SimpleSolver(
-            self.minimums,
-            self.demands,
-            self.cost_matrix,
-            self.constraint_matrix,
-            allow_zero_score_assignments=self.allow_zero_score_assignments,
-            logger=self.logger,
-            strict=False
-        ) # strict=False prevents errors from being thrown for supply/demand mismatch
-        minimum_result = minimum_solver.solve()
-        stop_time = time.time()
-        self.logger.debug('Min Solver finished at {} and took {} seconds'.format(stop_time, stop_time - start_time))
+        with self.recorder.phase('min_graph'):
+            self.minimum_solver = SimpleSolver(
+                self.minimums,
+                self.demands,
+                self.cost_matrix,
+                self.constraint_matrix,
+                allow_zero_score_assignments=self.allow_zero_score_assignments,
+                logger=self.logger,
+                strict=False
+            ) # strict=False prevents errors from being thrown for supply/demand mismatch
+        minimum_result = self._run('Min', self.minimum_solver)
 
-        adjusted_constraints = self.constraint_matrix - minimum_solver.flow_matrix
-        adjusted_maximums = self.maximums - np.sum(minimum_solver.flow_matrix, axis=0)
-        adjusted_demands = self.demands - np.sum(minimum_solver.flow_matrix, axis=1)
+        with self.recorder.phase('max_graph'):
+            adjusted_constraints, adjusted_maximums, adjusted_demands = self._adjusted_inputs()
 
-        start_time = time.time()
-        self.logger.debug('Max Solver started at={}'.format(start_time))
-        maximum_solver = SimpleSolver(
-            adjusted_maximums,
-            adjusted_demands,
-            self.cost_matrix,
-            adjusted_constraints,
-            allow_zero_score_assignments=self.allow_zero_score_assignments,
-            logger=self.logger)
-
-        maximum_result = maximum_solver.solve()
-        stop_time = time.time()
-        self.logger.debug('Max Solver finished at {} and took {} seconds'.format(stop_time, stop_time - start_time))
+            self.maximum_solver = SimpleSolver(
+                adjusted_maximums,
+                adjusted_demands,
+                self.cost_matrix,
+                adjusted_constraints,
+                allow_zero_score_assignments=self.allow_zero_score_assignments,
+                logger=self.logger)
+        maximum_result = self._run('Max', self.maximum_solver)
 
-        self.solved = minimum_solver.solved and maximum_solver.solved
+        return self._combine(minimum_result, maximum_result)
 
-        self.optimal_cost = minimum_solver.min_cost_flow.OptimalCost() + \
-            maximum_solver.min_cost_flow.OptimalCost()
+    def _apply_edits(self, minimums, maximums, demands, constraint_matrix):
+        '''Store the edited inputs and return True if the inputs of the minimum solution changed.'''
+        if constraint_matrix is not None:
+            if not sparse.issparse(self.cost_matrix):
+                # the matrices may have been densified in __init__
+                constraint_matrix = sparse.densify(constraint_matrix)
+            self.constraint_matrix = constraint_matrix
+        if minimums is not None:
+            self.minimums = minimums
+        if maximums is not None:
+            self.maximums = maximums
+        if demands is not None:
+            self.demands = demands
 
-        self.flow_matrix = minimum_result + maximum_result
-        self.cost = np.sum(self.flow_matrix * self.cost_matrix)
+        minimum_changed = any(edit is not None for edit in [minimums, demands, constraint_matrix])
+        if minimum_changed:
+            self._drop_bad_affinity_minimums()
+
+        self._validate_input_range()
+        return minimum_changed
+
+    def resolve(self, minimums=None, maximums=None, demands=None, constraint_matrix=None):
+        '''
+        Re-solve after editing some reviewer loads, paper demands and/or constraints.
+
+        The graphs built by the previous call to solve() are kept, and only the capacities,
+        supplies and arcs affected by the edits are updated (see SimpleSolver.update).
+        The minimum solution is reused as it is when none of its inputs (minimums, demands
+        and constraints) changed, e.g. when only maximums are edited.
+        '''
+        if self.minimum_solver is None:
+            return self.solve()
+
+        minimum_changed = self._apply_edits(minimums, maximums, demands, constraint_matrix)
+
+        if minimum_changed:
+            self.minimum_solver.update(
+                num_reviews=self.minimums, demands=self.demands, constraint_matrix=self.constraint_matrix)
+            minimum_result = self._run('Min', self.minimum_solver)
+        else:
+            self.logger.debug('Reusing the previous Min Solver solution')
+            minimum_result = self.minimum_solver.flow_matrix
+
+        adjusted_constraints, adjusted_maximums, adjusted_demands = self._adjusted_inputs()
+        self.maximum_solver.update(
+            num_reviews=adjusted_maximums, demands=adjusted_demands, constraint_matrix=adjusted_constraints)
+        maximum_result = self._run('Max', self.maximum_solver)
 
+        return self._combine(minimum_result, maximum_result)
+
+
+class SingleGraphMinMaxSolver(MinMaxSolver):
+    '''
+    Implements a min/max assignment with a single min-cost flow graph.
+
+    Instead of solving for the minimums first and then for the remaining reviews, the source
+    arc of each reviewer is split into a mandatory part (up to the reviewer's minimum) with a
+    large negative cost and an optional part (up to the maximum), so that one solve meets as
+    many minimums as possible and then minimizes the total cost.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.graph_solver = None
+
+    def _finish(self, result):
+        self.solved = self.graph_solver.solved
+        # the cost of the reviewer-paper arcs, without the mandatory arc costs
+        self.optimal_cost = self.graph_solver.cost
+        self.flow_matrix = result
+        self._set_cost()
         return self.flow_matrix
+
+    def solve(self):
+        '''Computes the min/max solution with one SimpleSolver'''
+        self._validate_input_range()
+
+        with self.recorder.phase('minmax_graph'):
+            self.graph_solver = SimpleSolver(
+                self.maximums,
+                self.demands,
+                self.cost_matrix,
+                self.constraint_matrix,
+                allow_zero_score_assignments=self.allow_zero_score_assignments,
+                logger=self.logger,
+                minimums=self.minimums)
+
+        return self._finish(self._run('MinMax', self.graph_solver))
+
+    def resolve(self, minimums=None, maximums=None, demands=None, constraint_matrix=None):
+        '''
+        Re-solve after editing some reviewer loads, paper demands and/or constraints,
+        updating the graph built by the previous call to solve() (see SimpleSolver.update).
+        '''
+        if self.graph_solver is None:
+            return self.solve()
+
+        self._apply_edits(minimums, maximums, demands, constraint_matrix)
+        self.graph_solver.update(
+            num_reviews=self.maximums,
+            demands=self.demands,
+            constraint_matrix=self.constraint_matrix,
+            minimums=self.minimums)
+
+        return self._finish(self._run('MinMax', self.graph_solver))
@@ -14,12 +14,15 @@ are maintained even if all alternates are used.
 
 from .simple_solver import SimpleSolver
 from .core import SolverException
-from .bvn_extension import run_bvn
-from ortools.linear_solver import pywraplp
+from .min_cost_flow import SimpleMinCostFlow
+from .. import sparse
+from ..instrumentation import PhaseRecorder
+from .bvn_extension import run_bvn_sparse, run_bvn_batch
+from ortools.linear_solver import pywraplp, linear_solver_pb2
 from cffi import FFI
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import numpy as np
-from itertools import product
 
 class RandomizedSolver():
     def __init__(
@@ -29,22 +32,41 @@ class RandomizedSolver():
             demands,
             encoder,
             allow_zero_score_assignments=False,
-            logger=logging.getLogger(__name__)
+            logger=logging.getLogger(__name__),
+            seed=None,
+            fractional_method='LP',
+            recorder=None
         ):
+        '''
+        `fractional_method` selects how the fractional assignment is found: 'LP' solves it with
+        GLOP, and 'MinCostFlow' solves the same problem as a min-cost flow, which is much faster
+        on large venues. `recorder` is a PhaseRecorder recording the stages of the solver.
+        '''
         self.minimums = minimums
         self.maximums = maximums
         self.demands = demands
         self.cost_matrix = encoder.cost_matrix
+        self.constraint_matrix = encoder.constraint_matrix
+        self.prob_limit_matrix = encoder.prob_limit_matrix
         self.num_paps, self.num_revs = self.cost_matrix.shape
         self.allow_zero_score_assignments = allow_zero_score_assignments
         self.logger = logger
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
+        if fractional_method not in ('LP', 'MinCostFlow'):
+            raise SolverException('Unknown fractional_method {}'.format(fractional_method))
+        self.fractional_method = fractional_method
+        # every random choice (random costs, sampling, alternates) is drawn from this
+        # generator, so runs with the same seed are reproducible
+        self.rng = np.random.default_rng(seed)
+
+        if sparse.issparse(self.cost_matrix):
+            # the LP is built from dense matrices
+            self.cost_matrix = sparse.densify(self.cost_matrix, encoder.cost_default)
+            self.constraint_matrix = sparse.densify(self.constraint_matrix)
+            self.prob_limit_matrix = sparse.densify(self.prob_limit_matrix, encoder.prob_limit_default)
 
         if not self.cost_matrix.any():
-            self.cost_matrix = np.random.rand(*encoder.cost_matrix.shape)
-
-        self.constraint_matrix = encoder.constraint_matrix
-
-        self.prob_limit_matrix = encoder.prob_limit_matrix
+            self.cost_matrix = self.rng.random(self.cost_matrix.shape)
 
         if not self.allow_zero_score_assignments:
             bad_affinity_reviewers = np.where(np.all((self.cost_matrix * (self.constraint_matrix == 0)) == 0,
@@ -60,15 +82,17 @@ class RandomizedSolver():
         self.flow_matrix = None
         self.cost = None # actual cost of the sampled assignment
         self.alternate_probability_matrix = None # marginal probability for each alternate
-        self.opt_solved = False
-        self.opt_cost = None # cost of the optimal deterministic assignment
+        self._opt_solved = None # found lazily, see opt_solved and opt_cost
+        self._opt_cost = None
 
         self.integer_fractional_assignment_matrix = None # actual solution to LP
         self.one = 10000000 # precision of fractional assignment
 
         self._check_inputs()
-        self.fractional_assignment_solver = self.construct_solver(self.prob_limit_matrix)
-        self.deterministic_assignment_solver = self.construct_solver(np.ones_like(self.prob_limit_matrix))
+        self._find_lp_variables()
+        if self.fractional_method == 'LP':
+            with self.recorder.phase('construct_lp'):
+                self.fractional_assignment_solver = self.construct_solver(self.prob_limit_matrix)
 
 
     def _check_inputs(self):
@@ -119,85 +143,103 @@ class RandomizedSolver():
 
         self.logger.debug('Finished checking if demand is in range')
 
+    def _find_lp_variables(self):
+        '''
+        Find the paper-reviewer pairs that get a variable in the LP, in row-major order.
+        Conflicted pairs, and zero-score pairs unless they are allowed, can only take the
+        value 0, so they are left out of the LP.
+        '''
+        # a constraint of 0 means there's no constraint
+        # a constraint of 1 means the pair is assigned as much as possible given the limits
+        # anything else indicates a conflict
+        eligible = self.constraint_matrix == 0
+        if not self.allow_zero_score_assignments:
+            eligible &= self.cost_matrix != 0
+        eligible |= self.constraint_matrix == 1
+
+        self.variable_papers, self.variable_reviewers = np.nonzero(eligible)
+        self.variable_is_fixed = self.constraint_matrix[self.variable_papers, self.variable_reviewers] == 1
+
+        # variables are in row-major order, so the variables of each paper are contiguous
+        self.variable_ranges_by_paper = np.searchsorted(self.variable_papers, np.arange(self.num_paps + 1))
+        self.variables_by_reviewer = np.argsort(self.variable_reviewers, kind='stable')
+        self.variable_ranges_by_reviewer = np.searchsorted(
+            self.variable_reviewers[self.variables_by_reviewer], np.arange(self.num_revs + 1))
+
     def construct_solver(self, limit_matrix):
-        ''' LP is solved with all probabilities scaled up by self.one. Solution is assumed to be integral. '''
+        '''
+        LP is solved with all probabilities scaled up by self.one. Solution is assumed to be integral.
+
+        The LP is built as a model proto from the arrays of variables found by
+        _find_lp_variables and loaded into the solver in one call.
+        '''
         self.logger.debug('construct_solver')
-        lp_solver = pywraplp.Solver.CreateSolver('GLOP')
+        model = linear_solver_pb2.MPModelProto()
 
-        F = [[None for j in range(self.num_revs)] for i in range(self.num_paps)]
-        for i, j in product(range(self.num_paps), range(self.num_revs)):
-            constraint = self.constraint_matrix[i, j]
-            limit = int(self.one * limit_matrix[i, j])
-            if constraint == 0 and (self.allow_zero_score_assignments or self.cost_matrix[i, j] != 0):
-                # no conflict
-                F[i][j] = lp_solver.NumVar(0, limit, "F[{}][{}]".format(i, j))
-            elif constraint == 1:
-                # assign to paper as much as possible given limits
-                F[i][j] = lp_solver.NumVar(limit, limit, "F[{}][{}]".format(i, j))
-            else:
-                # conflict
-                F[i][j] = lp_solver.NumVar(0, 0, "F[{}][{}]".format(i, j))
+        limits = (self.one * limit_matrix[self.variable_papers, self.variable_reviewers]).astype(np.int64)
+        lower_bounds = np.where(self.variable_is_fixed, limits, 0)
+        costs = self.cost_matrix[self.variable_papers, self.variable_reviewers]
+        for lower_bound, upper_bound, cost in zip(lower_bounds.tolist(), limits.tolist(), costs.tolist()):
+            model.variable.add(lower_bound=lower_bound, upper_bound=upper_bound, objective_coefficient=cost)
 
         for i in range(self.num_paps):
-            c = lp_solver.Constraint(int(self.one*self.demands[i]), int(self.one*self.demands[i]))
-            for j in range(self.num_revs):
-                c.SetCoefficient(F[i][j], 1)
+            demand = int(self.one*self.demands[i])
+            c = model.constraint.add(lower_bound=demand, upper_bound=demand)
+            variables = range(self.variable_ranges_by_paper[i], self.variable_ranges_by_paper[i + 1])
+            c.var_index.extend(variables)
+            c.coefficient.extend([1] * len(variables))
 
         for j in range(self.num_revs):
-            c = lp_solver.Constraint(int(self.one*self.minimums[j]), int(self.one*self.maximums[j]))
-            for i in range(self.num_paps):
-                c.SetCoefficient(F[i][j], 1)
+            c = model.constraint.add(
+                lower_bound=int(self.one*self.minimums[j]), upper_bound=int(self.one*self.maximums[j]))
+            variables = self.variables_by_reviewer[
+                self.variable_ranges_by_reviewer[j]:self.variable_ranges_by_reviewer[j + 1]]
+            c.var_index.extend(variables.tolist())
+            c.coefficient.extend([1] * len(variables))
 
-        objective = lp_solver.Objective()
-        for i, j in product(range(self.num_paps), range(self.num_revs)):
-            objective.SetCoefficient(F[i][j], self.cost_matrix[i, j])
-        objective.SetMinimization()
+        lp_solver = pywraplp.Solver.CreateSolver('GLOP')
+        error = lp_solver.LoadModelFromProto(model)
+        if error:
+            raise SolverException('Could not construct the LP: {}'.format(error))
 
         self.logger.debug('Finished construct_solver')
         return lp_solver
 
 
+    def _solution_values(self, lp_solver):
+        '''
+        Return the solution values of all variables of `lp_solver`, in the order of
+        self.variable_papers and self.variable_reviewers, read in one call.
+        '''
+        response = linear_solver_pb2.MPSolutionResponse()
+        lp_solver.FillSolutionResponseProto(response)
+        return np.array(response.variable_value)
+
     def solve(self):
         self.logger.debug('solve')
 
         self._validate_input_range()
 
-        assert hasattr(self, 'fractional_assignment_solver'), \
-            'Solver not constructed. Run self.construct_solver(self.probability_limit_matrix) first.'
-
-        self.logger.debug('start fractional_assignment_solver')
-
         self.expected_cost = 0
-        status = self.fractional_assignment_solver.Solve()
-        if status == self.fractional_assignment_solver.OPTIMAL:
-            self.solved = True
-            self.expected_cost = self.fractional_assignment_solver.Objective().Value() / self.one
-
-            self.integer_fractional_assignment_matrix = np.zeros((self.num_paps, self.num_revs), dtype=np.intc)
-            for i, j in product(range(self.num_paps), range(self.num_revs)):
-                actual_value = self.fractional_assignment_solver.LookupVariable("F[{}][{}]".format(i, j)).solution_value()
-                assert np.round(actual_value) - actual_value < 1e-5, 'LP solution should be integral'
-                self.integer_fractional_assignment_matrix[i, j] = np.round(actual_value) # assumes that round does not ruin paper load integrality
-
-            assert np.all(np.sum(self.integer_fractional_assignment_matrix, axis=1) % self.one == 0), \
-                'Paper loads should be "integral"'
-
-            self.fractional_assignment_matrix = self.integer_fractional_assignment_matrix / self.one
+        if self.fractional_method == 'LP':
+            with self.recorder.phase('fractional_lp'):
+                values = self._solve_fractional_lp()
         else:
-            self.logger.debug("Solver status: {}".format(status))
+            with self.recorder.phase('fractional_flow'):
+                values = self._solve_fractional_flow()
+
+        if values is None:
             self.solved = False
             return
 
-        self.logger.debug('start deterministic_assignment_solver')
+        self.solved = True
+        self.integer_fractional_assignment_matrix = np.zeros((self.num_paps, self.num_revs), dtype=np.intc)
+        self.integer_fractional_assignment_matrix[self.variable_papers, self.variable_reviewers] = values
 
-        self.opt_cost = 0
-        status = self.deterministic_assignment_solver.Solve()
-        if status == self.deterministic_assignment_solver.OPTIMAL:
-            self.opt_solved = True
-            self.opt_cost = self.deterministic_assignment_solver.Objective().Value() / self.one
-        else:
-            self.logger.debug("Deterministic solver status: {}".format(status))
-            self.opt_solved = False
+        assert np.all(np.sum(self.integer_fractional_assignment_matrix, axis=1) % self.one == 0), \
+            'Paper loads should be "integral"'
+
+        self.fractional_assignment_matrix = self.integer_fractional_assignment_matrix / self.one
 
         self.logger.debug('set alternate_probability_matrix')
         # set alternate probability to guarantee that
@@ -208,12 +250,52 @@ class RandomizedSolver():
                 out=(np.zeros_like(self.prob_limit_matrix)), # if fractional assignment is 1, alternate probability is 0
                 where=(self.fractional_assignment_matrix != 1))
 
-        self.sample_assignment()
+        with self.recorder.phase('sampling'):
+            self.sample_assignment()
         self.logger.debug('Finished solve')
 
         return self.flow_matrix
 
 
+    def _sampling_edges(self):
+        '''
+        Return the support of the integer fractional assignment as C-contiguous
+        np.intc arrays of papers, reviewers and flows, in row-major order.
+        '''
+        flows = self.integer_fractional_assignment_matrix[self.variable_papers, self.variable_reviewers]
+        support = flows != 0
+        paps = np.ascontiguousarray(self.variable_papers[support], dtype=np.intc)
+        revs = np.ascontiguousarray(self.variable_reviewers[support], dtype=np.intc)
+        flows = np.ascontiguousarray(flows[support], dtype=np.intc)
+        return paps, revs, flows
+
+    def _sampler_seed(self):
+        ''' Draw a seed for the sampling extension from self.rng '''
+        return int(self.rng.integers(2**63))
+
+    def _check_samples(self, samples):
+        ''' Raise a SolverException if any of the stacked assignments in `samples` is invalid '''
+        self._check_loads(np.sum(samples, axis=-1), np.sum(samples, axis=-2))
+
+    def _check_edge_samples(self, paps, revs, edge_samples):
+        '''
+        Raise a SolverException if any of the assignments in `edge_samples` is invalid,
+        where row k holds the assignment of sample k to the (paps, revs) pairs
+        '''
+        rows = np.arange(paps.size)
+        ones = np.ones(paps.size, dtype=np.intc)
+        paper_incidence = sparse.from_entries(rows, paps, ones, (paps.size, self.num_paps), dtype=np.intc)
+        reviewer_incidence = sparse.from_entries(rows, revs, ones, (paps.size, self.num_revs), dtype=np.intc)
+        self._check_loads(
+            paper_incidence.T.dot(edge_samples.T).T,
+            reviewer_incidence.T.dot(edge_samples.T).T)
+
+    def _check_loads(self, pap_loads, rev_loads):
+        ''' Raise a SolverException if the paper or reviewer loads of any sample are invalid '''
+        if not (np.all(pap_loads == np.array(self.demands)) and
+                np.all(np.logical_and(rev_loads <= np.array(self.maximums), rev_loads >= np.array(self.minimums)))):
+            raise SolverException('Sampled assignment is invalid')
+
     def sample_assignment(self):
         ''' Sample a deterministic assignment from the fractional assignment '''
         self.logger.debug('sample_assignment')
@@ -221,35 +303,92 @@ class RandomizedSolver():
         assert self.solved, \
             'Solver not solved. Run self.solve() before sampling.'
 
-        # construct CFFI interface to the sampling extension in C
+        # hand the support of the integer fractional assignment to the sampling
+        # extension in C as (paper, reviewer, flow) int buffers; run_bvn_sparse
+        # overwrites the flows with the sampled assignment
         ffi = FFI()
-        F = self.integer_fractional_assignment_matrix.flatten()
-        Fbuf = ffi.new("int[]", self.num_paps * self.num_revs)
-        for i in range(F.size):
-            Fbuf[i] = F[i]
-        Sbuf = ffi.new("int[]", self.num_revs)
-        for i in range(self.num_revs):
-            Sbuf[i] = 1
-
-        run_bvn(Fbuf, Sbuf, self.num_paps, self.num_revs, self.one)
-
+        paps, revs, flows = self._sampling_edges()
+        subsets = np.ones(self.num_revs, dtype=np.intc)
+
+        run_bvn_sparse(ffi.cast('int *', ffi.from_buffer(paps)),
+                       ffi.cast('int *', ffi.from_buffer(revs)),
+                       ffi.cast('int *', ffi.from_buffer(flows)),
+                       flows.size,
+                       ffi.cast('int *', ffi.from_buffer(subsets)),
+                       self.num_paps, self.num_revs, self.one,
+                       self._sampler_seed())
+
+        assigned = flows == 1
         self.flow_matrix = np.zeros((self.num_paps, self.num_revs))
-        for i in range(F.size):
-            coords = np.unravel_index(i, (self.num_paps, self.num_revs))
-            self.flow_matrix[coords] = Fbuf[i]
+        self.flow_matrix[paps[assigned], revs[assigned]] = 1
 
         self.cost = np.sum(self.flow_matrix * self.cost_matrix)
 
         # check that sampled assignment is valid
-        pap_loads = np.sum(self.flow_matrix, axis=1)
-        rev_loads = np.sum(self.flow_matrix, axis=0)
-        if not (np.all(pap_loads == np.array(self.demands)) and
-                np.all(np.logical_and(rev_loads <= np.array(self.maximums), rev_loads >= np.array(self.minimums)))):
-            raise SolverException('Sampled assignment is invalid')
+        self._check_samples(self.flow_matrix)
 
         self.logger.debug('Finished sample_assignment')
 
+    def sample_assignments(self, num_samples, num_threads=1, seed=None, dense=False):
+        '''
+        Sample `num_samples` deterministic assignments from the fractional assignment.
+
+        Returns (paps, revs, edge_samples): the papers and reviewers of the pairs with a
+        nonzero fractional assignment, and an int8 array of shape (num_samples, len(paps))
+        whose row k tells which of those pairs are assigned in sample k. The samples only
+        take as much memory as the support of the fractional assignment. If `dense`, the
+        samples are instead returned stacked in an int8 array of shape
+        (num_samples, num_paps, num_revs).
 
+        The samples are split into contiguous blocks, one per thread, and each block
+        is drawn in a single call to the sampling extension. Sample k is drawn from
+        the random stream (seed, k), so for a given `seed` the result does not depend
+        on `num_threads`. If `seed` is None, one is drawn from self.rng.
+
+        Unlike sample_assignment, this does not change self.flow_matrix or self.cost.
+        '''
+        self.logger.debug('sample_assignments')
+
+        assert self.solved, \
+            'Solver not solved. Run self.solve() before sampling.'
+
+        if seed is None:
+            seed = self._sampler_seed()
+
+        ffi = FFI()
+        paps, revs, flows = self._sampling_edges()
+        subsets = np.ones(self.num_revs, dtype=np.intc)
+        edge_samples = np.empty((num_samples, flows.size), dtype=np.intc)
+
+        def sample_block(start, stop):
+            run_bvn_batch(ffi.cast('int *', ffi.from_buffer(paps)),
+                          ffi.cast('int *', ffi.from_buffer(revs)),
+                          ffi.cast('int *', ffi.from_buffer(flows)),
+                          flows.size,
+                          ffi.cast('int *', ffi.from_buffer(subsets)),
+                          self.num_paps, self.num_revs, self.one,
+                          seed, start, stop - start,
+                          ffi.cast('int *', ffi.from_buffer(edge_samples[start:stop])))
+
+        bounds = np.linspace(0, num_samples, max(1, min(num_threads, num_samples)) + 1).astype(int)
+        blocks = [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        if len(blocks) > 1:
+            # the extension releases the GIL and keeps its state per thread
+            with ThreadPoolExecutor(max_workers=len(blocks)) as executor:
+                list(executor.map(lambda block: sample_block(*block), blocks))
+        else:
+            for start, stop in blocks:
+                sample_block(start, stop)
+
+        edge_samples = edge_samples.astype(np.int8)
+        self._check_edge_samples(paps, revs, edge_samples)
+
+        self.logger.debug('Finished sample_assignments')
+        if dense:
+            samples = np.zeros((num_samples, self.num_paps, self.num_revs), dtype=np.int8)
+            samples[:, paps, revs] = edge_samples
+            return samples
+        return paps, revs, edge_samples
 
     def get_alternates(self, num_alternates):
         ''' Sample alternates in order to respect probability guarantees '''
@@ -258,20 +397,147 @@ class RandomizedSolver():
         assert self.solved, \
             'Solver not solved. Run self.solve() before sampling.'
 
-        rng = np.random.default_rng()
-
-        alternates_by_index = {}
-        for i in range(self.num_paps):
-            unassigned = []
-            for j in range(self.num_revs):
-                # only allow j as an alternate with limited probability
-                if self.flow_matrix[i, j] == 0 and rng.random() < self.alternate_probability_matrix[i, j]:
-                    unassigned.append((self.cost_matrix[i, j], j))
-            unassigned.sort()
-            alternates_by_index[i] = [entry[1] for entry in unassigned[:num_alternates]]
+        # only allow unassigned reviewers as alternates, each with limited probability
+        survives = (self.flow_matrix == 0) & \
+            (self.rng.random((self.num_paps, self.num_revs)) < self.alternate_probability_matrix)
+
+        num_alternates = min(num_alternates, self.num_revs)
+        if num_alternates <= 0:
+            return {i: [] for i in range(self.num_paps)}
+
+        # the k-th lowest surviving cost of each paper is the cutoff for being selected
+        masked = np.where(survives, self.cost_matrix, np.inf)
+        kth_costs = np.partition(masked, num_alternates - 1, axis=1)[:, num_alternates - 1]
+        below = masked < kth_costs[:, None]
+
+        # among reviewers tied with the cutoff, keep the lowest indices (like a stable sort)
+        tied = (masked == kth_costs[:, None]) & survives
+        num_tied_needed = num_alternates - np.count_nonzero(below, axis=1)
+        selected = below | (tied & (np.cumsum(tied, axis=1) <= num_tied_needed[:, None]))
+
+        paps, revs = np.nonzero(selected)
+        order = np.lexsort((revs, masked[paps, revs], paps))
+        paps, revs = paps[order], revs[order]
+        bounds = np.searchsorted(paps, np.arange(self.num_paps + 1))
+        alternates_by_index = {i: revs[bounds[i]:bounds[i + 1]].tolist() for i in range(self.num_paps)}
         self.logger.debug('Finished get_alternates')
         return alternates_by_index
 
+    @property
+    def opt_solved(self):
+        ''' Whether the optimal deterministic assignment was found '''
+        if self._opt_solved is None and self.solved:
+            self._solve_deterministic()
+        return bool(self._opt_solved)
+
+    @property
+    def opt_cost(self):
+        ''' Cost of the optimal deterministic assignment '''
+        if self._opt_solved is None and self.solved:
+            self._solve_deterministic()
+        return self._opt_cost
+
+    def _solve_deterministic(self):
+        '''
+        Find the cost of the optimal deterministic assignment, i.e. the LP with all probability
+        limits set to 1, as a min-cost flow.
+        '''
+        self.logger.debug('start deterministic min cost flow')
+
+        self._opt_solved = False
+        self._opt_cost = 0
+        with self.recorder.phase('deterministic_flow'):
+            values = self._solve_flow(np.ones(len(self.variable_papers), dtype=np.int64), 1)
+        if values is not None:
+            self._opt_solved = True
+            self._opt_cost = np.dot(values, self.cost_matrix[self.variable_papers, self.variable_reviewers])
+
+    def _solve_flow(self, capacities, unit):
+        '''
+        Solve the LP over the variables of _find_lp_variables as a min-cost flow, with the given
+        integer upper bound on each variable and with demands, minimums and maximums scaled by `unit`.
+        The constraint matrix of the LP is totally unimodular, so the two have the same optimum.
+
+        Fixed variables are assigned their upper bound up front, and the remaining reviewer minimums
+        are supplied at the reviewer nodes, so the flow is infeasible exactly when the LP is. Costs are
+        scaled to integers, as large as self.one allows without overflowing the total cost.
+
+        Returns the value of each variable, or None if the flow is infeasible.
+        '''
+        fixed = self.variable_is_fixed
+        fixed_by_paper = np.bincount(self.variable_papers[fixed], weights=capacities[fixed], minlength=self.num_paps)
+        fixed_by_reviewer = np.bincount(
+            self.variable_reviewers[fixed], weights=capacities[fixed], minlength=self.num_revs)
+        demands = unit * np.asarray(self.demands, dtype=np.int64) - fixed_by_paper.astype(np.int64)
+        maximums = unit * np.asarray(self.maximums, dtype=np.int64) - fixed_by_reviewer.astype(np.int64)
+        minimums = np.maximum(unit * np.asarray(self.minimums, dtype=np.int64) - fixed_by_reviewer.astype(np.int64), 0)
+
+        if np.any(demands < 0) or np.any(maximums < minimums):
+            self.logger.debug('Min cost flow is infeasible')
+            return None
+
+        # node 0 is the source, then reviewers, then papers
+        free = np.flatnonzero(~fixed)
+        papers = self.variable_papers[free]
+        reviewers = self.variable_reviewers[free]
+        costs = self.cost_matrix[papers, reviewers]
+        total_supply = max(int(demands.sum()), 1)
+        cost_scale = min(self.one, 2**60 // total_supply) / max(np.abs(costs).max(initial=0), 1e-12)
+
+        start_nodes = np.concatenate([
+            np.zeros(self.num_revs, dtype=np.int64), 1 + reviewers]).astype(np.int64)
+        end_nodes = np.concatenate([
+            1 + np.arange(self.num_revs), 1 + self.num_revs + papers]).astype(np.int64)
+        arc_capacities = np.concatenate([maximums - minimums, capacities[free]]).astype(np.int64)
+        unit_costs = np.concatenate([
+            np.zeros(self.num_revs, dtype=np.int64), np.round(costs * cost_scale).astype(np.int64)])
+        supplies = np.concatenate([[demands.sum() - minimums.sum()], minimums, -demands]).astype(np.int64)
+
+        min_cost_flow = SimpleMinCostFlow()
+        min_cost_flow.AddArcsWithCapacityAndUnitCost(start_nodes, end_nodes, arc_capacities, unit_costs)
+        for node, supply in enumerate(supplies.tolist()):
+            min_cost_flow.SetNodeSupply(node, supply)
+
+        status = min_cost_flow.Solve()
+        if status != min_cost_flow.OPTIMAL:
+            self.logger.debug("Min cost flow status: {}".format(status))
+            return None
+
+        flows = min_cost_flow.Flows(np.arange(self.num_revs, len(start_nodes)))
+
+        values = capacities.astype(np.int64)
+        values[free] = flows
+        return values
+
+    def _solve_fractional_lp(self):
+        ''' Solve the fractional assignment LP, returning the integer value of each variable or None '''
+        assert hasattr(self, 'fractional_assignment_solver'), \
+            'Solver not constructed. Run self.construct_solver(self.probability_limit_matrix) first.'
+
+        self.logger.debug('start fractional_assignment_solver')
+
+        status = self.fractional_assignment_solver.Solve()
+        if status != self.fractional_assignment_solver.OPTIMAL:
+            self.logger.debug("Solver status: {}".format(status))
+            return None
+
+        self.expected_cost = self.fractional_assignment_solver.Objective().Value() / self.one
+
+        actual_values = self._solution_values(self.fractional_assignment_solver)
+        assert np.all(np.round(actual_values) - actual_values < 1e-5), 'LP solution should be integral'
+        # assumes that round does not ruin paper load integrality
+        return np.round(actual_values)
+
+    def _solve_fractional_flow(self):
+        ''' Solve the fractional assignment as a min-cost flow, returning the value of each variable or None '''
+        self.logger.debug('start fractional min cost flow')
+
+        limits = (self.one * self.prob_limit_matrix[self.variable_papers, self.variable_reviewers]).astype(np.int64)
+        values = self._solve_flow(limits, self.one)
+        if values is not None:
+            self.expected_cost = np.dot(values, self.cost_matrix[self.variable_papers, self.variable_reviewers]) / self.one
+        return values
+
     def get_fraction_of_opt(self):
         '''
         Return the fraction of the optimal score achieved by the randomized assignment (in expectation).
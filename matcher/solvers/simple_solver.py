@@ -25,6 +25,10 @@ SimpleSolver is initialized with the following arguments:
         1: strongly favor this pair
        -1: strongly avoid this pair
 
+    The cost and constraint matrices may also be scipy.sparse matrices
+    (see Encoder(sparse=True)). Pairs that are not stored are treated as
+    having a cost of 0 and no constraint, so only stored pairs become arcs.
+
     "allow_zero_score_assignments":
         False (default) or True. If False, does not use zero-affinity pairs
         (scores for the pair are not known and default to 0) in the solution
@@ -33,6 +37,12 @@ SimpleSolver is initialized with the following arguments:
         True (default) or False. If True, throws an error when the sum of
         the number of available reviews does not equal the sum of demands
 
+    "minimums":
+        None (default) or a list of length #reviewers. If given, the graph
+        prioritizes assigning each reviewer at least this many papers
+        (up to "num_reviews"), so that a single solve respects both the
+        minimum and the maximum reviewer loads.
+
 
 Node is a namedtuple that is used to represent nodes in the graph:
 
@@ -56,8 +66,9 @@ from __future__ import print_function, division
 from collections import namedtuple
 import logging
 import numpy as np
-from ortools.graph import pywrapgraph
 from .core import SolverException
+from .min_cost_flow import SimpleMinCostFlow, CAN_SET_ARC_CAPACITY
+from .. import sparse
 
 Node = namedtuple('Node', ['number', 'index', 'supply'])
 
@@ -72,7 +83,8 @@ class SimpleSolver:
             constraint_matrix,
             allow_zero_score_assignments=False,
             logger=logging.getLogger(__name__),
-            strict=True
+            strict=True,
+            minimums=None
         ):
 
         self.logger = logger
@@ -82,8 +94,13 @@ class SimpleSolver:
         self.solved = False
         self.cost_matrix = cost_matrix
         self.constraint_matrix = constraint_matrix
-        self.flow_matrix = np.zeros(np.shape(self.cost_matrix))
+        self.sparse = sparse.issparse(self.cost_matrix)
+        if self.sparse:
+            self.flow_matrix = sparse.from_entries([], [], [], self.cost_matrix.shape)
+        else:
+            self.flow_matrix = np.zeros(np.shape(self.cost_matrix))
         self.num_reviews = num_reviews
+        self.minimums = minimums
         self.demands = demands
         self.num_papers = np.size(cost_matrix, axis=0)
         self.num_reviewers = np.size(cost_matrix, axis=1)
@@ -91,13 +108,9 @@ class SimpleSolver:
 
         self._check_inputs(strict)
 
-        self.start_nodes = []
-        self.end_nodes = []
-        self.capacities = []
-        self.costs = []
         self.node_by_number = {}
 
-        total_supply = min(sum(self.num_reviews), sum(self.demands))
+        total_supply = self._total_supply()
 
 
         # -- Add Nodes --
@@ -120,35 +133,275 @@ class SimpleSolver:
 
         # -- Add Edges --
 
-        # connect the source node to all reviewer nodes.
-        for r_node in self.reviewer_nodes:
-            capacity = self.num_reviews[r_node.index]
-            self.add_edge(self.source_node, r_node, capacity, cost=0)
-
-        for r_node in self.reviewer_nodes:
-            for p_node in self.paper_nodes:
-
-                coordinates = (p_node.index, r_node.index)
-                arc_cost = int(self.cost_matrix[coordinates])
-                arc_constraint = self.constraint_matrix[coordinates]
-
-                # a constraint of 0 means there's no constraint, so apply the cost as normal
-                # a constraint of 1 means that this user was explicitly assigned to this paper
-                # a constraint of anything other that 0 or 1 essentially indicates a conflict, so do not add an arc
-                if arc_constraint == 0 and (self.allow_zero_score_assignments or arc_cost != 0):
-                    self.add_edge(r_node, p_node, 1, arc_cost)
-                elif arc_constraint == 1:
-                    # TODO: this should be handled as a hard constraint
-                    arc_cost = self._least_cost() - 1
-                    self.add_edge(r_node, p_node, 1, int(arc_cost))
-
-        # connect paper nodes to the sink node.
-        for p_node in self.paper_nodes:
-            capacity = self.demands[p_node.index]
-            self.add_edge(p_node, self.sink_node, capacity, cost=0)
+        if self.sparse:
+            arc_papers, arc_reviewers, arc_costs = self._sparse_arcs()
+        else:
+            arc_papers, arc_reviewers, arc_costs = self._dense_arcs()
 
+        self.arc_papers = arc_papers
+        self.arc_reviewers = arc_reviewers
+        self.arc_costs = arc_costs.astype(np.int64)
+        self.arc_capacities = np.ones(len(arc_costs), dtype=np.int64)
+
+        self._assemble_graph()
         self.construct_solver()
 
+    def _assemble_graph(self):
+        '''
+        Build the aligned arrays `self.start_nodes`, `self.end_nodes`, `self.capacities`
+        and `self.costs`, which represent the edges of the graph by Node numbers.
+        '''
+        # Reviewer and paper Node numbers are consecutive, so they are computed from the indices.
+        reviewer_numbers = self.source_node.number + 1 + np.arange(self.num_reviewers)
+        paper_numbers = self.source_node.number + 1 + self.num_reviewers + np.arange(self.num_papers)
+
+        # connect the source node to all reviewer nodes.
+        source_heads, source_capacities, source_costs = self._source_arcs(reviewer_numbers)
+
+        # reviewer-paper arcs are added right after the source arcs, so their flows
+        # can be read back as one contiguous range of arc indices
+        self.reviewer_paper_arcs = np.arange(len(source_heads), len(source_heads) + len(self.arc_costs))
+
+        self.start_nodes = np.concatenate([
+            np.full(len(source_heads), self.source_node.number),
+            reviewer_numbers[self.arc_reviewers],
+            # connect paper nodes to the sink node.
+            paper_numbers
+        ]).astype(np.int64)
+
+        self.end_nodes = np.concatenate([
+            source_heads,
+            paper_numbers[self.arc_papers],
+            np.full(self.num_papers, self.sink_node.number)
+        ]).astype(np.int64)
+
+        self.capacities = np.concatenate([
+            source_capacities,
+            self.arc_capacities,
+            np.asarray(self.demands, dtype=np.int64).reshape(-1)
+        ])
+
+        self.costs = np.concatenate([
+            source_costs,
+            self.arc_costs,
+            np.zeros(self.num_papers, dtype=np.int64)
+        ])
+
+    def _source_arcs(self, reviewer_numbers):
+        '''
+        Return the heads, capacities and costs of the arcs leaving the source node.
+
+        Without minimums, each reviewer gets one arc with a capacity of its number of reviews.
+        With minimums, each reviewer gets a "mandatory" arc with a capacity of its minimum
+        and a large negative cost, followed by an optional arc for the rest of its reviews.
+        The negative cost outweighs any difference in the cost of the reviewer-paper arcs,
+        so the solver meets as many minimums as possible before minimizing the cost.
+        '''
+        num_reviews = np.asarray(self.num_reviews, dtype=np.int64).reshape(-1)
+        if self.minimums is None:
+            return reviewer_numbers, num_reviews, np.zeros(self.num_reviewers, dtype=np.int64)
+
+        minimums = np.asarray(self.minimums, dtype=np.int64).reshape(-1)
+        greatest_arc_cost = int(np.abs(self.arc_costs).max(initial=0))
+        self.mandatory_cost = -(2 * self._total_supply() * greatest_arc_cost + 1)
+
+        return (
+            np.concatenate([reviewer_numbers, reviewer_numbers]),
+            np.concatenate([minimums, num_reviews - minimums]),
+            np.concatenate([
+                np.full(self.num_reviewers, self.mandatory_cost, dtype=np.int64),
+                np.zeros(self.num_reviewers, dtype=np.int64)]))
+
+    def _dense_arcs(self):
+        '''
+        Find the reviewer-paper arcs for dense cost and constraint matrices.
+
+        Returns arrays of paper indices, reviewer indices and integer costs,
+        ordered by reviewer and then by paper.
+        '''
+        # transpose so that np.nonzero returns the arcs in reviewer-major order
+        costs = np.asarray(self.cost_matrix).T.astype(np.int64)
+        constraints = np.asarray(self.constraint_matrix).T
+
+        # a constraint of 0 means there's no constraint, so apply the cost as normal
+        # a constraint of 1 means that this user was explicitly assigned to this paper
+        # a constraint of anything other that 0 or 1 essentially indicates a conflict, so do not add an arc
+        is_free = constraints == 0
+        if not self.allow_zero_score_assignments:
+            is_free &= costs != 0
+        is_forced = constraints == 1
+
+        arc_reviewers, arc_papers = np.nonzero(is_free | is_forced)
+        arc_costs = costs[arc_reviewers, arc_papers]
+
+        forced_arcs = is_forced[arc_reviewers, arc_papers]
+        if forced_arcs.any():
+            arc_costs[forced_arcs] = self._forced_cost()
+
+        return arc_papers, arc_reviewers, arc_costs
+
+    def _sparse_arcs(self):
+        '''
+        Find the reviewer-paper arcs for sparse cost and constraint matrices.
+        Only pairs with a known (nonzero) cost or a positive constraint are visited.
+
+        Returns arrays of paper indices, reviewer indices and integer costs,
+        in the same (reviewer-major) order as the dense arcs.
+        '''
+        if self.allow_zero_score_assignments:
+            raise SolverException(
+                'allow_zero_score_assignments requires dense cost and constraint matrices')
+
+        paper_indices, reviewer_indices, costs = sparse.entries(self.cost_matrix)
+        costs = costs.astype(np.int64)
+        known = costs != 0
+        paper_indices, reviewer_indices, costs = paper_indices[known], reviewer_indices[known], costs[known]
+        constraints = sparse.lookup(self.constraint_matrix, paper_indices, reviewer_indices)
+
+        forced_papers, forced_reviewers, forced = sparse.entries(self.constraint_matrix)
+        is_forced = forced == 1
+        forced_cost = self._forced_cost() if is_forced.any() else 0
+
+        # a constraint of 0 means there's no constraint, so apply the cost as normal
+        # a constraint of 1 means that this user was explicitly assigned to this paper
+        # anything else indicates a conflict, so do not add an arc
+        is_free = constraints == 0
+        arc_papers = np.concatenate([paper_indices[is_free], forced_papers[is_forced]])
+        arc_reviewers = np.concatenate([reviewer_indices[is_free], forced_reviewers[is_forced]])
+        arc_costs = np.concatenate([
+            costs[is_free],
+            np.full(np.count_nonzero(is_forced), forced_cost, dtype=np.int64)])
+
+        order = np.lexsort((arc_papers, arc_reviewers))
+        return arc_papers[order], arc_reviewers[order], arc_costs[order]
+
+    def _total_supply(self):
+        return min(sum(self.num_reviews), sum(self.demands))
+
+    def _pair_arc(self, paper_index, reviewer_index, constraint, forced_cost):
+        '''
+        Return (should_exist, cost) for the arc between a reviewer and a paper
+        with the given constraint, following the same rules as graph construction.
+        '''
+        # a constraint of 0 means there's no constraint, so apply the cost as normal
+        # a constraint of 1 means that this user was explicitly assigned to this paper
+        # a constraint of anything other that 0 or 1 essentially indicates a conflict, so do not add an arc
+        if constraint == 1:
+            return True, forced_cost
+
+        arc_cost = int(self.cost_matrix[paper_index, reviewer_index])
+        if constraint == 0 and (self.allow_zero_score_assignments or arc_cost != 0):
+            return True, arc_cost
+
+        return False, 0
+
+    def _changed_constraints(self, constraint_matrix):
+        '''Return (paper indices, reviewer indices, new constraints) of the pairs that differ.'''
+        if sparse.issparse(constraint_matrix) != self.sparse:
+            raise SolverException(
+                'constraint matrix must use the same (dense or sparse) encoding as the cost matrix')
+
+        if not np.shape(constraint_matrix) == np.shape(self.cost_matrix):
+            raise SolverException(
+                'cost {} and constraint {} matrices must be the same shape'.format(
+                    np.shape(self.cost_matrix), np.shape(constraint_matrix)))
+
+        if self.sparse:
+            difference = (constraint_matrix - self.constraint_matrix).tocsr()
+            difference.eliminate_zeros()
+            paper_indices, reviewer_indices, _ = sparse.entries(difference)
+        else:
+            paper_indices, reviewer_indices = np.nonzero(constraint_matrix != self.constraint_matrix)
+
+        return paper_indices, reviewer_indices, sparse.lookup(constraint_matrix, paper_indices, reviewer_indices)
+
+    def update(self, num_reviews=None, demands=None, constraint_matrix=None, minimums=None):
+        '''
+        Apply edits to reviewer loads (and minimums), paper demands and/or constraints to the existing graph,
+        so that the next call to solve() takes them into account.
+
+        Only the capacities, supplies and arcs affected by the edits are changed in the arc arrays,
+        instead of finding the arcs from the matrices again. Arcs of pairs that become conflicts
+        keep their place with a capacity of 0.
+
+        The OR-Tools solver is then updated in place when the arcs and their costs are unchanged
+        and OR-Tools can change the capacity of an arc, which takes OR-Tools 9.12 or later
+        (see min_cost_flow.py). Otherwise it is constructed again, and solved from scratch.
+        '''
+        if num_reviews is not None:
+            if not len(num_reviews) == self.num_reviewers:
+                raise SolverException(
+                    'num_reviews must be same length ({}) as number of reviewers ({})'.format(
+                        len(num_reviews), self.num_reviewers))
+            self.num_reviews = num_reviews
+
+        if minimums is not None:
+            self.minimums = minimums
+
+        if self.minimums is not None:
+            self._check_minimums(self.minimums, self.num_reviews)
+
+        if demands is not None:
+            if not len(demands) == self.num_papers:
+                raise SolverException(
+                    'self.demands array must be same length ({}) as number of papers ({})'.format(
+                        len(demands), self.num_papers))
+            self.demands = demands
+
+        if constraint_matrix is not None:
+            paper_indices, reviewer_indices, constraints = self._changed_constraints(constraint_matrix)
+            self.constraint_matrix = constraint_matrix
+
+            # arcs are kept in reviewer-major order, so they can be found with a binary search
+            arc_keys = self.arc_reviewers * self.num_papers + self.arc_papers
+            changed_keys = reviewer_indices * self.num_papers + paper_indices
+            positions = np.searchsorted(arc_keys, changed_keys)
+            forced_cost = self._forced_cost() if np.any(constraints == 1) else 0
+
+            new_papers, new_reviewers, new_costs = [], [], []
+            for paper_index, reviewer_index, constraint, key, position in zip(
+                    paper_indices.tolist(), reviewer_indices.tolist(), constraints.tolist(),
+                    changed_keys.tolist(), positions.tolist()):
+                should_exist, arc_cost = self._pair_arc(paper_index, reviewer_index, constraint, forced_cost)
+                if position < len(arc_keys) and arc_keys[position] == key:
+                    self.arc_capacities[position] = int(should_exist)
+                    if should_exist:
+                        self.arc_costs[position] = arc_cost
+                elif should_exist:
+                    new_papers.append(paper_index)
+                    new_reviewers.append(reviewer_index)
+                    new_costs.append(arc_cost)
+
+            if new_costs:
+                arc_papers = np.concatenate([self.arc_papers, new_papers]).astype(int)
+                arc_reviewers = np.concatenate([self.arc_reviewers, new_reviewers]).astype(int)
+                order = np.lexsort((arc_papers, arc_reviewers))
+                self.arc_papers = arc_papers[order]
+                self.arc_reviewers = arc_reviewers[order]
+                self.arc_costs = np.concatenate([self.arc_costs, new_costs]).astype(np.int64)[order]
+                self.arc_capacities = np.concatenate(
+                    [self.arc_capacities, np.ones(len(new_costs), dtype=np.int64)])[order]
+
+        total_supply = self._total_supply()
+        self.source_node = self.source_node._replace(supply=int(total_supply))
+        self.sink_node = self.sink_node._replace(supply=int(-1 * total_supply))
+        self.node_by_number[self.source_node.number] = self.source_node
+        self.node_by_number[self.sink_node.number] = self.sink_node
+
+        start_nodes, end_nodes, capacities, costs = self.start_nodes, self.end_nodes, self.capacities, self.costs
+        self._assemble_graph()
+
+        if CAN_SET_ARC_CAPACITY and np.array_equal(start_nodes, self.start_nodes) and \
+                np.array_equal(end_nodes, self.end_nodes) and np.array_equal(costs, self.costs):
+            self._check_graph_integrity()
+            for arc in np.flatnonzero(capacities != self.capacities).tolist():
+                self.min_cost_flow.SetArcCapacity(arc, int(self.capacities[arc]))
+            for node in self.node_by_number.values():
+                self.min_cost_flow.SetNodeSupply(node.number, node.supply)
+        else:
+            self.construct_solver()
+        self.solved = False
+
     def _check_inputs(self, strict):
         '''Validate inputs (e.g. that matrix and array dimensions are correct)'''
         self.logger.debug('Checking graph inputs')
@@ -157,9 +410,9 @@ class SimpleSolver:
         num_reviewers = np.size(self.cost_matrix, axis=1)
 
         for matrix in [self.cost_matrix, self.constraint_matrix]:
-            if not isinstance(matrix, np.ndarray):
+            if not isinstance(matrix, np.ndarray) and not sparse.issparse(matrix):
                 raise SolverException(
-                    'cost and constraint matrices must be of type numpy.ndarray')
+                    'cost and constraint matrices must be of type numpy.ndarray or scipy.sparse')
 
         if not np.shape(self.cost_matrix) == np.shape(self.constraint_matrix):
             raise SolverException(
@@ -176,6 +429,9 @@ class SimpleSolver:
                 'self.demands array must be same length ({}) as number of papers ({})'.format(
                     len(self.demands), num_papers))
 
+        if self.minimums is not None:
+            self._check_minimums(self.minimums, self.num_reviews)
+
         supply = sum(self.num_reviews)
         demand = sum(self.demands)
         self.logger.debug('Total supply of reviews is ({}) and total demands are ({})'.format(supply, demand))
@@ -184,6 +440,15 @@ class SimpleSolver:
 
         self.logger.debug('Finished checking graph inputs')
 
+    def _check_minimums(self, minimums, num_reviews):
+        if not len(minimums) == len(num_reviews):
+            raise SolverException(
+                'minimums ({}) and num_reviews ({}) must be the same length'.format(
+                    len(minimums), len(num_reviews)))
+
+        if np.any(np.asarray(minimums) > np.asarray(num_reviews)) or np.any(np.asarray(minimums) < 0):
+            raise SolverException('minimums must be between 0 and num_reviews')
+
     def _check_graph_integrity(self):
         '''Ensure that graph arrays are well-formed for use by OR-Tools.'''
         self.logger.debug('Checking graph integrity')
@@ -202,13 +467,16 @@ class SimpleSolver:
                     len(self.capacities),
                     len(self.costs)))
 
-        if any([not isinstance(i, int) for i in self.capacities]):
-            raise SolverException(
-                'capacities list may not contain integers of type numpy.int64')
+        for name, array in [('start_nodes', self.start_nodes), ('end_nodes', self.end_nodes),
+                            ('capacities', self.capacities), ('costs', self.costs)]:
+            if not np.issubdtype(np.asarray(array).dtype, np.integer):
+                raise SolverException('{} array must contain integers'.format(name))
 
-        if any([not isinstance(i, int) for i in self.costs]):
-            raise SolverException(
-                'costs list may not contain integers of type numpy.int64')
+        num_nodes = len(self.node_by_number)
+        if len(self.start_nodes) and (
+                min(self.start_nodes.min(), self.end_nodes.min()) < 0 or
+                max(self.start_nodes.max(), self.end_nodes.max()) >= num_nodes):
+            raise SolverException('start_nodes and end_nodes must be Node numbers in the graph')
 
 
     def _boundary_cost(self, boundary_function):
@@ -237,6 +505,15 @@ class SimpleSolver:
         '''
         return self._boundary_cost(self.cost_matrix.argmin)
 
+    def _forced_cost(self):
+        '''
+        The cost of the arcs of pairs with a constraint of 1, below any other cost,
+        so that the reviewers explicitly assigned to a paper get it.
+
+        '''
+        # TODO: this should be handled as a hard constraint
+        return int(self._least_cost() - 1)
+
     def add_node(self, index, supply=0):
         '''
         Register a new, unconnected Node object with this graph, with the given index and supply.
@@ -256,37 +533,18 @@ class SimpleSolver:
             self.current_offset += 1
             return new_node
 
-    def add_edge(self, start_node, end_node, capacity, cost):
-        '''
-        Adds an "edge" between `start_node` and `end_node` with the given capacity and cost.
-
-        Edges are represented virtually by the presence of Node numbers in the aligned arrays
-        `self.start_nodes` and `self.end_nodes`; there is no "Edge" object.
-        '''
-
-        self.start_nodes.append(start_node)
-        self.end_nodes.append(end_node)
-
-        # cast `capacity` to Python int because SimpleMinCostFlow can't handle other int types
-        # (e.g. numpy.int64)
-        self.capacities.append(int(capacity))
-        self.costs.append(cost)
-
     def construct_solver(self):
         '''
         Constructs the OR-Tools MinCostFlow solver with this SimpleSolver's Nodes and edges.
+
+        The arcs are loaded from the arc arrays in a single call with OR-Tools 9.4 or later,
+        and one at a time with pywrapgraph (see min_cost_flow.py).
         '''
         self._check_graph_integrity()
 
-        self.min_cost_flow = pywrapgraph.SimpleMinCostFlow()
-
-        for arc_index in range(len(self.start_nodes)):
-            self.min_cost_flow.AddArcWithCapacityAndUnitCost(
-                self.start_nodes[arc_index].number,
-                self.end_nodes[arc_index].number,
-                self.capacities[arc_index],
-                self.costs[arc_index]
-            )
+        self.min_cost_flow = SimpleMinCostFlow()
+        self.min_cost_flow.AddArcsWithCapacityAndUnitCost(
+            self.start_nodes, self.end_nodes, self.capacities, self.costs)
 
         for node in self.node_by_number.values():
             self.min_cost_flow.SetNodeSupply(node.number, node.supply)
@@ -303,14 +561,22 @@ class SimpleSolver:
         solver_status = self.min_cost_flow.Solve()
         if solver_status == self.min_cost_flow.OPTIMAL:
             self.solved = True
-            for i in range(self.min_cost_flow.NumArcs()):
-                self.cost += self.min_cost_flow.Flow(i) * self.min_cost_flow.UnitCost(i)
-                r_node = self.node_by_number[self.min_cost_flow.Tail(i)]
-                p_node = self.node_by_number[self.min_cost_flow.Head(i)]
-                flow = self.min_cost_flow.Flow(i)
-
-                if r_node in self.reviewer_nodes and p_node in self.paper_nodes:
-                    self.flow_matrix[p_node.index, r_node.index] = flow
+            # read in a single call with OR-Tools 9.5 or later (see min_cost_flow.py)
+            flows = self.min_cost_flow.Flows(self.reviewer_paper_arcs)
+            # only the reviewer-paper arcs count: the sink arcs have no cost, and the
+            # cost of the mandatory source arcs (with minimums) is not part of the match
+            self.cost = int(np.dot(flows, self.costs[self.reviewer_paper_arcs]))
+
+            if self.sparse:
+                assigned = flows != 0
+                self.flow_matrix = sparse.from_entries(
+                    self.arc_papers[assigned],
+                    self.arc_reviewers[assigned],
+                    flows[assigned],
+                    self.cost_matrix.shape)
+            else:
+                self.flow_matrix = np.zeros(np.shape(self.cost_matrix))
+                self.flow_matrix[self.arc_papers, self.arc_reviewers] = flows
         else:
             logging.debug("Solver status: {}".format(solver_status))
             self.solved = False
@@ -0,0 +1,87 @@
+'''
+Helpers for working with the sparse matrices produced by `Encoder(sparse=True)`.
+
+A sparse matrix only stores the paper-reviewer pairs that have real edges. Every
+other pair takes on a default value, which the Encoder keeps next to the matrix
+(e.g. `Encoder.cost_default`). The helpers below accept dense numpy arrays too,
+so callers don't need to branch on the encoding mode.
+'''
+
+import numpy as np
+import scipy.sparse
+
+def issparse(matrix):
+    '''Return True if `matrix` is a scipy.sparse matrix.'''
+    return scipy.sparse.issparse(matrix)
+
+def from_entries(rows, cols, values, shape, dtype=float):
+    '''
+    Build a CSR matrix from coordinate arrays.
+
+    If a coordinate appears more than once, the last value wins
+    (the same behavior as assigning into a dense matrix in a loop).
+    '''
+    rows = np.asarray(rows, dtype=int)
+    cols = np.asarray(cols, dtype=int)
+    values = np.asarray(values, dtype=dtype)
+
+    linear = rows * shape[1] + cols
+    _, last_reversed = np.unique(linear[::-1], return_index=True)
+    keep = len(linear) - 1 - last_reversed
+
+    return scipy.sparse.csr_matrix(
+        (values[keep], (rows[keep], cols[keep])), shape=shape, dtype=dtype)
+
+def entries(matrix):
+    '''
+    Return (rows, cols, values) for the stored entries of `matrix`,
+    in row-major order.
+    '''
+    matrix = matrix.tocsr()
+    if not matrix.has_canonical_format:
+        matrix = matrix.copy()
+        matrix.sum_duplicates()
+
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return rows, matrix.indices, matrix.data
+
+def lookup(matrix, rows, cols, default=0):
+    '''
+    Return the values of `matrix` at the coordinates (rows, cols).
+    Pairs that are not stored in a sparse matrix take the value `default`.
+    '''
+    rows = np.asarray(rows, dtype=int)
+    cols = np.asarray(cols, dtype=int)
+
+    if not issparse(matrix):
+        return np.asarray(matrix)[rows, cols]
+
+    stored_rows, stored_cols, values = entries(matrix)
+    num_cols = matrix.shape[1]
+    stored = stored_rows * num_cols + stored_cols
+    wanted = rows * num_cols + cols
+
+    result = np.full(wanted.shape, default, dtype=np.result_type(values.dtype, type(default)))
+    if stored.size:
+        positions = np.minimum(np.searchsorted(stored, wanted), stored.size - 1)
+        found = stored[positions] == wanted
+        result[found] = values[positions[found]]
+
+    return result
+
+def densify(matrix, default=0):
+    '''
+    Return `matrix` as a dense numpy array, filling in `default`
+    for every pair that is not stored. Dense arrays are returned unchanged.
+    '''
+    if not issparse(matrix):
+        return matrix
+
+    rows, cols, values = entries(matrix)
+    dense = np.full(matrix.shape, default, dtype=np.result_type(values.dtype, type(default)))
+    dense[rows, cols] = values
+    return dense
+
+def axis_sum(matrix, axis):
+    '''Sum a dense or sparse matrix along `axis`, returning a flat numpy array.'''
+    return np.asarray(matrix.sum(axis=axis)).ravel()
@@ -12,6 +12,7 @@ setup(name='openreview-matcher',
       cffi_modules=["matcher/solvers/bvn_extension/bvn_extension_build.py:ffibuilder"],
       install_requires=[
           'numpy',
+          'scipy',
           'openreview-py',
           'ortools>=8.1.8487',
           'pytest',
@@ -0,0 +1,36 @@
+import numpy as np
+from benchmarks.venues import generate_venue
+from benchmarks.suite import run_case, compare
+
+def test_generate_venue():
+    '''Test that synthetic venues are reproducible from their seed, and consistent'''
+    venue = generate_venue(100, 300, seed=1)
+    same_venue = generate_venue(100, 300, seed=1)
+    other_venue = generate_venue(100, 300, seed=2)
+
+    affinities = venue['scores_by_type']['affinity']['edges']
+    assert np.array_equal(affinities['weight'], same_venue['scores_by_type']['affinity']['edges']['weight'])
+    assert not np.array_equal(affinities['weight'], other_venue['scores_by_type']['affinity']['edges']['weight'])
+
+    assert len(venue['papers']) == 100 and len(venue['reviewers']) == 300
+    assert set(affinities['head']) <= set(venue['papers'])
+    assert set(affinities['tail']) <= set(venue['reviewers'])
+    assert len(set(zip(affinities['head'], affinities['tail']))) == len(affinities['head'])
+    assert np.all((affinities['weight'] >= 0) & (affinities['weight'] <= 1))
+    assert np.all(venue['constraints']['weight'] == -1)
+    assert sum(venue['maximums']) >= sum(venue['demands'])
+
+def test_benchmark_compare():
+    '''Test that a benchmark case is compared against its baseline'''
+    result = run_case('tiny-MinMax-sparse')
+    assert result['status'] == 'Complete'
+    assert 'solve/min_flow' in result['phases']
+
+    assert compare({'tiny-MinMax-sparse': result}, {'tiny-MinMax-sparse': result}) == []
+    assert compare({'tiny-MinMax-sparse': result}, {}) == []
+
+    slower = dict(result, seconds=result['seconds'] + 1, peak_rss=2 * result['peak_rss'])
+    slower['phases'] = dict(result['phases'], encode=result['phases']['encode'] + 1)
+    regressions = compare({'tiny-MinMax-sparse': slower}, {'tiny-MinMax-sparse': result})
+    assert len(regressions) == 3
+    assert all(regression.startswith('tiny-MinMax-sparse: ') for regression in regressions)
@@ -9,7 +9,8 @@ from collections import namedtuple
 import pytest
 import numpy as np
 
-from matcher.encoder import Encoder
+from matcher.encoder import Encoder, EncoderError
+from matcher import sparse
 from conftest import assert_arrays
 
 MockNote = namedtuple('Note', ['id', 'forum'])
@@ -488,3 +489,162 @@ def test_specific_alternates(encoder_context):
     alternates = encoder.decode_selected_alternates(alternates_by_index)
 
     assert alternates == alternates_by_forum
+
+def test_encoder_sparse(encoder_context):
+    '''Sparse encoding should agree with the dense encoding, including defaults'''
+    papers, reviewers, matrix_shape = encoder_context
+
+    scores_by_type = {
+        'mock/-/score_edge': {
+            'edges': [
+                ('paper0', 'reviewer0', 0.9),
+                ('paper0', 'reviewer2', 0.1),
+                ('paper1', 'reviewer1', 0.4),
+                ('paper2', 'reviewer3', 0.7),
+                ('paper2', 'reviewer0', 0.0)
+            ]
+        },
+        'mock/-/bid_edge': {
+            'default': 0.25,
+            'edges': [
+                ('paper0', 'reviewer1', 1),
+                ('paper2', 'reviewer3', -1)
+            ]
+        }
+    }
+
+    weight_by_type = {
+        'mock/-/score_edge': 1,
+        'mock/-/bid_edge': 0.5
+    }
+
+    constraints = [
+        ('paper0', 'reviewer0', -1),
+        ('paper1', 'reviewer2', 1)
+    ]
+
+    prob_limits = [('paper1', 'reviewer1', 0.6)]
+
+    dense_encoder = Encoder(
+        reviewers,
+        papers,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        ['mock/-/bid_edge'],
+        probability_limits=prob_limits
+    )
+
+    sparse_encoder = Encoder(
+        reviewers,
+        papers,
+        constraints,
+        scores_by_type,
+        weight_by_type,
+        ['mock/-/bid_edge'],
+        probability_limits=prob_limits,
+        sparse=True
+    )
+
+    assert sparse.issparse(sparse_encoder.aggregate_score_matrix)
+    assert sparse_encoder.aggregate_score_matrix.nnz == 6
+
+    np.testing.assert_allclose(
+        sparse.densify(sparse_encoder.aggregate_score_matrix, sparse_encoder.aggregate_score_default),
+        dense_encoder.aggregate_score_matrix)
+    np.testing.assert_allclose(
+        sparse.densify(sparse_encoder.cost_matrix, sparse_encoder.cost_default),
+        dense_encoder.cost_matrix)
+    assert (sparse.densify(sparse_encoder.constraint_matrix) == dense_encoder.constraint_matrix).all()
+    assert (sparse.densify(sparse_encoder.prob_limit_matrix, sparse_encoder.prob_limit_default) \
+        == dense_encoder.prob_limit_matrix).all()
+
+    mock_solution = np.asarray([
+        [0, 1, 0, 0],
+        [0, 0, 1, 0],
+        [0, 0, 0, 1]
+    ])
+
+    assert sparse_encoder.decode_assignments(mock_solution) == dense_encoder.decode_assignments(mock_solution)
+    assert sparse_encoder.decode_assignments(sparse.from_entries([0, 1, 2], [1, 2, 3], [1, 1, 1], matrix_shape)) \
+        == dense_encoder.decode_assignments(mock_solution)
+
+    for num_alternates in range(5):
+        assert sparse_encoder.decode_alternates(mock_solution, num_alternates) \
+            == dense_encoder.decode_alternates(mock_solution, num_alternates)
+
+def test_encoder_columnar_edges(encoder_context):
+    '''Columnar edges should be encoded the same way as lists of triples'''
+    papers, reviewers, matrix_shape = encoder_context
+
+    score_edges = [(forum, reviewer, 0.1 * i) for i, (forum, reviewer) in enumerate(itertools.product(papers, reviewers))]
+    constraints = [('paper0', 'reviewer0', -1), ('paper1', 'reviewer2', 1)]
+    prob_limits = [('paper2', 'reviewer3', 0.4)]
+
+    def to_columns(triples):
+        forums, users, values = zip(*triples)
+        return {'head': np.array(forums), 'tail': np.array(users), 'weight': np.array(values)}
+
+    encoder = Encoder(
+        reviewers,
+        papers,
+        constraints,
+        {'mock/-/score_edge': {'edges': score_edges}},
+        {'mock/-/score_edge': 1},
+        probability_limits=prob_limits
+    )
+
+    columnar_encoder = Encoder(
+        reviewers,
+        papers,
+        to_columns(constraints),
+        {'mock/-/score_edge': {'edges': to_columns(score_edges)}},
+        {'mock/-/score_edge': 1},
+        probability_limits=to_columns(prob_limits)
+    )
+
+    assert (columnar_encoder.aggregate_score_matrix == encoder.aggregate_score_matrix).all()
+    assert (columnar_encoder.constraint_matrix == encoder.constraint_matrix).all()
+    assert (columnar_encoder.prob_limit_matrix == encoder.prob_limit_matrix).all()
+
+    with pytest.raises(EncoderError):
+        Encoder(
+            reviewers,
+            papers,
+            [('paper0', 'unknown_reviewer', -1)],
+            {},
+            {}
+        )
+
+def test_encoder_decode_alternates_ties(encoder_context):
+    '''Alternates should be ordered by score, breaking ties by reviewer index'''
+    papers, reviewers, matrix_shape = encoder_context
+
+    score_edges = [
+        ('paper0', 'reviewer0', 0.5),
+        ('paper0', 'reviewer1', 0.9),
+        ('paper0', 'reviewer2', 0.5),
+        ('paper0', 'reviewer3', 0.5),
+        ('paper1', 'reviewer3', 0.2)
+    ]
+
+    mock_solution = np.asarray([
+        [0, 1, 0, 0],
+        [0, 0, 0, 0],
+        [1, 0, 0, 0]
+    ])
+
+    for is_sparse in [False, True]:
+        encoder = Encoder(
+            reviewers,
+            papers,
+            [],
+            {'mock/-/score_edge': {'edges': score_edges}},
+            {'mock/-/score_edge': 1},
+            sparse=is_sparse
+        )
+
+        alternates = encoder.decode_alternates(mock_solution, 2)
+        assert [entry['user'] for entry in alternates['paper0']] == ['reviewer0', 'reviewer2']
+        assert [entry['user'] for entry in alternates['paper1']] == ['reviewer3', 'reviewer0']
+        assert [entry['user'] for entry in alternates['paper2']] == ['reviewer1', 'reviewer2']
@@ -1,4 +1,9 @@
+import json
 import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
 from unittest import mock
 import pytest
 import openreview
@@ -268,6 +273,9 @@ def test_confignote_interface():
     client = mock_client(**mock_openreview_data)
 
     interface = ConfigNoteInterface(client, '<config_note_id>')
+    assert interface.seed is None
+    assert interface.num_processes == 1
+    assert interface.candidate_limit is None
 
     assert interface.config_note
     assert_arrays(interface.reviewers, ['reviewer0', 'reviewer1', 'reviewer2', 'reviewer3'], is_string=True)
@@ -322,6 +330,11 @@ def test_confignote_interface():
     interface.set_status(MatcherStatus.RUNNING)
     assert interface.config_note.content['status'] == 'Running'
 
+    interface.delete_edges()
+    assert client.delete_edges.call_count == 2
+    for call in client.delete_edges.call_args_list:
+        assert call[1]['label'] == interface.label
+
 def test_confignote_interface_backward_compat_max_users():
     '''Test of basic ConfigNoteInterface functionality.'''
 
@@ -1979,3 +1992,213 @@ def test_confignote_interface_matching_users():
     interface.set_status(MatcherStatus.RUNNING)
     assert interface.config_note.content['status'] == 'Running'
 
+
+def test_confignote_interface_concurrent_edge_fetching():
+    '''Test that the edges of all invitations are fetched at the same time'''
+
+    def invitation(id):
+        return openreview.Invitation(id=id, writers=[], readers=[], signatures=[], reply={})
+
+    def scores(weight):
+        return [{'id': {'head': 'paper0'}, 'values': [{'tail': 'reviewer0', 'weight': weight}]}]
+
+    mock_openreview_data = {
+        'paper_ids': ['paper0'],
+        'reviewer_ids': ['reviewer0'],
+        'mock_invitations': {
+            id: invitation(id) for id in [
+                '<assignment_invitation_id>',
+                '<aggregate_score_invitation_id>',
+                '<affinity_score_invitation>',
+                '<bid_invitation>']
+        },
+        'mock_groups': {
+            '<match_group_id>': openreview.Group(
+                id='<match_group_id>', writers=[], readers=[], signatures=[], signatories=[],
+                members=['reviewer0']),
+            '<paper_group_id>': openreview.Group(
+                id='<paper_group_id>', writers=[], readers=[], signatures=[], signatories=[],
+                members=['paper0'])
+        },
+        'mock_notes': {
+            '<config_note_id>': openreview.Note(
+                id='<config_note_id>',
+                readers=[],
+                writers=[],
+                signatures=['<match_group_id>'],
+                invitation='<config_note_invitation>',
+                content={
+                    'title': 'test-concurrent',
+                    'seed': '42',
+                    'match_group': '<match_group_id>',
+                    'paper_invitation': '<paper_group_id>',
+                    'user_demand': 1,
+                    'min_papers': 0,
+                    'max_papers': 2,
+                    'alternates': 1,
+                    'conflicts_invitation': '<conflicts_invitation_id>',
+                    'scores_specification': {
+                        '<affinity_score_invitation>': {'weight': 1},
+                        '<bid_invitation>': {'weight': 1}
+                    },
+                    'assignment_invitation': '<assignment_invitation_id>',
+                    'aggregate_score_invitation': '<aggregate_score_invitation_id>',
+                    'custom_max_papers_invitation': '<custom_max_papers_invitation_id>',
+                    'status': None
+                })
+        },
+        'mock_grouped_edges': {
+            # edges outside the match are skipped, even if their weight is not a number
+            '<affinity_score_invitation>': scores(0.5) + [
+                {'id': {'head': '<withdrawn_paper>'}, 'values': [{'tail': 'reviewer0', 'weight': 'n/a'}]}],
+            '<bid_invitation>': [
+                {'id': {'head': 'paper0'}, 'values': [{'tail': 'reviewer0', 'weight': 1}, {'tail': '<other>', 'weight': 'n/a'}]}],
+            '<conflicts_invitation_id>': scores(0),
+            '<custom_max_papers_invitation_id>': [
+                {'id': {'head': '<match_group_id>'}, 'values': [{'tail': 'reviewer0', 'weight': 1}]}]
+        }
+    }
+
+    client = mock_client(**mock_openreview_data)
+
+    # every request for grouped edges waits until all four of them are in flight
+    barrier = threading.Barrier(4, timeout=10)
+    get_grouped_edges = client.get_grouped_edges.side_effect
+    def wait_for_all(*args, **kwargs):
+        barrier.wait()
+        return get_grouped_edges(*args, **kwargs)
+    client.get_grouped_edges.side_effect = wait_for_all
+
+    interface = ConfigNoteInterface(client, '<config_note_id>')
+
+    assert_arrays(interface.reviewers, ['reviewer0'], is_string=True)
+    assert_arrays(interface.papers, ['paper0'], is_string=True)
+    assert_arrays(interface.maximums, [1])
+    assert list(interface.constraints) == [('paper0', 'reviewer0', 0)]
+    assert list(interface.scores_by_type['<affinity_score_invitation>']['edges']) == [('paper0', 'reviewer0', 0.5)]
+    assert list(interface.scores_by_type['<bid_invitation>']['edges']) == [('paper0', 'reviewer0', 1)]
+    assert client.get_grouped_edges.call_count == 4
+    assert interface.seed == 42
+
+def test_confignote_interface_build_edge():
+    '''Test that edges built from compiled invitation templates match the invitation values'''
+
+    invitation = openreview.Invitation(
+        id='<assignment_invitation_id>', writers=[], readers=[], signatures=[],
+        reply={
+            'readers': {'values-copied': ['<venue_id>', '<venue_id>/Paper.*/Area_Chairs', '{tail}', '{head}']},
+            'nonreaders': {'values-regex': '<venue_id>/Paper.*/Authors|<venue_id>/Other'},
+            'writers': {'values': ['<venue_id>', '<venue_id>/Paper{head.number}/Program_Committee']}
+        })
+
+    interface = ConfigNoteInterface.__new__(ConfigNoteInterface)
+    interface.venue_id = '<venue_id>'
+    interface._edge_builders = {}
+
+    for forum_id, reviewer, number in [('paper0', 'reviewer0', 1), ('paper1', 'reviewer0', 2), ('paper0', 'reviewer1', 1)]:
+        edge = interface._build_edge(invitation, forum_id, reviewer, 0.5, 'label', number)
+        expected_edge = openreview.Edge(
+            head=forum_id,
+            tail=reviewer,
+            weight=0.5,
+            label='label',
+            invitation=invitation.id,
+            readers=interface._get_values(invitation, number, 'readers', forum_id, reviewer),
+            nonreaders=interface._get_values(invitation, number, 'nonreaders'),
+            writers=interface._get_values(invitation, number, 'writers'),
+            signatures=['<venue_id>'])
+        assert edge.to_json() == expected_edge.to_json()
+
+    assert edge['readers'] == ['<venue_id>', '<venue_id>/Paper.*/Area_Chairs', 'reviewer1', 'paper0']
+    assert edge['nonreaders'] == ['<venue_id>/Paper1/Authors']
+    assert edge['writers'] == ['<venue_id>', '<venue_id>/Paper1/Program_Committee']
+
+def test_confignote_interface_post_edges():
+    '''Test that edges are posted in parallel chunks, and that a failed chunk is posted exactly once'''
+
+    posted_edges = []
+    lock = threading.Lock()
+    state = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0, 'fetches': 0}
+
+    class EdgesHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+
+        def do_POST(self):
+            edges = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                state['requests'] += 1
+                first_request = state['requests'] == 1
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+                posted_edges.extend(edges)
+            # the first request saves its edges, but fails anyway
+            if first_request:
+                self.send_json(500, {'name': 'Error', 'message': 'Internal Server Error'})
+            else:
+                self.send_json(200, edges)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            grouped_edges = {}
+            with lock:
+                state['fetches'] += url.path == '/edges'
+                for edge in posted_edges:
+                    if edge['invitation'] == query['invitation'][0] and edge['label'] == query['label'][0]:
+                        grouped_edges.setdefault(edge['head'], []).append(
+                            {'tail': edge['tail'], 'weight': edge['weight']})
+            self.send_json(200, {'groupedEdges': [
+                {'id': {'head': head}, 'values': values} for head, values in grouped_edges.items()]})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EdgesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def invitation(id):
+        return openreview.Invitation(
+            id=id, writers=[], readers=[], signatures=[],
+            reply={'readers': {'values-copied': ['<venue_id>', '{tail}']}, 'writers': {'values': ['<venue_id>']}})
+
+    interface = ConfigNoteInterface.__new__(ConfigNoteInterface)
+    interface.client = openreview.Client(baseurl='http://127.0.0.1:{}'.format(server.server_port), token='<token>')
+    interface.logger = mock.MagicMock()
+    interface.venue_id = '<venue_id>'
+    interface.label = 'test-post'
+    interface.assignment_invitation = invitation('<assignment_invitation_id>')
+    interface.aggregate_score_invitation = invitation('<aggregate_score_invitation_id>')
+    interface.paper_numbers = {'paper{}'.format(i): i + 1 for i in range(20)}
+    interface.max_post_workers = 4
+    interface.post_batch_size = 7
+    interface.post_retries = 2
+    interface.post_retry_delay = 0
+    interface._edge_builders = {}
+
+    try:
+        interface.set_assignments({
+            'paper{}'.format(i): [
+                {'user': 'reviewer{}'.format(j), 'aggregate_score': i + j} for j in range(3)]
+            for i in range(20)
+        })
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for invitation_id in ['<assignment_invitation_id>', '<aggregate_score_invitation_id>']:
+        edges = sorted(
+            (edge['head'], edge['tail'], edge['weight']) for edge in posted_edges if edge['invitation'] == invitation_id)
+        assert edges == sorted(
+            ('paper{}'.format(i), 'reviewer{}'.format(j), i + j) for i in range(20) for j in range(3))
+
+    assert posted_edges[0]['readers'] == ['<venue_id>', posted_edges[0]['tail']]
+    assert state['max_in_flight'] > 1
+    # the saved edges are fetched once for the one failed request
+    assert state['fetches'] == 1
@@ -3,7 +3,9 @@ Verifies that custom loads are being used correctly in the matcher.
 
 '''
 import itertools
+import json
 import random
+from unittest import mock
 import pytest
 import logging
 from numpy import testing as nptest
@@ -155,4 +157,109 @@ def test_matcher_fairflow_fixed_input():
     assert len(test_fairflow_matcher.solution[0]) == 3
     assert None == nptest.assert_array_equal(test_fairflow_matcher.solution, [[0.0, 0.0, 1.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
     assert test_fairflow_matcher.assignments
-    assert test_fairflow_matcher.alternates
\ No newline at end of file
+    assert test_fairflow_matcher.alternates
+@pytest.mark.parametrize('solver_class, solver_phases', [
+    ('MinMax', ['solve/min_graph', 'solve/min_flow', 'solve/max_graph', 'solve/max_flow']),
+    ('MinMaxSingleGraph', ['solve/minmax_graph', 'solve/minmax_flow']),
+    ('FairFlow', ['solve/find_makespan', 'solve/find_makespan/probe_makespan', 'solve/improve_makespan']),
+    ('Randomized', ['build/construct_lp', 'solve/fractional_lp', 'solve/sampling', 'fraction_of_opt/deterministic_flow']),
+    ('RandomizedMinCostFlow', ['solve/fractional_flow', 'solve/sampling', 'fraction_of_opt/deterministic_flow'])
+])
+def test_matcher_profile(solver_class, solver_phases):
+    '''Test that the phases of a run, and the stages of the solver, are reported in the status'''
+    reviewers = ['reviewer1', 'reviewer2', 'reviewer3']
+    papers = ['paper1', 'paper2', 'paper3']
+
+    scores = [
+        (paper, reviewer, random.random()) \
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    test_matcher = Matcher(
+        {
+            'reviewers': reviewers,
+            'papers': papers,
+            'scores_by_type': {'affinity': {'edges': scores}},
+            'weight_by_type': {'affinity': 1},
+            'minimums': [1, 1, 1],
+            'maximums': [1, 1, 1],
+            'demands': [1, 1, 1],
+            'num_alternates': 1
+        },
+        solver_class = solver_class
+    )
+    test_matcher.datasource.set_status = mock.MagicMock()
+
+    test_matcher.run()
+
+    assert test_matcher.get_status() == 'Complete'
+    profile = json.loads(test_matcher.datasource.set_status.call_args[1]['additional_status_info']['profile'])
+    phases = [phase['name'] for phase in profile['phases']]
+    for phase in ['fetch', 'encode', 'build', 'solve', 'decode', 'post_assignments', 'alternates', 'post_alternates']:
+        assert phase in phases
+    for phase in solver_phases:
+        assert phase in phases
+    assert all(phase['seconds'] >= 0 for phase in profile['phases'])
+    assert json.loads(test_matcher.recorder.to_json())['phases'] == profile['phases']
+
+def test_matcher_fairflow_options():
+    '''Test that the FairFlow options of the datasource reach FairFlow'''
+    reviewers = ['reviewer1', 'reviewer2', 'reviewer3']
+    papers = ['paper1', 'paper2', 'paper3']
+
+    scores = [
+        (paper, reviewer, random.random()) \
+        for paper, reviewer in itertools.product(papers, reviewers)
+    ]
+
+    datasource = {
+        'reviewers': reviewers,
+        'papers': papers,
+        'scores_by_type': {'affinity': {'edges': scores}},
+        'weight_by_type': {'affinity': 1},
+        'minimums': [1, 1, 1],
+        'maximums': [1, 1, 1],
+        'demands': [1, 1, 1],
+        'num_alternates': 1,
+        'num_processes': 2,
+        'candidate_limit': 2
+    }
+    test_matcher = Matcher(datasource, solver_class='FairFlow')
+
+    with mock.patch('matcher.solvers.fairflow.FairFlow._find_ms_parallel', autospec=True, return_value=0.0) as find_ms:
+        test_matcher.run()
+
+    assert find_ms.called
+    assert find_ms.call_args[0][0].num_processes == 2
+    assert find_ms.call_args[0][0].candidate_limit == 2
+    assert test_matcher.get_status() == 'Complete'
+
+def test_matcher_status_without_profile():
+    '''Test that the final status is still set when it cannot be set with the profile'''
+    reviewers = ['reviewer1', 'reviewer2', 'reviewer3']
+    papers = ['paper1', 'paper2', 'paper3']
+
+    test_matcher = Matcher(
+        {
+            'reviewers': reviewers,
+            'papers': papers,
+            'scores_by_type': {'affinity': {'edges': []}},
+            'weight_by_type': {'affinity': 1},
+            'minimums': [1, 1, 1],
+            'maximums': [1, 1, 1],
+            # the reviewers cannot meet the demands
+            'demands': [2, 2, 2],
+            'num_alternates': 1
+        },
+        solver_class='MinMax'
+    )
+
+    def set_status(status, message=None, additional_status_info={}):
+        if 'profile' in additional_status_info:
+            raise ValueError('Profile is too large')
+    test_matcher.datasource.set_status = mock.MagicMock(side_effect=set_status)
+
+    test_matcher.run()
+
+    assert test_matcher.get_status() == 'No Solution'
+    assert 'profile' not in test_matcher.datasource.set_status.call_args[1]['additional_status_info']
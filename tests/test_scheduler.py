@@ -0,0 +1,136 @@
+import os
+import logging
+import logging.handlers
+import time
+import threading
+import multiprocessing.pool
+from functools import partial
+import pytest
+from matcher.service.scheduler import JobScheduler, JobSchedulerError, SchedulerFullError
+
+def wait_for(condition, timeout=10):
+    start_time = time.time()
+    while not condition():
+        if time.time() - start_time > timeout:
+            raise TimeoutError('condition not met within {} seconds'.format(timeout))
+        time.sleep(0.01)
+
+def test_scheduler_queue():
+    '''Test that jobs beyond the worker count are queued in order, and started when a worker is free'''
+    scheduler = JobScheduler(max_workers=1, max_queued_jobs=2, poll_interval=0.01)
+    try:
+        assert scheduler.submit('job0', partial(time.sleep, 0.5)) == 0
+        assert scheduler.submit('job1', partial(time.sleep, 10)) == 1
+        assert scheduler.submit('job2', partial(time.sleep, 10)) == 2
+        assert scheduler.get_position('job3') is None
+
+        with pytest.raises(JobSchedulerError):
+            scheduler.submit('job1', partial(time.sleep, 10))
+        with pytest.raises(SchedulerFullError):
+            scheduler.submit('job3', partial(time.sleep, 10))
+
+        wait_for(lambda: scheduler.get_position('job0') is None)
+        assert scheduler.get_position('job1') == 0
+        assert scheduler.get_position('job2') == 1
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_cancel():
+    '''Test that queued and running jobs can be cancelled'''
+    scheduler = JobScheduler(max_workers=1, poll_interval=0.01)
+    try:
+        scheduler.submit('job0', partial(time.sleep, 10))
+        scheduler.submit('job1', partial(time.sleep, 10))
+        scheduler.submit('job2', partial(time.sleep, 10))
+
+        assert scheduler.cancel('job1')
+        assert scheduler.get_position('job1') is None
+        assert scheduler.get_position('job2') == 1
+
+        assert scheduler.cancel('job0')
+        assert scheduler.get_position('job0') is None
+        assert scheduler.get_position('job2') == 0
+
+        assert not scheduler.cancel('job0')
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_admission_by_size():
+    '''Test that jobs are admitted while the total estimated size is within the limit'''
+    scheduler = JobScheduler(max_workers=1, max_total_size=100, poll_interval=0.01)
+    try:
+        # a single job larger than the limit is admitted when nothing else is scheduled
+        assert scheduler.submit('job0', partial(time.sleep, 10), size=150) == 0
+        with pytest.raises(SchedulerFullError):
+            scheduler.submit('job1', partial(time.sleep, 10), size=1)
+
+        scheduler.cancel('job0')
+        scheduler.submit('job1', partial(time.sleep, 10), size=60)
+        scheduler.submit('job2', partial(time.sleep, 10), size=40)
+        with pytest.raises(SchedulerFullError):
+            scheduler.submit('job3', partial(time.sleep, 10), size=1)
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_process_error():
+    '''Test that the error callback is called when a job process exits with an error'''
+    exitcodes = []
+    scheduler = JobScheduler(max_workers=1, poll_interval=0.01)
+    try:
+        scheduler.submit('job0', partial(os._exit, 3), on_error=exitcodes.append)
+        scheduler.submit('job1', partial(os._exit, 0), on_error=exitcodes.append)
+        # jobs can start processes of their own
+        scheduler.submit('job2', partial(multiprocessing.pool.Pool, 1), on_error=exitcodes.append)
+        wait_for(lambda: scheduler.get_position('job2') is None)
+        assert exitcodes == [3]
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_error_callback_unlocked():
+    '''Test that the error callback is called without holding the lock of the scheduler'''
+    scheduler = JobScheduler(max_workers=1, poll_interval=0.01)
+    unlocked = []
+
+    def on_error(exitcode):
+        # another thread can use the scheduler while the callback runs
+        thread = threading.Thread(target=scheduler.get_position, args=('job0',), daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        unlocked.append(not thread.is_alive())
+
+    try:
+        scheduler.submit('job0', partial(os._exit, 3), on_error=on_error)
+        wait_for(lambda: unlocked)
+        assert unlocked == [True]
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_job_logging():
+    '''Test that the log records of a job are handled by the logger of the same name in the scheduler process'''
+    logger = logging.getLogger('test_scheduler_job_logging')
+    logger.setLevel(logging.DEBUG)
+    handler = logging.handlers.BufferingHandler(10)
+    logger.addHandler(handler)
+
+    scheduler = JobScheduler(max_workers=1, poll_interval=0.01, logger=logger)
+    try:
+        scheduler.submit('job0', partial(logger.debug, 'message from job0'))
+        wait_for(lambda: any(record.getMessage() == 'message from job0' for record in handler.buffer))
+    finally:
+        scheduler.shutdown()
+        logger.removeHandler(handler)
+
+def test_scheduler_cancel_exited_job():
+    '''Test that cancelling a job that has exited with an error, but was not reaped yet, still reports the error'''
+    exitcodes = []
+    # the dispatcher does not get to reap the job before it is cancelled
+    scheduler = JobScheduler(max_workers=1, poll_interval=60)
+    try:
+        scheduler.submit('job0', partial(os._exit, 3), on_error=exitcodes.append)
+        scheduler._running['job0']['process'].join()
+
+        assert not scheduler.cancel('job0')
+        assert exitcodes == [3]
+        assert scheduler.get_position('job0') is None
+    finally:
+        scheduler.shutdown()
@@ -570,3 +570,85 @@ def test_solver_fairflow_avoid_zero_scores_get_no_solution():
 
     with pytest.raises(SolverException, match=r'.*Solver could not find a solution.*'):
         res = solver.solve()
+
+def test_solver_fairflow_parallel_makespan_search():
+    '''
+    Searching for the makespan on several processes should return a valid assignment
+    that is at least as fair as the sequential search.
+    '''
+    aggregate_score_matrix = np.transpose(np.array([
+        [0.2, 0.1, 0.4, 0.8],
+        [0.5, 0.2, 0.3, 0.1],
+        [0.2, 0.4, 0.6, 0.3],
+        [0.7, 0.9, 0.3, 0.5],
+        [0.1, 0.8, 0.5, 0.4]
+    ]))
+    constraint_matrix = np.zeros(np.shape(aggregate_score_matrix))
+    constraint_matrix[0, 1] = -1
+    demands = [2,2,2,2]
+
+    sequential_solver = FairFlow(
+        [0,0,0,0,0],
+        [2,2,2,2,2],
+        demands,
+        encoder(aggregate_score_matrix, constraint_matrix)
+    )
+    sequential_res = sequential_solver.solve()
+
+    solver = FairFlow(
+        [0,0,0,0,0],
+        [2,2,2,2,2],
+        demands,
+        encoder(aggregate_score_matrix, constraint_matrix),
+        num_processes=3
+    )
+    res = solver.solve()
+    assert res.shape == (4,5)
+    assert solver.solved
+    assert_arrays(np.sum(res, axis=1), demands)
+    assert (np.sum(res, axis=0) <= 2).all()
+    assert res[0, 1] == 0
+
+    worst_paper_score = np.min(np.sum(res * aggregate_score_matrix, axis=1))
+    sequential_worst_paper_score = np.min(np.sum(sequential_res * aggregate_score_matrix, axis=1))
+    assert worst_paper_score >= sequential_worst_paper_score - 1e-9
+
+def test_solver_fairflow_candidate_limit():
+    '''
+    Limiting the number of candidate papers per reviewer should still return a valid assignment,
+    and a limit that keeps every paper should not change the assignment.
+    '''
+    aggregate_score_matrix = np.transpose(np.array([
+        [0.2, 0.1, 0.4, 0.8],
+        [0.5, 0.2, 0.3, 0.1],
+        [0.2, 0.4, 0.6, 0.3],
+        [0.7, 0.9, 0.3, 0.5],
+        [0.1, 0.8, 0.5, 0.4]
+    ]))
+    constraint_matrix = np.zeros(np.shape(aggregate_score_matrix))
+    constraint_matrix[2, 3] = -1
+    demands = [2,2,2,2]
+
+    solver = FairFlow(
+        [0,0,0,0,0],
+        [2,2,2,2,2],
+        demands,
+        encoder(aggregate_score_matrix, constraint_matrix)
+    )
+    res = solver.solve()
+
+    for candidate_limit, expected_res in [(1, None), (4, res)]:
+        limited_solver = FairFlow(
+            [0,0,0,0,0],
+            [2,2,2,2,2],
+            demands,
+            encoder(aggregate_score_matrix, constraint_matrix),
+            candidate_limit=candidate_limit
+        )
+        limited_res = limited_solver.solve()
+        assert limited_solver.solved
+        assert_arrays(np.sum(limited_res, axis=1), demands)
+        assert (np.sum(limited_res, axis=0) <= 2).all()
+        assert limited_res[2, 3] == 0
+        if expected_res is not None:
+            assert (limited_res == expected_res).all()
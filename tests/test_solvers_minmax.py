@@ -1,8 +1,11 @@
 # TODO: This is a leftover module from the days of David. Clean this up / make it readable!
 from collections import namedtuple
+from unittest import mock
 import pytest
 import numpy as np
-from matcher.solvers import MinMaxSolver
+import scipy.sparse
+from matcher.solvers import MinMaxSolver, SingleGraphMinMaxSolver
+from matcher.solvers.min_cost_flow import CAN_SET_ARC_CAPACITY
 
 encoder = namedtuple('Encoder', ['cost_matrix', 'constraint_matrix'])
 
@@ -507,3 +510,177 @@ def test_solver_minmax_avoid_zero_scores_get_no_solution():
 
     res = solver.solve()
     assert solver.solved == False
+
+def test_solver_minmax_sparse():
+    '''Sparse cost and constraint matrices should give the same optimal cost as dense ones'''
+    cost_matrix = np.transpose(np.array([
+        [-10, 0, 0, -10, -10],
+        [-100, -10, -10, -100, 0],
+        [0, -10, -10, -100, -100],
+        [-10, -100, -100, -10, -10]]))
+    constraint_matrix = np.transpose(np.array([
+        [0, 0, 0, 0, 0],
+        [-1, 0, 0, -1, 0],
+        [0, 0 , 0, -1, -1],
+        [0, -1,-1, 0, 0]]))
+
+    sparse_encoder = namedtuple('Encoder', ['cost_matrix', 'constraint_matrix', 'cost_default'])
+
+    dense_solver = MinMaxSolver(
+        [1,1,1,1],
+        [3,3,3,3],
+        [2,2,2,2,2],
+        encoder(cost_matrix, constraint_matrix)
+    )
+    dense_solver.solve()
+
+    sparse_solver = MinMaxSolver(
+        [1,1,1,1],
+        [3,3,3,3],
+        [2,2,2,2,2],
+        sparse_encoder(
+            scipy.sparse.csr_matrix(cost_matrix),
+            scipy.sparse.csr_matrix(constraint_matrix),
+            0)
+    )
+    res = sparse_solver.solve()
+
+    assert scipy.sparse.issparse(res)
+    assert res.shape == (5, 4)
+    assert sparse_solver.solved
+    check_solution(sparse_solver, dense_solver.cost)
+
+    res = res.toarray()
+    assert (res[constraint_matrix == -1] == 0).all()
+    assert (res.sum(axis=1) == 2).all()
+
+def test_solver_minmax_resolve():
+    '''Re-solving after editing loads and constraints should match a solve from scratch'''
+    cost_matrix = np.transpose(np.array([
+        [-10, 0, 0, -10, -10],
+        [-100, -10, -10, -100, 0],
+        [0, -10, -10, -100, -100],
+        [-10, -100, -100, -10, -10]]))
+    constraint_matrix = np.zeros(np.shape(cost_matrix))
+
+    edited_constraints = np.copy(constraint_matrix)
+    edited_constraints[1, 0] = -1
+    edited_constraints[2, 3] = 1
+
+    for edits in [
+            {'maximums': [3,3,3,2]},
+            {'constraint_matrix': edited_constraints},
+            {'minimums': [0,1,1,1], 'maximums': [2,3,3,3]}]:
+        solver = MinMaxSolver(
+            [1,1,1,1],
+            [3,3,3,3],
+            [2,2,2,2,2],
+            encoder(cost_matrix, constraint_matrix)
+        )
+        solver.solve()
+        assert solver.solved
+
+        arguments = {
+            'minimums': [1,1,1,1],
+            'maximums': [3,3,3,3],
+            'demands': [2,2,2,2,2],
+            'constraint_matrix': constraint_matrix
+        }
+        arguments.update(edits)
+
+        fresh_solver = MinMaxSolver(
+            arguments['minimums'],
+            arguments['maximums'],
+            arguments['demands'],
+            encoder(cost_matrix, arguments['constraint_matrix'])
+        )
+        fresh_solver.solve()
+
+        res = solver.resolve(**edits)
+        assert solver.solved
+        assert solver.cost == fresh_solver.cost
+        assert solver.optimal_cost == fresh_solver.optimal_cost
+        assert (res[arguments['constraint_matrix'] == -1] == 0).all()
+        assert (res.sum(axis=0) <= np.array(arguments['maximums'])).all()
+
+def test_solver_minmax_single_graph():
+    '''The single-graph formulation should respect the loads and do at least as well as two solves'''
+    cost_matrix = np.transpose(np.array([
+        [-10, 0, 0, -10, -10],
+        [-100, -10, -10, -100, 0],
+        [0, -10, -10, -100, -100],
+        [-10, -100, -100, -10, -10]]))
+    constraint_matrix = np.transpose(np.array([
+        [0, 0, 0, 0, 0],
+        [-1, 0, 0, -1, 0],
+        [0, 0 , 0, -1, -1],
+        [0, -1,-1, 0, 0]]))
+
+    two_graph_solver = MinMaxSolver(
+        [2,2,2,2],
+        [3,3,3,3],
+        [2,2,2,2,2],
+        encoder(cost_matrix, constraint_matrix)
+    )
+    two_graph_solver.solve()
+
+    solver = SingleGraphMinMaxSolver(
+        [2,2,2,2],
+        [3,3,3,3],
+        [2,2,2,2,2],
+        encoder(cost_matrix, constraint_matrix)
+    )
+    res = solver.solve()
+
+    assert solver.solved
+    assert solver.optimal_cost == solver.cost
+    assert solver.cost <= two_graph_solver.cost
+    assert (res[constraint_matrix == -1] == 0).all()
+    assert (res.sum(axis=1) == 2).all()
+    assert (res.sum(axis=0) >= 2).all()
+    assert (res.sum(axis=0) <= 3).all()
+
+    res = solver.resolve(maximums=[3,2,3,3])
+    assert solver.solved
+    assert (res.sum(axis=0) <= np.array([3,2,3,3])).all()
+
+@pytest.mark.parametrize('in_place', [
+    pytest.param(True, marks=pytest.mark.skipif(
+        not CAN_SET_ARC_CAPACITY, reason='OR-Tools cannot change arcs before 9.12')),
+    False
+])
+def test_solver_minmax_resolve_in_place(in_place):
+    '''Re-solving after editing loads should only change the capacities when OR-Tools can set them'''
+    cost_matrix = np.transpose(np.array([
+        [-10, 0, 0, -10, -10],
+        [-100, -10, -10, -100, 0],
+        [0, -10, -10, -100, -100],
+        [-10, -100, -100, -10, -10]]))
+    constraint_matrix = np.zeros(np.shape(cost_matrix))
+
+    solver = SingleGraphMinMaxSolver(
+        [1,1,1,1],
+        [3,3,3,3],
+        [2,2,2,2,2],
+        encoder(cost_matrix, constraint_matrix)
+    )
+    solver.solve()
+
+    graph_solver = solver.graph_solver
+    min_cost_flow = graph_solver.min_cost_flow
+    with mock.patch('matcher.solvers.simple_solver.CAN_SET_ARC_CAPACITY', in_place):
+        graph_solver.update(num_reviews=[3,2,3,3])
+    assert (graph_solver.min_cost_flow is min_cost_flow) == in_place
+    # the optional source arc of the second reviewer holds its reviews above the minimum
+    assert graph_solver.min_cost_flow.Capacity(5) == 1
+
+    expected_solver = SingleGraphMinMaxSolver(
+        [1,1,1,1],
+        [3,2,3,3],
+        [2,2,2,2,2],
+        encoder(cost_matrix, constraint_matrix)
+    )
+    expected_solver.solve()
+    graph_solver.solve()
+    assert graph_solver.cost == expected_solver.graph_solver.cost
+    assert np.all(np.sum(graph_solver.flow_matrix, axis=0) <= [3,2,3,3])
@@ -324,6 +324,33 @@ def test_constraints():
     check_test_solution(solver)
 
 
+def test_lp_excludes_ineligible_pairs():
+    ''' Conflicted and zero-score pairs should not become LP variables '''
+    S = np.transpose(np.array([
+        [1, 0.1, 0.5],
+        [1, 1, 0],
+        [0.3, 0.6, 0],
+        [0.5, 0.8, 0.5]
+    ]))
+    M = np.transpose(np.array([
+        [-1, 1, 0],
+        [0, -1, 0],
+        [0, 0, 1],
+        [0, 0, 0]
+    ]))
+    Q = np.full(np.shape(S), 0.75)
+
+    solver = RandomizedSolver(
+        [0,0,0,0],
+        [3,3,3,3],
+        [2,2,2],
+        encoder(-S, M, Q)
+    )
+    # 12 pairs, minus 2 conflicts and 1 unforced zero score (the forced zero score stays)
+    assert solver.fractional_assignment_solver.NumVariables() == 9
+    check_test_solution(solver)
+
+
 def test_large():
     ''' Ensure things still work in a larger case '''
     p = 20
@@ -472,3 +499,96 @@ def test_identical_costs():
     )
     for _ in range(1000):
         check_test_solution(solver, T=1)
+
+
+def test_sample_assignments():
+    ''' Test that batch sampling is valid, unbiased, and reproducible for any number of threads '''
+    S = np.transpose(np.array([
+        [1, 0.1],
+        [1, 1],
+        [0.3, 0.6],
+        [0.5, 0.8]
+    ]))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.75)
+    solver = RandomizedSolver(
+        [0,0,0,0],
+        [1,1,1,1],
+        [2,2],
+        encoder(-S, M, Q)
+    )
+    solver.solve()
+    assert solver.solved
+
+    samples = solver.sample_assignments(1000, seed=1, dense=True)
+    assert samples.shape == (1000,) + S.shape
+    assert np.all(np.sum(samples, axis=2) == 2), 'Every sample should meet paper demands'
+    assert np.all(np.sum(samples, axis=1) <= 1), 'Every sample should respect reviewer maximums'
+    assert np.all(np.abs(np.mean(samples, axis=0) - solver.fractional_assignment_matrix) < 1e-1), \
+        'Mean sampled solution should be close to fractional assignment'
+
+    assert np.array_equal(samples, solver.sample_assignments(1000, num_threads=3, seed=1, dense=True)), \
+        'Samples should only depend on the seed'
+    assert not np.array_equal(samples, solver.sample_assignments(1000, seed=2, dense=True))
+
+    paps, revs, edge_samples = solver.sample_assignments(1000, seed=1)
+    assert edge_samples.dtype == np.int8
+    assert edge_samples.shape == (1000, paps.size)
+    assert np.all(solver.fractional_assignment_matrix[paps, revs] > 0)
+    assert np.array_equal(samples[:, paps, revs], edge_samples)
+    assert np.sum(samples) == np.sum(edge_samples), 'Pairs outside the support should never be sampled'
+
+
+def test_seed():
+    ''' Test that solvers with the same seed sample the same assignments and alternates '''
+    S = np.random.default_rng(0).random((5, 6))
+    M = np.zeros(np.shape(S))
+    Q = np.full(np.shape(S), 0.5)
+
+    runs = []
+    for seed in [3, 3, 4]:
+        solver = RandomizedSolver(
+            [0] * 6,
+            [3] * 6,
+            [2] * 5,
+            encoder(-S, M, Q),
+            seed=seed
+        )
+        solver.solve()
+        assert solver.solved
+        samples = [solver.flow_matrix.copy()]
+        for _ in range(20):
+            solver.sample_assignment()
+            samples.append(solver.flow_matrix.copy())
+        runs.append((np.array(samples), solver.get_alternates(2)))
+
+    assert np.array_equal(runs[0][0], runs[1][0]) and runs[0][1] == runs[1][1]
+    assert not np.array_equal(runs[0][0], runs[2][0])
+
+
+def test_min_cost_flow_fractional_method():
+    ''' Test that the min-cost flow finds a fractional assignment as good as the LP '''
+    S = np.random.default_rng(0).random((6, 8))
+    M = np.zeros(np.shape(S))
+    M[0, 0] = -1
+    M[1, 1] = 1
+    Q = np.full(np.shape(S), 0.5)
+    Q[2, :] = 1.0
+
+    solvers = [
+        RandomizedSolver(
+            [1] * 8,
+            [3] * 8,
+            [3] * 6,
+            encoder(-S, M, Q),
+            fractional_method=fractional_method
+        ) for fractional_method in ['LP', 'MinCostFlow']
+    ]
+    check_test_solution(solvers[1], T=100, tol=0.2)
+    solvers[0].solve()
+    assert solvers[0].solved
+    assert np.isclose(solvers[0].expected_cost, solvers[1].expected_cost)
+    assert np.isclose(solvers[0].opt_cost, solvers[1].opt_cost)
+
+    with pytest.raises(SolverException):
+        RandomizedSolver([0], [1], [1], encoder(-S[:1, :1], M[:1, :1], Q[:1, :1]), fractional_method='Simplex')